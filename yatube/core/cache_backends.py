@@ -0,0 +1,460 @@
+import fcntl
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+TIERS = ('local', 'shared')
+NAMESPACES = ('fragments', 'views', 'internal')
+# Служебные ключи всегда читаются из общего уровня: иначе инвалидация
+# поколениями и блокировки не работали бы между процессами
+SHARED_ONLY_PREFIXES = ('generation:', 'lock:', 'stats:')
+STATS_FLUSH_EVERY = 100
+# Ключей в одном запросе к SQLite: ниже SQLITE_MAX_VARIABLE_NUMBER
+# старых сборок (999)
+SQLITE_BATCH_KEYS = 500
+
+
+def _chunks(keys):
+    """Ключи порциями по SQLITE_BATCH_KEYS и их плейсхолдеры для IN."""
+    keys = list(keys)
+    for start in range(0, len(keys), SQLITE_BATCH_KEYS):
+        chunk = keys[start:start + SQLITE_BATCH_KEYS]
+        yield chunk, ', '.join('?' * len(chunk))
+
+
+def key_namespace(key):
+    if key.startswith('template.cache.'):
+        return 'fragments'
+    if key.startswith(SHARED_ONLY_PREFIXES):
+        return 'internal'
+    return 'views'
+
+
+def stats_key(tier, namespace, outcome):
+    return f'stats:{tier}:{namespace}:{outcome}'
+
+
+def read_stats(cache):
+    """Накопленные всеми процессами попадания и промахи по уровням."""
+    keys = [
+        stats_key(tier, namespace, outcome)
+        for tier in TIERS
+        for namespace in NAMESPACES
+        for outcome in ('hits', 'misses')
+    ]
+    values = cache.get_many(keys)
+    return {
+        (tier, namespace): {
+            outcome: values.get(stats_key(tier, namespace, outcome), 0)
+            for outcome in ('hits', 'misses')
+        }
+        for tier in TIERS
+        for namespace in NAMESPACES
+    }
+
+
+# Число записей хранится в отдельной строке и меняется триггерами:
+# проверка MAX_ENTRIES после каждой вставки не считает всю таблицу
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+    'CREATE TABLE IF NOT EXISTS cache_size ('
+    'id INTEGER PRIMARY KEY CHECK (id = 1), entries INTEGER NOT NULL)',
+    'INSERT OR IGNORE INTO cache_size (id, entries) '
+    'SELECT 1, COUNT(*) FROM cache',
+    'CREATE TRIGGER IF NOT EXISTS cache_inserted AFTER INSERT ON cache '
+    'BEGIN UPDATE cache_size SET entries = entries + 1; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_deleted AFTER DELETE ON cache '
+    'BEGIN UPDATE cache_size SET entries = entries - 1; END',
+)
+
+
+class SQLiteCache(BaseCache):
+    """Общий для всех процессов кэш в файле SQLite (LOCATION — путь).
+
+    Как только записей становится больше MAX_ENTRIES, удаляются истёкшие,
+    а если их не хватило — 1/CULL_FREQUENCY записей, истекающих раньше
+    остальных.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self._path) or '.', exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=5, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            # Схема создаётся одной транзакцией: счётчик записей должен
+            # появиться вместе с триггерами, иначе он разойдётся с таблицей
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                for statement in SCHEMA:
+                    connection.execute(statement)
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+            self._local.connection = connection
+        return connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _row(self, connection, key):
+        row = connection.execute(
+            'SELECT value, expires FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row
+
+    def get(self, key, default=None, version=None):
+        row = self._row(self._connection(), self._key(key, version))
+        if row is None:
+            return default
+        return pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        """Значения ключей одним SELECT ... IN на каждые SQLITE_BATCH_KEYS."""
+        names = {self._key(key, version): key for key in keys}
+        connection = self._connection()
+        now = time.time()
+        found = {}
+        for chunk, placeholders in _chunks(names):
+            rows = connection.execute(
+                'SELECT key, value, expires FROM cache '
+                f'WHERE key IN ({placeholders})',
+                chunk,
+            )
+            for key, value, expires in rows:
+                if expires is None or expires > now:
+                    found[names[key]] = pickle.loads(value)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        """Все значения одной транзакцией, MAX_ENTRIES проверяется раз."""
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            (
+                self._key(key, version),
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                expires,
+            )
+            for key, value in data.items()
+        ]
+        if not rows:
+            return []
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            # UPSERT, а не REPLACE: перезапись не считается новой записью
+            connection.executemany(
+                'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET '
+                'value = excluded.value, expires = excluded.expires',
+                rows,
+            )
+            self._cull(connection)
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        connection = self._connection()
+        cursor = connection.execute(
+            'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET '
+            'value = excluded.value, expires = excluded.expires '
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            (
+                self._key(key, version),
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                self.get_backend_timeout(timeout),
+                time.time(),
+            ),
+        )
+        self._cull(connection)
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = self._row(connection, key)
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key),
+            )
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (
+                self.get_backend_timeout(timeout),
+                self._key(key, version),
+                time.time(),
+            ),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        connection = self._connection()
+        for chunk, placeholders in _chunks(
+            self._key(key, version) for key in keys
+        ):
+            connection.execute(
+                f'DELETE FROM cache WHERE key IN ({placeholders})', chunk
+            )
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._row(self._connection(), key) is not None
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def _entries(self, connection):
+        return connection.execute(
+            'SELECT entries FROM cache_size WHERE id = 1'
+        ).fetchone()[0]
+
+    def _cull(self, connection):
+        if self._entries(connection) <= self._max_entries:
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            (time.time(),),
+        )
+        total = self._entries(connection)
+        if total <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            self.clear()
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+            'ORDER BY expires IS NULL, expires LIMIT ?)',
+            (max(total // self._cull_frequency, total - self._max_entries),),
+        )
+
+
+class FileCache(FileBasedCache):
+    """Файловый кэш Django с атомарными add и incr (LOCATION — каталог).
+
+    В FileBasedCache обе операции читают файл и потом пишут новый: два
+    процесса могли оба взять блокировку пересчёта или потерять сдвиг
+    поколения. Здесь они идут под общей для каталога блокировкой flock.
+    """
+
+    lock_name = 'atomic.lock'
+
+    @contextmanager
+    def _locked(self):
+        self._createdir()
+        # Блокировку снимает закрытие файла
+        with open(os.path.join(self._dir, self.lock_name), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked():
+            return super().add(key, value, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        with self._locked():
+            return super().incr(key, delta, version=version)
+
+
+class TieredCache(BaseCache):
+    """Процессный LRU-кэш перед общим уровнем из CACHES[SHARED].
+
+    Локальный уровень живёт не дольше LOCAL_TIMEOUT секунд, служебные
+    ключи (SHARED_ONLY_PREFIXES) читаются только из общего уровня.
+    delete() и set() очищают локальный уровень только своего процесса:
+    другие процессы до LOCAL_TIMEOUT секунд отдают прежнее значение.
+    Поэтому данные, которые должны обновляться сразу, инвалидируются
+    поколениями — ключ с новым поколением не найдётся ни на одном уровне.
+    Попадания и промахи по уровням копятся в процессе и раз в
+    STATS_FLUSH_EVERY обращений складываются в общий уровень.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._local = LocMemCache(f'tiered-{location}', {
+            'TIMEOUT': self._local_timeout,
+            'OPTIONS': {
+                'MAX_ENTRIES': options.get('LOCAL_MAX_ENTRIES', 1000),
+            },
+        })
+        self._stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _local_timeout_for(self, timeout):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self._local_timeout
+        return min(timeout, self._local_timeout)
+
+    def _record(self, tier, key, hit):
+        outcome = 'hits' if hit else 'misses'
+        with self._stats_lock:
+            self._stats[stats_key(tier, key_namespace(key), outcome)] += 1
+            if sum(self._stats.values()) < STATS_FLUSH_EVERY:
+                return
+            pending, self._stats = self._stats, Counter()
+        self.flush_stats(pending)
+
+    def flush_stats(self, pending=None):
+        if pending is None:
+            with self._stats_lock:
+                pending, self._stats = self._stats, Counter()
+        shared = self.shared
+        for key, count in pending.items():
+            if not shared.add(key, count, None):
+                shared.incr(key, count)
+
+    def get(self, key, default=None, version=None):
+        shared_only = key.startswith(SHARED_ONLY_PREFIXES)
+        if not shared_only:
+            value = self._local.get(key, self, version=version)
+            self._record('local', key, value is not self)
+            if value is not self:
+                return value
+        value = self.shared.get(key, self, version=version)
+        if not key.startswith('stats:'):
+            self._record('shared', key, value is not self)
+        if value is self:
+            return default
+        if not shared_only:
+            self._local.set(
+                key, value, self._local_timeout, version=version
+            )
+        return value
+
+    def get_many(self, keys, version=None):
+        """Один проход по локальному уровню и один get_many общего."""
+        found = {}
+        missing = []
+        for key in keys:
+            if key.startswith(SHARED_ONLY_PREFIXES):
+                missing.append(key)
+                continue
+            value = self._local.get(key, self, version=version)
+            self._record('local', key, value is not self)
+            if value is self:
+                missing.append(key)
+            else:
+                found[key] = value
+        if not missing:
+            return found
+        shared = self.shared.get_many(missing, version=version)
+        for key in missing:
+            if not key.startswith('stats:'):
+                self._record('shared', key, key in shared)
+        self._local.set_many(
+            {
+                key: value for key, value in shared.items()
+                if not key.startswith(SHARED_ONLY_PREFIXES)
+            },
+            self._local_timeout, version=version,
+        )
+        found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        failed = self.shared.set_many(data, timeout, version=version)
+        self._local.set_many(
+            {
+                key: value for key, value in data.items()
+                if not key.startswith(SHARED_ONLY_PREFIXES)
+            },
+            self._local_timeout_for(timeout), version=version,
+        )
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        added = self.shared.add(key, value, timeout, version=version)
+        if added and not key.startswith(SHARED_ONLY_PREFIXES):
+            self._local.set(
+                key, value, self._local_timeout_for(timeout), version=version
+            )
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        self._local.delete(key, version=version)
+        return self.shared.incr(key, delta, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        # Локальные уровни других процессов отдают ключ ещё до
+        # LOCAL_TIMEOUT секунд, см. описание класса
+        self._local.delete(key, version=version)
+        self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        self._local.delete_many(keys, version=version)
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return (
+            self._local.has_key(key, version=version)
+            or self.shared.has_key(key, version=version)
+        )
+
+    def clear(self):
+        self._local.clear()
+        self.shared.clear()
@@ -0,0 +1,95 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import routers
+
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _generation_key(name):
+    return f'generation:{name}'
+
+
+def get_generation(name):
+    """Текущее поколение данных name — часть ключей кэша фрагментов.
+
+    Если ключ поколения вытеснен из кэша, начинаем с метки времени:
+    так новое поколение не совпадёт со старым, фрагменты которого
+    ещё могут лежать в кэше.
+    """
+    key = _generation_key(name)
+    generation = cache.get(key)
+    if generation is None:
+        generation = int(time.time() * 1000)
+        if not cache.add(key, generation, None):
+            generation = cache.get(key, generation)
+    return generation
+
+
+def bump_generation(name):
+    key = _generation_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        generation = int(time.time() * 1000)
+        cache.set(key, generation, None)
+        return generation
+
+
+def get_or_compute(key, compute, timeout, stale_timeout=None,
+                   lock_timeout=None, lock_wait=None):
+    """Значение из кэша с защитой от одновременного пересчёта.
+
+    Пересчитывает ключ только тот процесс, который взял блокировку
+    (cache.add) на lock_timeout; остальные в течение stale_timeout после
+    истечения timeout отдают прежнее значение. При полном промахе они
+    ждут результата не дольше lock_wait, а затем считают сами: поток
+    запроса не простаивает, пока идёт долгий пересчёт.
+    """
+    if stale_timeout is None:
+        stale_timeout = settings.CACHE_STALE_TIMEOUT
+    if lock_timeout is None:
+        lock_timeout = settings.CACHE_LOCK_TIMEOUT
+    if lock_wait is None:
+        lock_wait = settings.CACHE_LOCK_WAIT
+    entry = cache.get(key)
+    if entry is not None and time.time() < entry[1]:
+        return entry[0]
+    lock_key = f'lock:{key}'
+    if cache.add(lock_key, True, lock_timeout):
+        try:
+            # Ключи кэша содержат поколение, сдвинутое записью в основную
+            # базу: значение под ним нельзя собирать из отставшей реплики
+            with routers.primary():
+                value = compute()
+            _store(key, value, timeout, stale_timeout)
+            return value
+        finally:
+            cache.delete(lock_key)
+    if entry is not None:
+        return entry[0]
+    return _wait_for(key, lock_wait, compute)
+
+
+def _store(key, value, timeout, stale_timeout):
+    if timeout is None:
+        cache.set(key, (value, float('inf')), None)
+    else:
+        cache.set(key, (value, time.time() + timeout), timeout + stale_timeout)
+
+
+def _wait_for(key, lock_wait, compute):
+    """Коротко ждёт значение от владельца блокировки, потом считает сам.
+
+    Своё значение в кэш не пишется: это сделает владелец блокировки.
+    """
+    deadline = time.time() + lock_wait
+    while time.time() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    with routers.primary():
+        return compute()
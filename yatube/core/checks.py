@@ -0,0 +1,119 @@
+"""Проверки настроек, которые мешают производительности.
+
+Запускаются командой manage.py check --deploy и при старте
+WSGI-процесса, если включён STARTUP_CHECKS.
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestFilesMixin
+from django.core.checks import Warning, register, run_checks
+from django.core.files.storage import get_storage_class
+
+logger = logging.getLogger(__name__)
+
+PERFORMANCE = 'performance'
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+DJANGO_TEMPLATES = 'django.template.backends.django.DjangoTemplates'
+PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(PERFORMANCE, deploy=True)
+def check_debug(app_configs, **kwargs):
+    if not settings.DEBUG:
+        return []
+    return [Warning(
+        'DEBUG = True: каждый SQL-запрос сохраняется в connection.queries '
+        'и память процесса растёт под нагрузкой.',
+        hint='Запускайте сервер с DJANGO_PROFILE=prod.',
+        id='core.W001',
+    )]
+
+
+@register(PERFORMANCE, deploy=True)
+def check_connections(app_configs, **kwargs):
+    return [
+        Warning(
+            f'База {alias}: CONN_MAX_AGE = 0, соединение открывается '
+            'заново в каждом запросе.',
+            hint='Задайте CONN_MAX_AGE или DB_CONN_MAX_AGE.',
+            id='core.W002',
+        )
+        for alias, database in settings.DATABASES.items()
+        if not database.get('CONN_MAX_AGE', 0)
+    ]
+
+
+def _uses_cached_loader(config):
+    options = config.get('OPTIONS', {})
+    loaders = options.get('loaders')
+    if loaders is None:
+        # Без явных loaders Django кэширует шаблоны вне отладки
+        return not options.get('debug', settings.DEBUG)
+    return any(
+        (loader[0] if isinstance(loader, (list, tuple)) else loader)
+        == CACHED_LOADER
+        for loader in loaders
+    )
+
+
+@register(PERFORMANCE, deploy=True)
+def check_template_loaders(app_configs, **kwargs):
+    return [
+        Warning(
+            'Шаблоны читаются с диска и компилируются при каждом рендере.',
+            hint=f'Используйте {CACHED_LOADER}.',
+            id='core.W003',
+        )
+        for config in settings.TEMPLATES
+        if config['BACKEND'] == DJANGO_TEMPLATES
+        and not _uses_cached_loader(config)
+    ]
+
+
+@register(PERFORMANCE, deploy=True)
+def check_cache(app_configs, **kwargs):
+    if settings.CACHES['default']['BACKEND'] not in PROCESS_CACHES:
+        return []
+    return [Warning(
+        'Кэш по умолчанию живёт внутри процесса: процессы сервера '
+        'не видят кэш и поколения данных друг друга.',
+        hint='Задайте CACHE_BACKEND=tiered, file или sqlite.',
+        id='core.W004',
+    )]
+
+
+@register(PERFORMANCE, deploy=True)
+def check_static_storage(app_configs, **kwargs):
+    storage = get_storage_class(settings.STATICFILES_STORAGE)
+    if issubclass(storage, ManifestFilesMixin):
+        return []
+    return [Warning(
+        'Имена статических файлов без хэша содержимого: браузеры '
+        'перепроверяют их при каждой загрузке страницы.',
+        hint='Используйте хранилище на основе ManifestFilesMixin.',
+        id='core.W005',
+    )]
+
+
+@register(PERFORMANCE, deploy=True)
+def check_thumbnails(app_configs, **kwargs):
+    if settings.THUMBNAIL_PREGENERATE != 'sync':
+        return []
+    return [Warning(
+        "THUMBNAIL_PREGENERATE = 'sync': картинки ресайзятся в запросе, "
+        'который создал пост.',
+        hint="Используйте 'thread' или 'off' с командой warm_thumbnails.",
+        id='core.W006',
+    )]
+
+
+def report():
+    """Пишет в лог все замечания проверок производительности."""
+    messages = run_checks(tags=[PERFORMANCE], include_deployment_checks=True)
+    for message in messages:
+        logger.warning('%s', message)
+    return messages
@@ -0,0 +1,8 @@
+from django.conf import settings
+
+
+def feed_cache_timeout(request):
+    """Добавляет время жизни кэша фрагментов лент из настроек."""
+    return {
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT
+    }
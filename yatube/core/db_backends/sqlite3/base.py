@@ -0,0 +1,49 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite с PRAGMA при подключении и настраиваемым BEGIN.
+
+    Кроме параметров sqlite3.connect, в OPTIONS понимает:
+
+    * pragmas — словарь PRAGMA, которые выполняются на каждом новом
+      соединении (journal_mode, synchronous, mmap_size, cache_size,
+      busy_timeout и т.п.);
+    * transaction_mode — как открывается транзакция atomic(). С IMMEDIATE
+      блокировка записи берётся сразу, и ждущий писатель уходит в
+      busy_timeout, а не падает с «database is locked» при попытке
+      повысить блокировку чтения посреди транзакции.
+    """
+
+    def get_connection_params(self):
+        options = self.settings_dict['OPTIONS']
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        self.pragmas = options.get('pragmas', {})
+        self.transaction_mode = options.get(
+            'transaction_mode', 'DEFERRED'
+        ).upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'transaction_mode должен быть одним из {TRANSACTION_MODES}'
+            )
+        return params
+
+    def init_connection_state(self):
+        super().init_connection_state()
+        for name, value in self.pragmas.items():
+            # Имена и значения приходят из настроек, а не от пользователя;
+            # PRAGMA не принимает параметры запроса
+            self.connection.execute(f'PRAGMA {name} = {value}')
+
+    def _start_transaction_under_autocommit(self):
+        # В общей памяти (тестовая база) блокировки потабличные и не ждут
+        # busy_timeout: ранняя блокировка записи там только мешает потокам
+        if self.is_in_memory_db():
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,127 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+from core import routers
+from core.caching import get_generation
+from core.upload_handlers import LimitedTemporaryFileUploadHandler
+
+PAGE_QUERY_PARAMS = ('page', 'after', 'before', 'order')
+
+
+def cache_anonymous_page(generation, last_modified_func):
+    """Кэширует страницу целиком для анонимных GET-запросов.
+
+    Ключ — поколение generation, путь и параметры страницы. ETag
+    выводится из того же ключа, Last-Modified — из last_modified_func
+    (datetime или None), который вызывается только при сборке страницы.
+    На условные запросы с совпавшими валидаторами отвечает 304.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            params = ':'.join(
+                request.GET.get(name, '') for name in PAGE_QUERY_PARAMS
+            )
+            version = get_generation(generation)
+            key = 'page:' + hashlib.md5(
+                f'{version}:{request.path}:{params}'.encode()
+            ).hexdigest()
+            cached = cache.get(key)
+            if cached is None:
+                # Страница попадёт в кэш под новым поколением — собираем
+                # её из основной базы, а не из возможно отставшей реплики
+                with routers.primary():
+                    response = view(request, *args, **kwargs)
+                    if (response.status_code != 200 or response.streaming
+                            or response.cookies):
+                        return response
+                    last_modified = last_modified_func(
+                        request, *args, **kwargs
+                    )
+                cached = (
+                    response.content,
+                    response['Content-Type'],
+                    last_modified and int(last_modified.timestamp()),
+                )
+                cache.set(key, cached, settings.FEED_CACHE_TIMEOUT)
+            content, content_type, last_modified = cached
+            etag = quote_etag(key[len('page:'):])
+            not_modified = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            response = not_modified or HttpResponse(
+                content, content_type=content_type
+            )
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
+
+
+def read_from_replica(view):
+    """GET-запросы к представлению читают из реплики.
+
+    Если клиент недавно что-то записал (есть кука STICKY_PRIMARY_COOKIE),
+    он читает из основной базы и видит свои изменения.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (request.method not in ('GET', 'HEAD')
+                or settings.STICKY_PRIMARY_COOKIE in request.COOKIES):
+            return view(request, *args, **kwargs)
+        with routers.replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def stick_to_primary(view):
+    """После записи клиент какое-то время читает из основной базы.
+
+    Кука ставится, только если view действительно писала в базу:
+    редирект анонима на вход или не автора со страницы правки
+    не уводит клиента с реплик.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with routers.track_writes() as writes:
+            response = view(request, *args, **kwargs)
+        if writes:
+            response.set_cookie(
+                settings.STICKY_PRIMARY_COOKIE, '1',
+                max_age=settings.STICKY_PRIMARY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+    return wrapper
+
+
+def limited_uploads(view):
+    """Файлы view пишутся сразу на диск и не хранятся сверх лимита.
+
+    Обработчики меняются только для этой view, админка и прочие формы
+    получают файлы целиком. CsrfViewMiddleware читает request.POST ещё
+    до view, поэтому проверка CSRF переносится внутрь, после замены.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers = [
+            LimitedTemporaryFileUploadHandler(request),
+        ]
+        return protected(request, *args, **kwargs)
+    return wrapper
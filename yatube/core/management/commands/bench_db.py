@@ -0,0 +1,162 @@
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+ALIAS = 'bench'
+# Настройки до тюнинга: журнал отката, BEGIN DEFERRED, таймаут по умолчанию
+LEGACY_DATABASE = {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}}
+
+
+def use_database(path, legacy):
+    config = LEGACY_DATABASE if legacy else settings.DATABASES['default']
+    connections.close_all()
+    connections.databases[ALIAS] = {
+        **config, 'NAME': path, 'CONN_MAX_AGE': None,
+    }
+    connections.ensure_defaults(ALIAS)
+    connections.prepare_test_settings(ALIAS)
+    # Соединения хранятся в threading.local: старые закрыты выше
+    if hasattr(connections._connections, ALIAS):
+        delattr(connections._connections, ALIAS)
+
+
+def seed(authors=50, posts=2000):
+    User.objects.using(ALIAS).bulk_create(
+        User(username=f'bench_{index}') for index in range(authors)
+    )
+    author_ids = list(User.objects.using(ALIAS).values_list('pk', flat=True))
+    Group.objects.using(ALIAS).create(
+        title='bench', slug='bench', description=''
+    )
+    Post.objects.using(ALIAS).bulk_create(
+        Post(text=f'Пост {index}', author_id=author_ids[index % authors])
+        for index in range(posts)
+    )
+    return author_ids
+
+
+class Worker(threading.Thread):
+    def __init__(self, action, deadline):
+        super().__init__()
+        self.action = action
+        self.deadline = deadline
+        self.latencies = []
+        self.errors = 0
+
+    def run(self):
+        try:
+            while time.monotonic() < self.deadline:
+                started = time.monotonic()
+                try:
+                    self.action()
+                except OperationalError:
+                    self.errors += 1
+                    continue
+                self.latencies.append(time.monotonic() - started)
+        finally:
+            connections[ALIAS].close()
+
+
+def read_page():
+    list(Post.objects.using(ALIAS).select_related('author', 'group')[:10])
+
+
+def make_writer(author_ids):
+    def write_post():
+        # Чтение, затем запись в одной транзакции — как у post_create
+        # со счётчиками: здесь DEFERRED падает на повышении блокировки
+        with transaction.atomic(using=ALIAS):
+            group = Group.objects.using(ALIAS).get(slug='bench')
+            Post.objects.using(ALIAS).bulk_create([Post(
+                text='Новый пост', author_id=author_ids[0], group=group,
+            )])
+            Group.objects.using(ALIAS).filter(pk=group.pk).update(
+                posts_count=F('posts_count') + 1
+            )
+    return write_post
+
+
+def percentile(values, share):
+    if not values:
+        return 0
+    return sorted(values)[min(int(len(values) * share), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест SQLite: читатели и писатели параллельно, '
+        'с текущими настройками базы и без тюнинга'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+
+    def handle(self, *args, readers, writers, seconds, **options):
+        workdir = tempfile.mkdtemp()
+        try:
+            for legacy in (True, False):
+                path = os.path.join(workdir, f'bench-{legacy}.sqlite3')
+                use_database(path, legacy)
+                call_command('migrate', database=ALIAS, verbosity=0)
+                author_ids = seed()
+                connections[ALIAS].close()
+                self.report(
+                    'без тюнинга' if legacy else 'текущие настройки',
+                    self.run_load(readers, writers, seconds, author_ids),
+                    seconds,
+                )
+        finally:
+            connections.close_all()
+            connections.databases.pop(ALIAS, None)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    @staticmethod
+    def run_load(readers, writers, seconds, author_ids):
+        deadline = time.monotonic() + seconds
+        workers = {
+            'чтение': [Worker(read_page, deadline) for _ in range(readers)],
+            'запись': [
+                Worker(make_writer(author_ids), deadline)
+                for _ in range(writers)
+            ],
+        }
+        for group in workers.values():
+            for worker in group:
+                worker.start()
+        for group in workers.values():
+            for worker in group:
+                worker.join()
+        return {
+            kind: (
+                [latency for worker in group for latency in worker.latencies],
+                sum(worker.errors for worker in group),
+            )
+            for kind, group in workers.items()
+        }
+
+    def report(self, title, results, seconds):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        for kind, (latencies, errors) in results.items():
+            median = statistics.median(latencies) if latencies else 0
+            self.stdout.write(
+                f'  {kind:<7} {len(latencies) / seconds:>8.0f} оп/с  '
+                f'p50 {median * 1000:>7.2f} мс  '
+                f'p99 {percentile(latencies, 0.99) * 1000:>8.2f} мс  '
+                f'ошибок «database is locked»: {errors}'
+            )
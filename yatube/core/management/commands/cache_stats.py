@@ -0,0 +1,23 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cache_backends import TieredCache, read_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кэша по уровням'
+
+    def handle(self, *args, **options):
+        cache = caches['default']
+        if not isinstance(cache, TieredCache):
+            raise CommandError(
+                'Статистика собирается только при CACHE_BACKEND=tiered'
+            )
+        cache.flush_stats()
+        for (tier, namespace), stats in read_stats(cache.shared).items():
+            total = stats['hits'] + stats['misses']
+            ratio = stats['hits'] / total if total else 0
+            self.stdout.write(
+                f'{tier:<7} {namespace:<10} hits={stats["hits"]:<8} '
+                f'misses={stats["misses"]:<8} hit_ratio={ratio:.1%}'
+            )
@@ -0,0 +1,35 @@
+import sqlite3
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def replica_path(name):
+    """Путь к файлу реплики из URI вида file:/path?mode=ro."""
+    return urlsplit(name).path if name.startswith('file:') else name
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в файлы реплик из DB_REPLICAS'
+
+    def handle(self, *args, **options):
+        if not settings.READ_REPLICAS:
+            raise CommandError('Реплики не настроены: задайте DB_REPLICAS')
+        source = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        try:
+            for alias in settings.READ_REPLICAS:
+                path = replica_path(settings.DATABASES[alias]['NAME'])
+                target = sqlite3.connect(path, timeout=30)
+                try:
+                    # Резервное копирование SQLite даёт согласованный
+                    # снимок, даже пока в основную базу пишут
+                    source.backup(target)
+                    # Реплика открывается только на чтение, а WAL требует
+                    # записи в -shm: переводим копию на обычный журнал
+                    target.execute('PRAGMA journal_mode = DELETE')
+                finally:
+                    target.close()
+                self.stdout.write(self.style.SUCCESS(f'{alias}: {path}'))
+        finally:
+            source.close()
@@ -0,0 +1,79 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Сессии и пользователи читаются при каждом запросе сразу после входа
+# или регистрации; отставшая реплика разлогинила бы пользователя
+PRIMARY_ONLY_APPS = ('sessions', 'auth')
+
+_state = threading.local()
+
+
+@contextmanager
+def replica_reads():
+    """Чтения внутри блока уходят в одну случайную реплику.
+
+    Реплика выбирается один раз: все запросы страницы видят один
+    и тот же снимок данных.
+    """
+    previous = getattr(_state, 'replica', None)
+    replicas = settings.READ_REPLICAS
+    _state.replica = random.choice(replicas) if replicas else None
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+@contextmanager
+def primary():
+    """Чтения внутри блока идут в основную базу, даже на странице-реплике."""
+    previous = getattr(_state, 'replica', None)
+    _state.replica = None
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+@contextmanager
+def track_writes():
+    """Список моделей, которые записывались в основную базу внутри блока."""
+    previous = getattr(_state, 'writes', None)
+    _state.writes = writes = []
+    try:
+        yield writes
+    finally:
+        _state.writes = previous
+
+
+class ReplicaRouter:
+    """Запись — всегда в основную базу, чтение — в реплику, если разрешено.
+
+    По умолчанию всё идёт в основную базу: реплики читаются только
+    внутри replica_reads() и не внутри транзакции, чтобы не смешать
+    данные реплики с ещё не закоммиченной записью.
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = getattr(_state, 'replica', None)
+        if (replica is None or model._meta.app_label in PRIMARY_ONLY_APPS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        writes = getattr(_state, 'writes', None)
+        if writes is not None:
+            writes.append(model._meta.label)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, объекты из них совместимы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,141 @@
+"""Раздача собранной статики прямо из WSGI-процесса.
+
+Файлы STATIC_ROOT индексируются один раз при старте. Для каждого
+запроса выбирается готовый сжатый вариант по Accept-Encoding (br,
+затем gzip); имена с хэшем содержимого кэшируются навсегда.
+"""
+import mimetypes
+import os
+from email.utils import formatdate
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+# Расширение сжатого файла и Content-Encoding в порядке предпочтения
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+TEXT_TYPES = ('application/javascript', 'application/json', 'image/svg+xml')
+BLOCK_SIZE = 64 * 1024
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме запрещённых через q=0."""
+    accepted = set()
+    for token in header.split(','):
+        encoding, _, parameter = token.partition(';')
+        name, _, value = parameter.partition('=')
+        if name.strip() == 'q':
+            try:
+                if not float(value):
+                    continue
+            except ValueError:
+                continue
+        accepted.add(encoding.strip().lower())
+    return accepted
+
+
+class StaticFile:
+    def __init__(self, path, immutable):
+        self.immutable = immutable
+        content_type, _ = mimetypes.guess_type(path)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in TEXT_TYPES:
+            content_type += '; charset=utf-8'
+        self.content_type = content_type
+        # Content-Encoding -> (путь, размер, ETag); None — без сжатия
+        self.variants = {None: self.variant(path, 'identity')}
+        for extension, encoding in ENCODINGS:
+            if os.path.exists(path + extension):
+                self.variants[encoding] = self.variant(
+                    path + extension, encoding
+                )
+        self.last_modified = formatdate(
+            os.stat(path).st_mtime, usegmt=True
+        )
+
+    @staticmethod
+    def variant(path, encoding):
+        stat = os.stat(path)
+        etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}-{encoding}"'
+        return path, stat.st_size, etag
+
+    def choose(self, accept_encoding):
+        accepted = accepted_encodings(accept_encoding)
+        for _, encoding in ENCODINGS:
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return None
+
+
+def scan(root):
+    """Файлы root по URL-путям; сжатые варианты — при своих исходниках."""
+    hashed = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+    compressed = tuple(extension for extension, _ in ENCODINGS)
+    files = {}
+    for directory, _, names in os.walk(root):
+        for filename in names:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            if filename.endswith(compressed) and os.path.exists(
+                path.rsplit('.', 1)[0]
+            ):
+                continue
+            files[name] = StaticFile(path, immutable=name in hashed)
+    return files
+
+
+class StaticFilesHandler:
+    """WSGI-обёртка: отдаёт STATIC_URL сама, остальное — приложению."""
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        self.prefix = prefix or settings.STATIC_URL
+        self.files = scan(root or settings.STATIC_ROOT)
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        static = path.startswith(self.prefix) and self.files.get(
+            path[len(self.prefix):]
+        )
+        if not static:
+            return self.application(environ, start_response)
+        method = environ['REQUEST_METHOD']
+        if method not in ('GET', 'HEAD'):
+            start_response('405 Method Not Allowed', [
+                ('Allow', 'GET, HEAD'), ('Content-Length', '0'),
+            ])
+            return []
+        encoding = static.choose(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        file_path, size, etag = static.variants[encoding]
+        headers = self.headers(static, encoding, etag)
+        if etag in environ.get('HTTP_IF_NONE_MATCH', ''):
+            start_response('304 Not Modified', headers)
+            return []
+        headers.append(('Content-Length', str(size)))
+        start_response('200 OK', headers)
+        if method == 'HEAD':
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(open(file_path, 'rb'), BLOCK_SIZE)
+
+    @staticmethod
+    def headers(static, encoding, etag):
+        if static.immutable:
+            cache_control = (
+                f'public, max-age={settings.STATIC_IMMUTABLE_MAX_AGE}, '
+                'immutable'
+            )
+        else:
+            cache_control = f'public, max-age={settings.STATIC_MAX_AGE}'
+        headers = [
+            ('Content-Type', static.content_type),
+            ('Cache-Control', cache_control),
+            ('ETag', etag),
+            ('Last-Modified', static.last_modified),
+        ]
+        if len(static.variants) > 1:
+            # Ответ зависит от Accept-Encoding: кэши хранят варианты отдельно
+            headers.append(('Vary', 'Accept-Encoding'))
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        return headers
@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import os
+import re
+import tempfile
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Имена вида posts/ab/<sha256>.jpg
+CONTENT_ADDRESSED_NAME = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+
+
+def is_content_addressed(name):
+    return CONTENT_ADDRESSED_NAME.search(name) is not None
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы лежат по SHA-256 содержимого: одинаковые загрузки — один файл.
+
+    Имя из upload_to даёт только каталог и расширение. Файл с таким
+    содержимым уже есть — запись пропускается, но mtime обновляется:
+    по нему collect_media отсчитывает срок, после которого файл без
+    ссылок можно удалить. Проверять коллизии имён не нужно, перезапись
+    теми же байтами безопасна.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        digest = content_hash(content)
+        name = os.path.join(directory, digest[:2], f'{digest}{extension}')
+        return self._save(name, content)
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        try:
+            os.utime(full_path)
+        except FileNotFoundError:
+            pass
+        else:
+            return name
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        if hasattr(content, 'temporary_file_path'):
+            file_move_safe(
+                content.temporary_file_path(), full_path,
+                allow_overwrite=True,
+            )
+        else:
+            # Через временный файл в том же каталоге: читатели никогда
+            # не видят недописанный файл
+            descriptor, temporary_path = tempfile.mkstemp(
+                dir=directory, prefix='.upload-'
+            )
+            with os.fdopen(descriptor, 'wb') as destination:
+                for chunk in content.chunks():
+                    destination.write(chunk)
+            os.replace(temporary_path, full_path)
+        # Временные файлы создаются с правами 0600
+        os.chmod(full_path, self.file_permissions_mode or 0o644)
+        return name
+
+
+# Расширения сжатых вариантов статики, которые может оставить collectstatic
+COMPRESSED_EXTENSIONS = ('.gz', '.br')
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.map', '.svg', '.txt', '.html', '.json', '.xml', '.ico',
+)
+# Вариант, который экономит меньше, не стоит лишнего файла
+MIN_COMPRESSION_RATIO = 0.95
+
+
+def compressors():
+    """Сжатые варианты статики: расширение файла и функция сжатия.
+
+    brotli нужен только collectstatic, поэтому импортируется здесь:
+    без него собираются одни .gz-варианты.
+    """
+    found = {'.gz': lambda data: gzip.compress(data, 9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        return found
+    found['.br'] = lambda data: brotli.compress(data, quality=11)
+    return found
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хэшем содержимого в имени и сжатыми вариантами рядом.
+
+    collectstatic кладёт рядом с каждым текстовым файлом style.css
+    файлы style.css.gz и, если установлен brotli, style.css.br — их
+    отдаёт core.static.StaticFilesHandler без сжатия в запросе.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                for compressed_name in self.compress(name):
+                    yield name, compressed_name, True
+
+    def compress(self, name):
+        with self.open(name) as source:
+            data = source.read()
+        # Варианты прошлой сборки не должны пережить смену исходника,
+        # даже если их сжатие теперь недоступно
+        for extension in COMPRESSED_EXTENSIONS:
+            if self.exists(name + extension):
+                self.delete(name + extension)
+        for extension, compress in compressors().items():
+            compressed_name = name + extension
+            compressed = compress(data)
+            if len(compressed) < len(data) * MIN_COMPRESSION_RATIO:
+                with open(self.path(compressed_name), 'wb') as destination:
+                    destination.write(compressed)
+                yield compressed_name
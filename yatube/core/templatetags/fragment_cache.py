@@ -0,0 +1,58 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core.caching import get_or_compute
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, expire_time_var, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.expire_time_var = expire_time_var
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        try:
+            expire_time = self.expire_time_var.resolve(context)
+        except template.VariableDoesNotExist:
+            raise template.TemplateSyntaxError(
+                f'"fragment_cache" tag got an unknown variable: '
+                f'{self.expire_time_var.var!r}'
+            )
+        if expire_time is not None:
+            try:
+                expire_time = int(expire_time)
+            except (ValueError, TypeError):
+                raise template.TemplateSyntaxError(
+                    f'"fragment_cache" tag got a non-integer timeout '
+                    f'value: {expire_time!r}'
+                )
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+        return get_or_compute(
+            key, lambda: self.nodelist.render(context), expire_time
+        )
+
+
+@register.tag('fragment_cache')
+def do_fragment_cache(parser, token):
+    """Как {% cache %}, но с single-flight и stale-while-revalidate.
+
+    {% fragment_cache [timeout] [name] [vary on] %} ...
+    {% endfragment_cache %}
+    """
+    nodelist = parser.parse(('endfragment_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 2 arguments."
+        )
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+    )
@@ -0,0 +1,38 @@
+"""Прогрев кэша шаблонов при старте процесса.
+
+С кэширующим загрузчиком шаблон читается с диска и компилируется
+при первом обращении, то есть в первом запросе каждой страницы.
+warm_up() делает это заранее для всех шаблонов каталогов DIRS.
+"""
+import logging
+import os
+
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(directory):
+    for root, _, files in os.walk(directory):
+        for name in files:
+            yield os.path.relpath(
+                os.path.join(root, name), directory
+            ).replace(os.sep, '/')
+
+
+def warm_up():
+    """Компилирует шаблоны DIRS; возвращает число загруженных."""
+    loaded = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for directory in backend.engine.dirs:
+            for name in sorted(template_names(directory)):
+                try:
+                    backend.engine.get_template(name)
+                except TemplateSyntaxError:
+                    logger.exception('Шаблон %s не компилируется', name)
+                    continue
+                loaded += 1
+    return loaded
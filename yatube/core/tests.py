@@ -0,0 +1,626 @@
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock, skipUnless
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.http import Http404, HttpResponse
+from django.shortcuts import redirect
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import checks, routers
+from core.cache_backends import (
+    FileCache, SQLiteCache, TieredCache, read_stats,
+)
+from core.caching import get_or_compute
+from core.db_backends.sqlite3.base import DatabaseWrapper
+from core.decorators import read_from_replica, stick_to_primary
+from core.static import StaticFilesHandler
+from core.storage import ContentAddressedStorage, is_content_addressed
+from core.templating import template_names, warm_up
+from core.views import serve_media
+from posts.models import Post
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = SQLiteCache(f'{self.directory}/cache.sqlite3', {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_set_get_delete(self):
+        """Значения сохраняются, читаются и удаляются."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expired_value_is_missing(self):
+        """Истёкшее значение не отдаётся и не мешает add."""
+        self.cache.set('key', 'value', 10)
+        with mock.patch('core.cache_backends.time.time',
+                        return_value=time.time() + 20):
+            self.assertIsNone(self.cache.get('key'))
+            self.assertTrue(self.cache.add('key', 'new'))
+
+    def test_add_and_incr(self):
+        """add не перезаписывает живой ключ, incr атомарно прибавляет."""
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 5))
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_shared_between_instances(self):
+        """Два экземпляра (процесса) видят одни и те же данные."""
+        other = SQLiteCache(f'{self.directory}/cache.sqlite3', {})
+        self.cache.set('key', 'value')
+        self.assertEqual(other.get('key'), 'value')
+
+    def test_many_operations_are_batched(self):
+        """get_many, set_many и delete_many — по одному запросу."""
+        statements = []
+        self.cache._connection().set_trace_callback(statements.append)
+
+        def executed(prefix):
+            # Триггеры повторяют в трассировке текст своей команды
+            distinct = {sql for sql in statements if sql.startswith(prefix)}
+            statements.clear()
+            return len(distinct)
+
+        self.cache.set_many({'a': 1, 'b': 2, 'c': 3}, 10)
+        self.assertEqual(executed('BEGIN'), 1)
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'missing']), {'a': 1, 'b': 2}
+        )
+        self.assertEqual(executed('SELECT'), 1)
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(executed('DELETE'), 1)
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']), {'c': 3})
+        with mock.patch('core.cache_backends.time.time',
+                        return_value=time.time() + 20):
+            self.assertEqual(self.cache.get_many(['c']), {})
+
+    def test_culled_when_over_limit(self):
+        """Лишние записи удаляются при первом же превышении MAX_ENTRIES."""
+        cache = SQLiteCache(f'{self.directory}/culled.sqlite3', {
+            'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 5},
+        })
+        connection = cache._connection()
+
+        def count():
+            return connection.execute(
+                'SELECT COUNT(*) FROM cache'
+            ).fetchone()[0]
+
+        for number in range(10):
+            cache.set(f'key{number}', number)
+        # Перезапись и удаление поддерживают счётчик без COUNT(*)
+        cache.set('key0', 'again')
+        cache.delete('key1')
+        cache.add('key1', 1)
+        self.assertEqual(cache._entries(connection), count())
+        self.assertEqual(count(), 10)
+        cache.set('key10', 10)
+        self.assertEqual(count(), 9)
+        self.assertEqual(cache._entries(connection), 9)
+        self.assertEqual(cache.get('key10'), 10)
+
+
+class FileCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = FileCache(self.directory, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def run_in_threads(self, target, count=8):
+        threads = [threading.Thread(target=target) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_concurrent_incr_keeps_every_delta(self):
+        """Параллельные incr из разных экземпляров не теряют сдвигов."""
+        self.cache.set('counter', 0)
+
+        def bump():
+            other = FileCache(self.directory, {})
+            for _ in range(50):
+                other.incr('counter')
+
+        self.run_in_threads(bump)
+        self.assertEqual(self.cache.get('counter'), 400)
+
+    def test_concurrent_add_succeeds_once(self):
+        """Из параллельных add одного ключа удаётся ровно один."""
+        results = []
+
+        def add():
+            other = FileCache(self.directory, {})
+            results.append(other.add('lock', True))
+
+        self.run_in_threads(add)
+        self.assertEqual(results.count(True), 1)
+
+
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.shared = LocMemCache('tiered-test-shared', {})
+        self.shared.clear()
+        patcher = mock.patch.object(
+            TieredCache, 'shared', new_callable=mock.PropertyMock,
+            return_value=self.shared,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = TieredCache('test', {})
+
+    def test_local_tier_serves_repeated_reads(self):
+        """Повторное чтение обслуживает локальный уровень."""
+        self.shared.set('template.cache.page', 'html')
+        self.assertEqual(self.cache.get('template.cache.page'), 'html')
+        self.shared.delete('template.cache.page')
+        self.assertEqual(self.cache.get('template.cache.page'), 'html')
+        self.cache.flush_stats()
+        stats = read_stats(self.shared)
+        self.assertEqual(
+            stats['local', 'fragments'], {'hits': 1, 'misses': 1}
+        )
+        self.assertEqual(
+            stats['shared', 'fragments'], {'hits': 1, 'misses': 0}
+        )
+
+    def test_get_many_batches_both_tiers(self):
+        """get_many берёт промахи локального уровня одним get_many общего."""
+        self.cache.set_many({'template.cache.a': 'a', 'generation:x': 1})
+        self.shared.set_many(
+            {'template.cache.b': 'b', 'template.cache.c': 'c'}
+        )
+        keys = [
+            'template.cache.a', 'template.cache.b', 'template.cache.c',
+            'template.cache.missing', 'generation:x',
+        ]
+        with mock.patch.object(
+            self.shared, 'get_many', wraps=self.shared.get_many
+        ) as get_many:
+            values = self.cache.get_many(keys)
+        self.assertEqual(values, {
+            'template.cache.a': 'a', 'template.cache.b': 'b',
+            'template.cache.c': 'c', 'generation:x': 1,
+        })
+        get_many.assert_called_once_with(keys[1:], version=None)
+        self.shared.delete_many(keys)
+        self.assertEqual(self.cache.get_many(keys), {
+            'template.cache.a': 'a', 'template.cache.b': 'b',
+            'template.cache.c': 'c',
+        })
+        self.cache.delete_many(keys)
+        self.assertEqual(self.cache.get_many(keys), {})
+
+    def test_delete_leaves_other_local_tiers(self):
+        """Удаление в одном процессе другой видит через LOCAL_TIMEOUT."""
+        other = TieredCache('test-other', {})
+        self.cache.set('template.cache.page', 'html')
+        self.assertEqual(other.get('template.cache.page'), 'html')
+        self.cache.delete('template.cache.page')
+        self.assertIsNone(self.cache.get('template.cache.page'))
+        self.assertEqual(other.get('template.cache.page'), 'html')
+        expired = time.time() + other._local_timeout + 1
+        with mock.patch('time.time', return_value=expired):
+            self.assertIsNone(other.get('template.cache.page'))
+
+    def test_generation_keys_bypass_local_tier(self):
+        """Поколения читаются из общего уровня без задержки."""
+        self.cache.set('generation:posts', 1)
+        self.shared.incr('generation:posts')
+        self.assertEqual(self.cache.get('generation:posts'), 2)
+
+
+class GetOrComputeTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_fresh_value_is_not_recomputed(self):
+        """Свежее значение берётся из кэша."""
+        compute = mock.Mock(return_value='value')
+        get_or_compute('key', compute, 60)
+        self.assertEqual(get_or_compute('key', compute, 60), 'value')
+        compute.assert_called_once()
+
+    def test_stale_value_served_while_locked(self):
+        """Пока ключ пересчитывает другой процесс, отдаётся прежнее."""
+        with mock.patch('core.caching.time.time', return_value=1000):
+            get_or_compute('key', lambda: 'old', 10)
+        cache.add('lock:key', True)
+        compute = mock.Mock(return_value='new')
+        with mock.patch('core.caching.time.time', return_value=1020):
+            self.assertEqual(get_or_compute('key', compute, 10), 'old')
+        compute.assert_not_called()
+
+    def test_stale_value_recomputed_by_lock_owner(self):
+        """Взявший блокировку процесс пересчитывает устаревший ключ."""
+        with mock.patch('core.caching.time.time', return_value=1000):
+            get_or_compute('key', lambda: 'old', 10)
+        with mock.patch('core.caching.time.time', return_value=1020):
+            self.assertEqual(get_or_compute('key', lambda: 'new', 10), 'new')
+        self.assertIsNone(cache.get('lock:key'))
+
+    def test_miss_waits_for_lock_owner(self):
+        """При промахе под чужой блокировкой ждём готового значения."""
+        cache.add('lock:key', True)
+        compute = mock.Mock(return_value='own')
+
+        def sleep(seconds):
+            cache.set('key', ('shared', float('inf')))
+
+        with mock.patch('core.caching.time.sleep', side_effect=sleep):
+            self.assertEqual(get_or_compute('key', compute, 10), 'shared')
+        compute.assert_not_called()
+
+    @override_settings(CACHE_LOCK_WAIT=0.1)
+    def test_miss_computed_after_short_wait(self):
+        """Чужой долгий пересчёт ждём недолго, потом считаем сами."""
+        cache.add('lock:key', True)
+        started = time.monotonic()
+        self.assertEqual(get_or_compute('key', lambda: 'own', 10), 'own')
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertIsNone(cache.get('key'))
+
+
+class ContentAddressedStorageTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_identical_content_stored_once(self):
+        """Одинаковое содержимое под разными именами — один файл."""
+        first = self.storage.save('posts/a.gif', ContentFile(b'same'))
+        second = self.storage.save('posts/b.GIF', ContentFile(b'same'))
+        other = self.storage.save('posts/a.gif', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(first.startswith('posts/'))
+        self.assertTrue(first.endswith('.gif'))
+        self.assertTrue(is_content_addressed(first))
+        self.assertEqual(self.storage.open(first).read(), b'same')
+
+    def test_immutable_cache_headers(self):
+        """Файлы по хэшу отдаются с Cache-Control: immutable."""
+        name = self.storage.save('posts/a.gif', ContentFile(b'same'))
+        plain = self.storage.path('posts/plain.gif')
+        with open(plain, 'wb') as file:
+            file.write(b'plain')
+        with override_settings(MEDIA_ROOT=self.directory, MEDIA_SERVE=True):
+            response = self.client.get(settings.MEDIA_URL + name)
+            plain_response = self.client.get(
+                settings.MEDIA_URL + 'posts/plain.gif'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(plain_response.status_code, 200)
+        self.assertFalse(plain_response.has_header('Cache-Control'))
+
+    def test_media_served_only_when_enabled(self):
+        """Без DEBUG и MEDIA_SERVE картинки отдаёт внешний сервер."""
+        name = self.storage.save('posts/a.gif', ContentFile(b'same'))
+        request = RequestFactory().get('/')
+        with override_settings(MEDIA_ROOT=self.directory, MEDIA_SERVE=False):
+            with self.assertRaises(Http404):
+                serve_media(request, name)
+
+
+class SQLiteBackendTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.wrappers = []
+
+    def tearDown(self):
+        for wrapper in self.wrappers:
+            wrapper.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def connect(self, close=True):
+        wrapper = DatabaseWrapper({
+            **settings.DATABASES['default'],
+            'NAME': f'{self.directory}/db.sqlite3',
+            'AUTOCOMMIT': True,
+            'TIME_ZONE': None,
+        })
+        if close:
+            self.wrappers.append(wrapper)
+        return wrapper
+
+    def test_pragmas_applied(self):
+        """PRAGMA из OPTIONS выполняются на каждом соединении."""
+        cursor = self.connect().cursor()
+        for name, expected in (('journal_mode', 'wal'), ('synchronous', 1)):
+            with self.subTest(name=name):
+                cursor.execute(f'PRAGMA {name}')
+                self.assertEqual(cursor.fetchone()[0], expected)
+
+    def test_reads_continue_during_write(self):
+        """Читатель не ждёт открытой транзакции записи, писатель — ждёт."""
+        writer = self.connect()
+        writer.cursor().execute('CREATE TABLE item (value INTEGER)')
+        writer.cursor().execute('INSERT INTO item VALUES (1)')
+        writer._start_transaction_under_autocommit()
+        writer.cursor().execute('INSERT INTO item VALUES (2)')
+
+        reader = self.connect().cursor()
+        started = time.monotonic()
+        reader.execute('SELECT COUNT(*) FROM item')
+        self.assertEqual(reader.fetchone()[0], 1)
+        self.assertLess(time.monotonic() - started, 1)
+
+        done = threading.Event()
+
+        def write():
+            second = self.connect(close=False)
+            second._start_transaction_under_autocommit()
+            second.cursor().execute('INSERT INTO item VALUES (3)')
+            second.connection.commit()
+            second.close()
+            done.set()
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        self.assertFalse(done.wait(0.2))
+        writer.connection.commit()
+        thread.join(5)
+        self.assertTrue(done.is_set())
+        reader.execute('SELECT COUNT(*) FROM item')
+        self.assertEqual(reader.fetchone()[0], 3)
+
+
+@override_settings(READ_REPLICAS=['replica'])
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def read_db(self, request):
+        @read_from_replica
+        def view(request):
+            return HttpResponse(self.router.db_for_read(Post))
+        return view(request).content.decode()
+
+    def test_reads_outside_replica_block_use_primary(self):
+        """Без replica_reads() и для сессий с пользователями — основная."""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        with routers.replica_reads():
+            self.assertEqual(self.router.db_for_read(Post), 'replica')
+            self.assertEqual(
+                self.router.db_for_read(get_user_model()), 'default'
+            )
+            with routers.primary():
+                self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_cache_misses_read_primary(self):
+        """Промах кэша с поколением собирается из основной базы."""
+        with routers.replica_reads():
+            value = get_or_compute(
+                'router-test', lambda: self.router.db_for_read(Post), 1
+            )
+            self.assertEqual(self.router.db_for_read(Post), 'replica')
+        self.assertEqual(value, 'default')
+
+    def test_sticky_primary_after_write(self):
+        """После записи клиент читает из основной базы."""
+        self.assertEqual(self.read_db(self.factory.get('/')), 'replica')
+        self.assertEqual(self.read_db(self.factory.post('/')), 'default')
+
+        @stick_to_primary
+        def write(request):
+            if request.GET.get('invalid'):
+                return HttpResponse()
+            if not request.GET.get('redirect_only'):
+                # Модель сохраняется в базу, выбранную роутером для записи
+                self.router.db_for_write(Post)
+            return redirect('/')
+
+        self.assertFalse(write(self.factory.post('/?invalid=1')).cookies)
+        self.assertFalse(
+            write(self.factory.post('/?redirect_only=1')).cookies
+        )
+        cookie = write(self.factory.post('/')).cookies['primary']
+        self.assertEqual(cookie['max-age'], 10)
+        self.factory.cookies['primary'] = cookie.value
+        self.assertEqual(self.read_db(self.factory.get('/')), 'default')
+
+
+class TemplateWarmUpTest(SimpleTestCase):
+    def test_warm_up_fills_cached_loader(self):
+        """Прогрев компилирует все шаблоны в кэш загрузчика."""
+        from yatube.settings import prod
+
+        self.assertFalse(prod.DEBUG)
+        with override_settings(TEMPLATES=prod.TEMPLATES):
+            loader = engines['django'].engine.template_loaders[0]
+            self.assertIsInstance(loader, CachedLoader)
+            loaded = warm_up()
+            self.assertEqual(
+                loaded,
+                len(list(template_names(settings.TEMPLATES_DIR))),
+            )
+            self.assertIn(
+                'posts/includes/card.html', loader.get_template_cache
+            )
+
+
+class PerformanceChecksTest(SimpleTestCase):
+    def warnings(self):
+        return {message.id for message in checks.report()}
+
+    def test_prod_profile_passes(self):
+        """Профиль prod не вызывает замечаний."""
+        from yatube.settings import prod
+
+        with override_settings(
+            DEBUG=prod.DEBUG,
+            TEMPLATES=prod.TEMPLATES,
+            CACHES=prod.CACHES,
+            STATICFILES_STORAGE=prod.STATICFILES_STORAGE,
+            THUMBNAIL_PREGENERATE=prod.THUMBNAIL_PREGENERATE,
+        ), mock.patch.dict(
+            settings.DATABASES['default'],
+            CONN_MAX_AGE=prod.DATABASES['default']['CONN_MAX_AGE'],
+        ):
+            self.assertEqual(self.warnings(), set())
+
+    def test_hostile_settings_reported(self):
+        """Отладка, соединение на запрос и ресайз в запросе — замечания."""
+        with override_settings(
+            DEBUG=True, THUMBNAIL_PREGENERATE='sync',
+        ), mock.patch.dict(
+            settings.DATABASES['default'], CONN_MAX_AGE=0
+        ), self.assertLogs('core.checks', 'WARNING'):
+            self.assertEqual(self.warnings(), {
+                'core.W001', 'core.W002', 'core.W003', 'core.W004',
+                'core.W005', 'core.W006',
+            })
+
+
+class StaticFilesTest(SimpleTestCase):
+    CSS = 'body { color: #333; }\n' * 200
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        os.makedirs(os.path.join(self.source, 'css'))
+        with open(os.path.join(self.source, 'css', 'site.css'), 'w') as css:
+            css.write(self.CSS)
+        with open(os.path.join(self.source, 'logo.png'), 'wb') as logo:
+            logo.write(os.urandom(512))
+        overrides = override_settings(
+            STATICFILES_DIRS=[self.source],
+            STATIC_ROOT=self.root,
+            STATICFILES_STORAGE=(
+                'core.storage.CompressedManifestStaticFilesStorage'
+            ),
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.hashed = staticfiles_storage.stored_name('css/site.css')
+        self.handler = StaticFilesHandler(
+            lambda environ, start_response: [b'django']
+        )
+
+    def request(self, path, method='GET', **headers):
+        environ = {'PATH_INFO': path, 'REQUEST_METHOD': method, **headers}
+        setup_testing_defaults(environ)
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = status
+            response['headers'] = dict(headers)
+
+        body = self.handler(environ, start_response)
+        response['body'] = b''.join(body)
+        if hasattr(body, 'close'):
+            body.close()
+        return response
+
+    def test_collectstatic_compresses_text_files(self):
+        """Рядом с текстом лежат .gz, несжимаемые файлы — без вариантов."""
+        self.assertRegex(self.hashed, r'^css/site\.[0-9a-f]{12}\.css$')
+        for name in ('css/site.css', self.hashed):
+            with gzip.open(os.path.join(self.root, name + '.gz')) as file:
+                self.assertEqual(file.read().decode(), self.CSS)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.root, 'logo.png.gz')
+        ))
+
+    def test_serves_compressed_immutable_variant(self):
+        """Хэшированное имя: сжатый вариант, immutable и Vary."""
+        response = self.request(
+            f'/static/{self.hashed}', HTTP_ACCEPT_ENCODING='gzip, br;q=0'
+        )
+        headers = response['headers']
+        self.assertEqual(response['status'], '200 OK')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', headers['Cache-Control'])
+        self.assertEqual(headers['Content-Type'], 'text/css; charset=utf-8')
+        self.assertEqual(gzip.decompress(response['body']).decode(), self.CSS)
+        self.assertEqual(
+            self.request(
+                f'/static/{self.hashed}', HTTP_ACCEPT_ENCODING='gzip',
+                HTTP_IF_NONE_MATCH=headers['ETag'],
+            )['status'],
+            '304 Not Modified',
+        )
+
+    @skipUnless(brotli, 'brotli не установлен')
+    def test_serves_brotli_variant(self):
+        """collectstatic пишет .br, и он отдаётся на Accept-Encoding: br."""
+        with open(os.path.join(self.root, self.hashed + '.br'), 'rb') as file:
+            self.assertEqual(brotli.decompress(file.read()).decode(), self.CSS)
+        response = self.request(
+            f'/static/{self.hashed}', HTTP_ACCEPT_ENCODING='gzip, br'
+        )
+        self.assertEqual(response['headers']['Content-Encoding'], 'br')
+        self.assertEqual(
+            brotli.decompress(response['body']).decode(), self.CSS
+        )
+
+    def test_gzip_only_without_brotli(self):
+        """Без brotli собираются .gz, а прежние .br удаляются."""
+        with mock.patch.dict(sys.modules, {'brotli': None}):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        path = os.path.join(self.root, self.hashed)
+        self.assertTrue(os.path.exists(path + '.gz'))
+        self.assertFalse(os.path.exists(path + '.br'))
+        # Обработчик запоминает файлы статики при запуске
+        self.handler = StaticFilesHandler(
+            lambda environ, start_response: [b'django']
+        )
+        response = self.request(
+            f'/static/{self.hashed}', HTTP_ACCEPT_ENCODING='gzip, br'
+        )
+        self.assertEqual(response['headers']['Content-Encoding'], 'gzip')
+
+    def test_plain_and_unknown_requests(self):
+        """Без хэша — короткий кэш, чужие пути уходят приложению."""
+        response = self.request('/static/css/site.css')
+        self.assertNotIn('Content-Encoding', response['headers'])
+        self.assertEqual(response['body'].decode(), self.CSS)
+        self.assertEqual(
+            response['headers']['Cache-Control'], 'public, max-age=60'
+        )
+        self.assertEqual(self.request('/static/missing.css')['body'],
+                         b'django')
+        self.assertEqual(self.request('/posts/')['body'], b'django')
+        self.assertEqual(
+            self.request('/static/css/site.css', method='POST')['status'],
+            '405 Method Not Allowed',
+        )
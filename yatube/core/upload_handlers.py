@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку во временный файл и не хранит больше лимита.
+
+    Файл целиком никогда не попадает в память: чанки сразу уходят на
+    диск. Всё, что сверх UPLOAD_MAX_BYTES, отбрасывается, но size
+    остаётся настоящим — форма увидит превышение и вернёт ошибку.
+    """
+
+    def receive_data_chunk(self, raw_data, start):
+        room = settings.UPLOAD_MAX_BYTES + 1 - start
+        if room > 0:
+            self.file.write(raw_data[:room])
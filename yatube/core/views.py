@@ -1,4 +1,9 @@
+from django.conf import settings
+from django.http import Http404
 from django.shortcuts import render
+from django.views.static import serve
+
+from .storage import is_content_addressed
 
 
 def page_not_found(request, exception):
@@ -11,3 +16,19 @@ def csrf_failure(request, reason=''):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def serve_media(request, path):
+    """Раздаёт MEDIA_ROOT; файлы по хэшу содержимого никогда не меняются.
+
+    Работает при DEBUG или MEDIA_SERVE; иначе картинки отдаёт внешний
+    веб-сервер.
+    """
+    if not (settings.DEBUG or settings.MEDIA_SERVE):
+        raise Http404
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if is_content_addressed(path):
+        response['Cache-Control'] = (
+            f'public, max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, immutable'
+        )
+    return response
@@ -1,5 +1,7 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
 
+from . import search
 from .models import Group, Post
 
 
@@ -33,5 +35,22 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по индексу вместо LIKE '%...%' по всей таблице.
+
+        Индекс отдаёт не больше SEARCH_MAX_RESULTS самых релевантных
+        постов; если выдача упёрлась в предел, админ видит предупреждение.
+        """
+        if not search_term:
+            return queryset, False
+        post_ids = search.search(search_term)
+        if len(post_ids) >= settings.SEARCH_MAX_RESULTS:
+            messages.warning(
+                request,
+                f'Показаны {settings.SEARCH_MAX_RESULTS} самых релевантных '
+                'постов; уточните запрос, чтобы увидеть остальные.',
+            )
+        return queryset.filter(pk__in=post_ids), False
+
 
 admin.site.register(Post, PostAdmin)
@@ -0,0 +1,190 @@
+"""JSON API для чтения лент, постов и комментариев.
+
+Отдаёт те же данные, что и HTML-страницы, но без шаблонов: страницы
+по курсору (after/before), набор полей через fields=id,text,...
+и ETag из тех же сигнатур, что и у HTML-страниц.
+"""
+import json
+
+from django.http import HttpResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_safe
+
+from core.decorators import read_from_replica
+from . import freshness
+from .functions import comments_get_page, cursor_get_page
+from .models import Group, Post, User
+
+CONTENT_TYPE = 'application/json; charset=utf-8'
+
+
+def _image(post, request):
+    return request.build_absolute_uri(post.image.url) if post.image else None
+
+
+# Поле ответа: (значение, колонки для only(), связи для select_related())
+POST_FIELDS = {
+    'id': (lambda post, request: post.pk, (), ()),
+    'text': (lambda post, request: post.text, ('text',), ()),
+    'pub_date': (
+        lambda post, request: post.pub_date.isoformat(), ('pub_date',), (),
+    ),
+    'author': (
+        lambda post, request: post.author.username,
+        ('author__username',), ('author',),
+    ),
+    'group': (
+        lambda post, request: post.group and post.group.slug,
+        ('group__slug',), ('group',),
+    ),
+    'image': (_image, ('image',), ()),
+    'comments_count': (
+        lambda post, request: post.comments_count, ('comments_count',), (),
+    ),
+}
+COMMENT_FIELDS = {
+    'id': (lambda comment, request: comment.pk, (), ()),
+    'text': (lambda comment, request: comment.text, ('text',), ()),
+    'created': (
+        lambda comment, request: comment.created.isoformat(),
+        ('created',), (),
+    ),
+    'author': (
+        lambda comment, request: comment.author.username,
+        ('author__username',), ('author',),
+    ),
+}
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def selected_fields(request, available):
+    """Поля из параметра fields= в порядке запроса; по умолчанию все."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    names = list(dict.fromkeys(name.strip() for name in raw.split(',')))
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise FieldsError(
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Доступны: {", ".join(available)}'
+        )
+    return names
+
+
+def restrict(queryset, names, available, keys):
+    """Загружает только нужные колонки и связи одним запросом.
+
+    Колонки ключей курсора keys нужны всегда: по ним строится курсор.
+    """
+    columns = {'id', *keys}
+    related = set()
+    for name in names:
+        _, field_columns, field_related = available[name]
+        columns.update(field_columns)
+        related.update(field_related)
+    if related:
+        # select_related() без аргументов подтянул бы все связи
+        queryset = queryset.select_related(*related)
+    return queryset.only(*columns)
+
+
+def serialize(obj, names, available, request):
+    return {name: available[name][0](obj, request) for name in names}
+
+
+def json_response(data, status=200):
+    # Без пробелов и без \u-экранирования кириллицы: меньше байт до gzip
+    return HttpResponse(
+        json.dumps(data, ensure_ascii=False, separators=(',', ':')),
+        content_type=CONTENT_TYPE,
+        status=status,
+    )
+
+
+def error_response(message, status):
+    return json_response({'error': message}, status=status)
+
+
+def page_response(page, names, available, request):
+    return json_response({
+        'results': [
+            serialize(obj, names, available, request) for obj in page
+        ],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def feed_response(request, posts):
+    try:
+        names = selected_fields(request, POST_FIELDS)
+    except FieldsError as error:
+        return error_response(str(error), 400)
+    posts = restrict(posts, names, POST_FIELDS, ('pub_date',))
+    return page_response(
+        cursor_get_page(posts, request), names, POST_FIELDS, request
+    )
+
+
+def api_view(signature):
+    """Общие обёртки API: только GET, реплика, ETag и gzip."""
+    def decorator(view):
+        return gzip_page(require_safe(read_from_replica(
+            freshness.conditional_page(signature)(view)
+        )))
+    return decorator
+
+
+@api_view(freshness.index_signature)
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@api_view(freshness.group_signature)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).only('pk').first()
+    if group is None:
+        return error_response('Группа не найдена', 404)
+    return feed_response(request, group.posts.all())
+
+
+@api_view(freshness.profile_signature)
+def profile(request, username):
+    author = User.objects.filter(username=username).only('pk').first()
+    if author is None:
+        return error_response('Пользователь не найден', 404)
+    return feed_response(request, author.posts.all())
+
+
+@api_view(freshness.post_signature)
+def post_detail(request, post_id):
+    try:
+        names = selected_fields(request, POST_FIELDS)
+    except FieldsError as error:
+        return error_response(str(error), 400)
+    post = restrict(
+        Post.objects.filter(pk=post_id), names, POST_FIELDS, ()
+    ).first()
+    if post is None:
+        return error_response('Пост не найден', 404)
+    return json_response(serialize(post, names, POST_FIELDS, request))
+
+
+@api_view(freshness.post_signature)
+def post_comments(request, post_id):
+    try:
+        names = selected_fields(request, COMMENT_FIELDS)
+    except FieldsError as error:
+        return error_response(str(error), 400)
+    post = Post.objects.filter(pk=post_id).only('pk').first()
+    if post is None:
+        return error_response('Пост не найден', 404)
+    page, _ = comments_get_page(
+        restrict(post.comments.all(), names, COMMENT_FIELDS, ('created',)),
+        request,
+    )
+    return page_response(page, names, COMMENT_FIELDS, request)
@@ -0,0 +1,89 @@
+"""Кэш отрисованных карточек постов.
+
+Один и тот же пост показывается на главной, в группе, в профиле
+и во множестве лент подписок; карточка рендерится один раз и берётся
+из кэша одним get_many на страницу. Ключ включает версию карточки:
+дату изменения поста и всё, что карточка показывает из связей.
+"""
+import hashlib
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from core import routers
+
+from .tags import existing_mentions
+
+CARD_TEMPLATE = 'posts/includes/card.html'
+STATS_KEYS = {'hits': 'stats:cards:hits', 'misses': 'stats:cards:misses'}
+STATS_FLUSH_EVERY = 100
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def card_key(post):
+    author = post.author
+    group = post.group
+    version = ':'.join(str(part) for part in (
+        post.updated.timestamp(),
+        author.username,
+        author.get_full_name(),
+        post.group_id,
+        group and group.slug,
+    ))
+    digest = hashlib.md5(version.encode()).hexdigest()
+    return f'card:{post.pk}:{digest}'
+
+
+def render_cards(posts):
+    """HTML карточек в порядке posts; отсутствующие рендерятся и кэшируются."""
+    keys = [card_key(post) for post in posts]
+    cached = cache.get_many(keys)
+    missing_posts = [
+        (key, post) for key, post in zip(keys, posts) if key not in cached
+    ]
+    # Карточка читает связанные данные (варианты картинки); под
+    # долгоживущим ключом они должны быть из основной базы
+    with routers.primary():
+        # Упомянутые пользователи всех карточек — одним запросом
+        mentioned = existing_mentions(post.text for _, post in missing_posts)
+        missing = {
+            key: render_to_string(
+                CARD_TEMPLATE, {'post': post, 'mentioned': mentioned}
+            )
+            for key, post in missing_posts
+        }
+    if missing:
+        cache.set_many(missing, settings.CARD_CACHE_TIMEOUT)
+    record(hits=len(keys) - len(missing), misses=len(missing))
+    return [cached.get(key) or missing[key] for key in keys]
+
+
+def record(hits, misses):
+    with _stats_lock:
+        _stats['hits'] += hits
+        _stats['misses'] += misses
+        if sum(_stats.values()) < STATS_FLUSH_EVERY:
+            return
+    flush_stats()
+
+
+def flush_stats():
+    """Складывает накопленные в процессе счётчики в общий кэш."""
+    global _stats
+    with _stats_lock:
+        pending, _stats = _stats, Counter()
+    for outcome, count in pending.items():
+        if count and not cache.add(STATS_KEYS[outcome], count, None):
+            cache.incr(STATS_KEYS[outcome], count)
+
+
+def read_stats():
+    values = cache.get_many(STATS_KEYS.values())
+    return {
+        outcome: values.get(key, 0) for outcome, key in STATS_KEYS.items()
+    }
@@ -0,0 +1,149 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    AuthorStats, Comment, Follow, Group, Mention, Post, Tag, Tagging, User,
+)
+
+
+def _shift(queryset, field, delta, **extra):
+    if delta < 0:
+        # PositiveIntegerField: не уходим в минус при рассинхронизации
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta}, **extra)
+
+
+def author_posts_changed(author_id, delta):
+    stats = AuthorStats.objects.filter(user_id=author_id)
+    if _shift(stats, 'posts_count', delta) or delta < 0:
+        return
+    AuthorStats.objects.get_or_create(
+        user_id=author_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=author_id).count()
+        },
+    )
+
+
+def author_followers_changed(author_id, delta):
+    stats = AuthorStats.objects.filter(user_id=author_id)
+    if _shift(stats, 'followers_count', delta) or delta < 0:
+        return
+    AuthorStats.objects.get_or_create(
+        user_id=author_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=author_id).count(),
+            'followers_count': Follow.objects.filter(
+                author_id=author_id
+            ).count(),
+        },
+    )
+
+
+def author_followers_count(author_id):
+    count = AuthorStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first()
+    return count or 0
+
+
+def group_posts_changed(group_id, delta):
+    if group_id is not None:
+        _shift(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def tag_posts_changed(tag_ids, delta):
+    if tag_ids:
+        _shift(Tag.objects.filter(pk__in=tag_ids), 'posts_count', delta)
+
+
+def user_mentions_changed(user_ids, delta):
+    if not user_ids:
+        return
+    _shift(
+        AuthorStats.objects.filter(user_id__in=user_ids),
+        'mentions_count', delta,
+    )
+    if delta < 0:
+        return
+    missing = set(user_ids) - set(AuthorStats.objects.filter(
+        user_id__in=user_ids
+    ).values_list('user_id', flat=True))
+    for user_id in missing:
+        AuthorStats.objects.get_or_create(
+            user_id=user_id,
+            defaults={
+                'posts_count': Post.objects.filter(author_id=user_id).count(),
+                'mentions_count': Mention.objects.filter(
+                    user_id=user_id
+                ).count(),
+            },
+        )
+
+
+def post_comments_changed(post_id, delta):
+    # Комментарии — часть страницы поста, поэтому сдвигаем и updated
+    _shift(
+        Post.objects.filter(pk=post_id), 'comments_count', delta,
+        updated=timezone.now(),
+    )
+
+
+def author_posts_count(author):
+    try:
+        return author.stats.posts_count
+    except AuthorStats.DoesNotExist:
+        stats, _ = AuthorStats.objects.get_or_create(
+            user=author, defaults={'posts_count': author.posts.count()}
+        )
+        return stats.posts_count
+
+
+def user_mentions_count(user):
+    count = AuthorStats.objects.filter(user=user).values_list(
+        'mentions_count', flat=True
+    ).first()
+    return count or 0
+
+
+def _count_of(queryset, field, outer='pk'):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef(outer)})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def recount_all():
+    """Пересчитывает все счётчики по фактическим данным."""
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    AuthorStats.objects.bulk_create(
+        AuthorStats(user_id=user_id) for user_id in missing.iterator()
+    )
+    return {
+        'authors': AuthorStats.objects.update(
+            posts_count=_count_of(Post.objects, 'author', outer='user'),
+            mentions_count=_count_of(Mention.objects, 'user', outer='user'),
+            followers_count=_count_of(
+                Follow.objects, 'author', outer='user'
+            ),
+        ),
+        'groups': Group.objects.update(
+            posts_count=_count_of(Post.objects, 'group')
+        ),
+        'posts': Post.objects.update(
+            comments_count=_count_of(Comment.objects, 'post')
+        ),
+        'tags': Tag.objects.update(
+            posts_count=_count_of(Tagging.objects, 'tag')
+        ),
+    }
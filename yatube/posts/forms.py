@@ -1,5 +1,8 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
 
+from . import uploads
 from .models import Post, Comment
 
 
@@ -8,6 +11,25 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('group', 'text', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.oversized = None
+        image = self.files.get('image')
+        if image is not None and image.size > settings.UPLOAD_MAX_BYTES:
+            # Обработчик загрузки сохранил только начало файла: его не
+            # стоит даже открывать, ошибку покажет clean_image
+            self.oversized = image
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean_image(self):
+        if self.oversized is not None:
+            uploads.check_size(self.oversized)
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            return uploads.normalize(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,125 @@
+"""Дешёвые сигнатуры страниц для условных GET-запросов.
+
+Каждая *_signature выполняет один-два небольших запроса и возвращает
+(etag, last_modified) — по ним condition отвечает 304 раньше, чем view
+выберет посты и отрисует шаблон. Post.updated сдвигается и при
+изменении поста, и при появлении или удалении комментария. В ETag
+входит и поколение POSTS_GENERATION: правка группы или имени автора
+не трогает посты, но меняет страницу.
+"""
+import hashlib
+
+from django.db.models import Max
+from django.middleware.csrf import get_token
+from django.views.decorators.http import condition
+
+from core.caching import get_generation
+from .models import Follow, Group, Post, Tag, User
+from .signals import POSTS_GENERATION
+
+
+def _etag(request, *parts):
+    user = session = ''
+    if request.user.is_authenticated:
+        # Формы страницы несут CSRF-токен, а вход меняет и его, и ключ
+        # сессии: закэшированная браузером страница после нового входа
+        # не годится. get_token закрепляет куку CSRF до рендеринга
+        get_token(request)
+        user = request.user.pk
+        session = (
+            f'{request.session.session_key}'
+            f':{request.META["CSRF_COOKIE"]}'
+        )
+    raw = ':'.join(str(part) for part in (
+        user,
+        session,
+        request.get_full_path(),
+        get_generation(POSTS_GENERATION),
+        *parts,
+    ))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _signature(request, row, *parts):
+    """row — (число постов, время последнего изменения) или None."""
+    if row is None:
+        return None, None
+    total, newest = row
+    return (
+        _etag(request, total, newest and newest.timestamp(), *parts),
+        newest,
+    )
+
+
+def index_signature(request):
+    # Удаление любого поста меняет поколение, поэтому COUNT(*) не нужен
+    newest = Post.objects.order_by().aggregate(newest=Max('updated'))
+    return _signature(request, (None, newest['newest']))
+
+
+def group_signature(request, slug):
+    row = Group.objects.filter(slug=slug).annotate(
+        newest=Max('posts__updated')
+    ).values_list('posts_count', 'newest').first()
+    return _signature(request, row)
+
+
+def tag_signature(request, name):
+    row = Tag.objects.filter(name=name.lower()).annotate(
+        newest=Max('taggings__post__updated')
+    ).values_list('posts_count', 'newest').first()
+    return _signature(request, row)
+
+
+def profile_signature(request, username):
+    row = User.objects.filter(username=username).annotate(
+        newest=Max('posts__updated')
+    ).values_list('stats__posts_count', 'newest').first()
+    following = (
+        request.user.is_authenticated
+        and Follow.objects.filter(
+            user=request.user, author__username=username
+        ).exists()
+    )
+    return _signature(request, row, following)
+
+
+def post_signature(request, post_id):
+    row = Post.objects.filter(pk=post_id).values_list(
+        'updated', 'author__stats__posts_count'
+    ).first()
+    if row is None:
+        return None, None
+    updated, author_posts = row
+    return _etag(request, updated.timestamp(), author_posts), updated
+
+
+def last_modified(signature):
+    def func(request, *args, **kwargs):
+        return signature(request, *args, **kwargs)[1]
+    return func
+
+
+def conditional_page(signature):
+    """condition() с ETag и Last-Modified из одной сигнатуры.
+
+    Сигнатура считается один раз на запрос. Last-Modified отдаётся
+    только анонимам: у авторизованных страница зависит от пользователя,
+    и её версию определяет лишь ETag.
+    """
+    def cached(request, *args, **kwargs):
+        if not hasattr(request, '_page_signature'):
+            request._page_signature = signature(request, *args, **kwargs)
+        return request._page_signature
+
+    def etag_func(request, *args, **kwargs):
+        return cached(request, *args, **kwargs)[0]
+
+    def last_modified_func(request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return None
+        return cached(request, *args, **kwargs)[1]
+
+    return condition(
+        etag_func=etag_func, last_modified_func=last_modified_func
+    )
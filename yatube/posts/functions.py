@@ -1,9 +1,232 @@
+import base64
+import binascii
+import datetime
+import json
+
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from core.caching import get_or_compute
+
+PAGINATOR_NUMBERED = 'numbered'
+PAGINATOR_CURSOR = 'cursor'
+
+CURSOR_KEYS = ('-pub_date', '-id')
+# Значения ключей в курсоре: списки, словари и null — признак подделки
+CURSOR_SCALARS = (str, int, float)
+# Порядки комментариев; оба идут по индексу (post, created)
+COMMENTS_OLDEST = 'oldest'
+COMMENTS_NEWEST = 'newest'
+COMMENT_ORDERS = {
+    COMMENTS_OLDEST: ('created', 'id'),
+    COMMENTS_NEWEST: ('-created', '-id'),
+}
+
+
+class CursorPage:
+    """Страница keyset-пагинации: без COUNT(*) и OFFSET.
+
+    Повторяет ту часть интерфейса Page, которую используют шаблоны,
+    вместо номеров страниц хранит курсоры соседних страниц. Строки
+    читаются при первом обращении, как и у Page: страница, собранная
+    внутри кэша фрагмента, читает их там же, из основной базы.
+    """
+
+    is_cursor = True
+
+    def __init__(self, load, cursor='', direction=''):
+        # load() -> (object_list, next_cursor, previous_cursor)
+        self._load = load
+        self.cursor = cursor
+        # 'after', 'before' или '' для первой страницы
+        self.direction = direction
+
+    @cached_property
+    def _loaded(self):
+        return self._load()
+
+    @property
+    def object_list(self):
+        return self._loaded[0]
+
+    @property
+    def next_cursor(self):
+        return self._loaded[1]
+
+    @property
+    def previous_cursor(self):
+        return self._loaded[2]
+
+    def __repr__(self):
+        return f'<CursorPage {self.direction or "first"} {self.cursor}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _parse_keys(keys):
+    return [(key.lstrip('-'), key.startswith('-')) for key in keys]
+
+
+def _encode_cursor(obj, keys):
+    values = [getattr(obj, name) for name, _ in keys]
+    # DjangoJSONEncoder обрезает микросекунды, курсору нужна точность
+    values = [
+        value.isoformat() if isinstance(value, datetime.datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _key_field(posts, name):
+    """Поле ключа курсора: поле модели или аннотации queryset."""
+    annotation = posts.query.annotations.get(name)
+    if annotation is not None:
+        return annotation.output_field
+    return posts.model._meta.get_field(name)
+
+
+def _decode_cursor(token, posts, keys):
+    """Возвращает значения ключей из курсора или None, если он битый."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw.decode())
+        if (not isinstance(values, list) or len(values) != len(keys)
+                or not all(isinstance(value, CURSOR_SCALARS)
+                           for value in values)):
+            return None
+        values = [
+            _key_field(posts, name).to_python(value)
+            for (name, _), value in zip(keys, values)
+        ]
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError,
+            ValidationError):
+        return None
+    # null в курсоре не сравнить в фильтре — такой курсор битый
+    return None if None in values else values
+
+
+def _seek_filter(keys, values, forward):
+    """Условие «строго после курсора» в лексикографическом порядке ключей."""
+    condition = Q()
+    equal = {}
+    for (name, descending), value in zip(keys, values):
+        lookup = 'lt' if descending == forward else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def cursor_get_page(posts, request, keys=CURSOR_KEYS, per_page=None):
+    per_page = per_page or settings.PAGE_SIZE
+    keys = _parse_keys(keys)
+    before = request.GET.get('before')
+    forward = not before
+    token = request.GET.get('after') if forward else before
+    values = _decode_cursor(token, posts, keys)
+    if values is None:
+        # Битый курсор в любую сторону — первая страница
+        forward, token = True, ''
+    else:
+        posts = posts.filter(_seek_filter(keys, values, forward))
+    posts = posts.order_by(*(
+        f'-{name}' if descending == forward else name
+        for name, descending in keys
+    ))
+
+    def load():
+        object_list = list(posts[:per_page + 1])
+        has_more = len(object_list) > per_page
+        object_list = object_list[:per_page]
+        if forward:
+            has_next, has_previous = has_more, values is not None
+        else:
+            object_list.reverse()
+            has_next, has_previous = values is not None, has_more
+        next_cursor = previous_cursor = None
+        if object_list and has_next:
+            next_cursor = _encode_cursor(object_list[-1], keys)
+        if object_list and has_previous:
+            previous_cursor = _encode_cursor(object_list[0], keys)
+        return object_list, next_cursor, previous_cursor
+
+    return CursorPage(
+        load,
+        cursor=token,
+        direction=('after' if forward else 'before') if token else '',
+    )
+
+
+def page_cache_key(page):
+    """Часть ключа кэша фрагмента, однозначно задающая страницу.
+
+    Строится из режима, направления, курсора и номера, а не из repr
+    страницы: after и before с одним курсором — разные страницы.
+    """
+    if getattr(page, 'is_cursor', False):
+        return f'{PAGINATOR_CURSOR}:{page.direction or "first"}:{page.cursor}'
+    return f'{PAGINATOR_NUMBERED}:{page.number}'
+
+
+def comments_get_page(comments, request):
+    """Страница комментариев по курсору и выбранный порядок."""
+    order = request.GET.get('order')
+    if order not in COMMENT_ORDERS:
+        order = COMMENTS_OLDEST
+    page = cursor_get_page(
+        comments, request,
+        keys=COMMENT_ORDERS[order], per_page=settings.COMMENTS_PAGE_SIZE,
+    )
+    return page, order
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который берёт COUNT(*) из кэша по ключу count_key."""
+
+    def __init__(self, *args, count_key, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        return get_or_compute(
+            f'paginator_count:{self.count_key}',
+            self.object_list.count,
+            settings.FEED_CACHE_TIMEOUT,
+        )
 
 
-def paginator_get_page(posts, request):
-    paginator = Paginator(posts, settings.PAGE_SIZE)
+def paginator_get_page(posts, request, mode=None, count_key=None,
+                       keys=CURSOR_KEYS):
+    if (mode or settings.PAGINATOR_MODE) == PAGINATOR_CURSOR:
+        return cursor_get_page(posts, request, keys=keys)
+    if count_key is None:
+        paginator = Paginator(posts, settings.PAGE_SIZE)
+    else:
+        paginator = CachedCountPaginator(
+            posts, settings.PAGE_SIZE, count_key=count_key
+        )
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
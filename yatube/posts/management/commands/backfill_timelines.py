@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Заполняет ленты подписок по существующим подпискам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='usernames', default=[],
+            help='Перестроить ленту только этого пользователя',
+        )
+
+    def handle(self, *args, usernames, **options):
+        if not settings.TIMELINE_ENABLED:
+            raise CommandError('Ленты подписок выключены: TIMELINE_ENABLED')
+        if usernames:
+            users = User.objects.filter(username__in=usernames)
+        else:
+            users = User.objects.filter(follower__isnull=False).distinct()
+        rebuilt = 0
+        for user in users.iterator():
+            with transaction.atomic():
+                timeline.rebuild(user)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'Перестроено лент: {rebuilt}'))
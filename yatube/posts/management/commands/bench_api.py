@@ -0,0 +1,93 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts.management.commands.bench_feeds import Rollback, seed
+from posts.models import Group, Post, User
+
+# Без кэша страниц и фрагментов: сравнивается сама сборка ответа
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def endpoints(user, group, post):
+    """Пары адресов (HTML, JSON) с одними и теми же данными."""
+    return {
+        'index': (reverse('posts:index'), reverse('api_v1:index')),
+        'group_posts': (
+            reverse('posts:group_posts', args=[group.slug]),
+            reverse('api_v1:group_posts', args=[group.slug]),
+        ),
+        'profile': (
+            reverse('posts:profile', args=[user.username]),
+            reverse('api_v1:profile', args=[user.username]),
+        ),
+        'post_detail': (
+            reverse('posts:post_detail', args=[post.pk]),
+            reverse('api_v1:post_detail', args=[post.pk]),
+        ),
+    }
+
+
+def measure(client, url, seconds):
+    """Запросов в секунду и размер ответа без сжатия и в gzip."""
+    requests = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        response = client.get(url)
+        requests += 1
+    rate = requests / (time.perf_counter() - started)
+    content = response.content
+    return rate, len(content), len(gzip.compress(content))
+
+
+class Command(BaseCommand):
+    help = 'Пропускная способность JSON API против HTML-страниц'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10_000)
+        parser.add_argument('--comments', type=int, default=20_000)
+        parser.add_argument(
+            '--seconds', type=float, default=2,
+            help='Сколько секунд нагружать каждый адрес',
+        )
+
+    def handle(self, *args, posts, comments, seconds, **options):
+        self.stdout.write('Заполнение базы...')
+        client = Client()
+        # Тестовые данные живут в транзакции, которая затем откатывается
+        try:
+            with transaction.atomic(), override_settings(CACHES=NO_CACHE):
+                user_ids, group_ids, post_ids = seed(
+                    posts, comments, users=100, groups=10, follows=10
+                )
+                urls = endpoints(
+                    User.objects.get(pk=user_ids[0]),
+                    Group.objects.get(pk=group_ids[0]),
+                    Post.objects.get(pk=post_ids[0]),
+                )
+                self.stdout.write(
+                    f'{"":<12} {"HTML, зап/с":>12} {"JSON, зап/с":>12} '
+                    f'{"HTML, байт":>16} {"JSON, байт":>16}'
+                )
+                for name, (html_url, json_url) in urls.items():
+                    self.report(
+                        name,
+                        measure(client, html_url, seconds),
+                        measure(client, json_url, seconds),
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def report(self, name, html, json):
+        self.stdout.write(
+            f'{name:<12} {html[0]:>12.0f} {json[0]:>12.0f} '
+            f'{html[1]:>8} ({html[2]:>5}) {json[1]:>8} ({json[2]:>5})'
+        )
@@ -0,0 +1,212 @@
+import contextlib
+import datetime
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post
+from posts.timeline import celebrity_ids
+
+User = get_user_model()
+
+INDEXED_MODELS = (Post, Comment, Follow)
+LEGACY_INDEXES = (
+    (Post, 'author_id'), (Post, 'group_id'), (Comment, 'post_id'),
+    (Follow, 'author_id'),
+)
+
+
+class Rollback(Exception):
+    """Откатывает транзакцию с тестовыми данными."""
+
+
+@contextlib.contextmanager
+def explicit_dates():
+    """Даёт bulk_create записать заданные даты вместо «сейчас»."""
+    fields = [
+        Post._meta.get_field('pub_date'), Comment._meta.get_field('created'),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def seed(posts, comments, users, groups, follows):
+    rng = random.Random(0)
+    start = timezone.now()
+    prefix = f'bench{int(start.timestamp())}_'
+    User.objects.bulk_create(
+        User(username=f'{prefix}{index}') for index in range(users)
+    )
+    user_ids = list(User.objects.filter(
+        username__startswith=prefix
+    ).values_list('pk', flat=True))
+    Group.objects.bulk_create(
+        Group(title=f'Группа {index}', slug=f'{prefix}{index}',
+              description='')
+        for index in range(groups)
+    )
+    group_ids = list(Group.objects.filter(
+        slug__startswith=prefix
+    ).values_list('pk', flat=True))
+    with explicit_dates():
+        Post.objects.bulk_create(
+            (
+                Post(
+                    text=f'Пост {index}',
+                    author_id=rng.choice(user_ids),
+                    group_id=rng.choice(group_ids + [None]),
+                    pub_date=start - datetime.timedelta(minutes=index),
+                )
+                for index in range(posts)
+            ),
+        )
+        post_ids = list(Post.objects.filter(
+            author_id__in=user_ids
+        ).values_list('pk', flat=True))
+        Comment.objects.bulk_create(
+            (
+                Comment(
+                    text=f'Комментарий {index}',
+                    post_id=rng.choice(post_ids),
+                    author_id=rng.choice(user_ids),
+                    created=start - datetime.timedelta(seconds=index),
+                )
+                for index in range(comments)
+            ),
+        )
+    Follow.objects.bulk_create(
+        (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in rng.sample(user_ids, min(follows, users))
+            if author_id != user_id
+        ),
+        ignore_conflicts=True,
+    )
+    return user_ids, group_ids, post_ids
+
+
+def feed_queries(user_id, group_id, post_id):
+    """Запросы страниц в том виде, в каком их строят представления."""
+    page = settings.PAGE_SIZE
+    return {
+        'index': Post.objects.all()[:page],
+        'group_posts': Post.objects.filter(group_id=group_id)[:page],
+        'profile': Post.objects.filter(author_id=user_id)[:page],
+        'follow_index': Post.objects.filter(
+            author__following__user_id=user_id
+        )[:page],
+        'celebrities': celebrity_ids(User(pk=user_id)),
+        'fan_out': Follow.objects.filter(author_id=user_id).values_list(
+            'user_id', flat=True
+        ),
+        'post_detail': Comment.objects.filter(
+            post_id=post_id
+        ).order_by('created'),
+    }
+
+
+def timed(queryset, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        list(queryset.all())
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def explain(queryset, phase):
+    sql, params = queryset.query.sql_with_params()
+    # Метка фазы меняет текст запроса: иначе sqlite3 вернёт план
+    # из кэша подготовленных выражений, составленный до смены индексов
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{connection.ops.explain_query_prefix()} {sql} /* {phase} */',
+            params,
+        )
+        return '\n'.join(
+            ' '.join(str(column) for column in row)
+            for row in cursor.fetchall()
+        )
+
+
+def restore_legacy_indexes():
+    """Возвращает схему до индексов под ленты: одиночные индексы FK."""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model in INDEXED_MODELS:
+            for index in model._meta.indexes:
+                cursor.execute(f'DROP INDEX {quote(index.name)}')
+        for model, column in LEGACY_INDEXES:
+            table = model._meta.db_table
+            cursor.execute(
+                f'CREATE INDEX {quote(f"bench_{table}_{column}")} '
+                f'ON {quote(table)} ({quote(column)})'
+            )
+
+
+class Command(BaseCommand):
+    help = (
+        'Планы запросов и время лент на большом наборе данных '
+        'без индексов под ленты и с ними'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument('--comments', type=int, default=200_000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument(
+            '--follows', type=int, default=30,
+            help='На скольких авторов подписан каждый пользователь',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, repeat, **options):
+        self.stdout.write('Заполнение базы...')
+        # Данные и удаление индексов живут в одной транзакции,
+        # которая в конце откатывается: база остаётся как была
+        try:
+            with transaction.atomic():
+                user_ids, group_ids, post_ids = seed(
+                    options['posts'], options['comments'], options['users'],
+                    options['groups'], options['follows'],
+                )
+                queries = feed_queries(
+                    user_ids[0], group_ids[0], post_ids[len(post_ids) // 2]
+                )
+                after = self.measure(queries, repeat, 'after')
+                restore_legacy_indexes()
+                before = self.measure(queries, repeat, 'before')
+                raise Rollback
+        except Rollback:
+            pass
+        for name in queries:
+            self.report(name, before[name], after[name])
+
+    @staticmethod
+    def measure(queries, repeat, phase):
+        return {
+            name: (explain(queryset, phase), timed(queryset, repeat))
+            for name, queryset in queries.items()
+        }
+
+    def report(self, name, before, after):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{name}: {before[1]:.2f} мс -> {after[1]:.2f} мс'
+        ))
+        for title, (plan, _) in (('до', before), ('после', after)):
+            self.stdout.write(f'  {title}:')
+            for line in plan.splitlines():
+                self.stdout.write(f'    {line}')
@@ -0,0 +1,91 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.templating import warm_up
+from posts.management.commands.bench_api import NO_CACHE
+from posts.management.commands.bench_feeds import Rollback, seed
+from posts.models import Group, User
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def templates(cached):
+    """TEMPLATES текущих настроек с кэширующим загрузчиком или без него."""
+    config = {**settings.TEMPLATES[0], 'APP_DIRS': False}
+    config['OPTIONS'] = {
+        **config['OPTIONS'],
+        'loaders': [('django.template.loaders.cached.Loader', LOADERS)]
+        if cached else LOADERS,
+    }
+    return [config]
+
+
+def feed_urls(user, group):
+    return {
+        'index': reverse('posts:index'),
+        'group_posts': reverse('posts:group_posts', args=[group.slug]),
+        'profile': reverse('posts:profile', args=[user.username]),
+    }
+
+
+def median_ms(client, url, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        client.get(url)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Время страницы ленты с загрузкой шаблонов с диска '
+        'и с кэширующим загрузчиком после прогрева'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, posts, repeat, **options):
+        self.stdout.write('Заполнение базы...')
+        client = Client()
+        results = {}
+        # Без кэшей страниц и карточек: каждый запрос рендерит все шаблоны
+        try:
+            with transaction.atomic(), override_settings(CACHES=NO_CACHE):
+                user_ids, group_ids, _ = seed(
+                    posts, comments=0, users=10, groups=2, follows=0
+                )
+                urls = feed_urls(
+                    User.objects.get(pk=user_ids[0]),
+                    Group.objects.get(pk=group_ids[0]),
+                )
+                for cached in (False, True):
+                    with override_settings(TEMPLATES=templates(cached)):
+                        if cached:
+                            self.stdout.write(
+                                f'Прогрето шаблонов: {warm_up()}'
+                            )
+                        results[cached] = {
+                            name: median_ms(client, url, repeat)
+                            for name, url in urls.items()
+                        }
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(f'{"":<12} {"с диска, мс":>12} {"кэш, мс":>12}')
+        for name in results[False]:
+            self.stdout.write(
+                f'{name:<12} {results[False][name]:>12.2f} '
+                f'{results[True][name]:>12.2f}'
+            )
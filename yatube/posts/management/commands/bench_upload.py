@@ -0,0 +1,142 @@
+import io
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+
+from django import forms
+from django.core.files.storage import FileSystemStorage
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+
+from posts.forms import PostForm
+from posts.models import Post
+
+LEGACY_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+LIMITED_HANDLERS = [
+    'core.upload_handlers.LimitedTemporaryFileUploadHandler',
+]
+
+
+class LegacyPostForm(forms.ModelForm):
+    """Форма в том виде, в каком она была до потоковой загрузки."""
+
+    class Meta:
+        model = Post
+        fields = ('group', 'text', 'image')
+
+
+def make_image(side):
+    """JPEG со сторонами side×(side·2/3), похожий на фотографию."""
+    size = (side, side * 2 // 3)
+    channels = [
+        Image.linear_gradient('L').resize(size),
+        Image.effect_noise(size, 24),
+        Image.linear_gradient('L').rotate(90).resize(size),
+    ]
+    buffer = io.BytesIO()
+    Image.merge('RGB', channels).save(buffer, 'JPEG', quality=92)
+    return buffer.getvalue()
+
+
+def write_request_body(path, content):
+    """Тело multipart-запроса кладётся на диск, а не в память воркера."""
+    upload = io.BytesIO(content)
+    upload.name = 'bench.jpg'
+    with open(path, 'wb') as body:
+        body.write(encode_multipart(
+            BOUNDARY, {'text': 'bench-upload', 'image': upload}
+        ))
+
+
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def current_rss_kb():
+    with open('/proc/self/statm') as statm:
+        pages = int(statm.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def handle_upload(body_path, legacy, media_root):
+    """Разбирает запрос, валидирует форму и сохраняет картинку."""
+    with open(body_path, 'rb') as body:
+        request = WSGIRequest({
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/create/',
+            'CONTENT_TYPE': MULTIPART_CONTENT,
+            'CONTENT_LENGTH': str(os.path.getsize(body_path)),
+            'wsgi.input': body,
+        })
+        form_class = LegacyPostForm if legacy else PostForm
+        form = form_class(request.POST, request.FILES)
+        if not form.is_valid():
+            return 'отклонено'
+        image = form.cleaned_data['image']
+        FileSystemStorage(media_root).save(image.name, image)
+        return 'сохранено'
+
+
+def measure(body_path, legacy, media_root, results):
+    baseline = current_rss_kb()
+    handlers = LEGACY_HANDLERS if legacy else LIMITED_HANDLERS
+    try:
+        with override_settings(FILE_UPLOAD_HANDLERS=handlers):
+            outcome = handle_upload(body_path, legacy, media_root)
+    except Exception as error:
+        outcome = f'ошибка: {error!r}'
+    results.put((max(peak_rss_kb() - baseline, 0), outcome))
+
+
+class Command(BaseCommand):
+    help = 'Пиковый прирост RSS воркера на одну загрузку картинки'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sides', type=int, nargs='+', default=[1000, 3000, 6000],
+            help='Длинные стороны тестовых картинок в пикселях',
+        )
+        parser.add_argument(
+            '--legacy', action='store_true',
+            help='Сравнить со стандартными обработчиками и формой без '
+                 'нормализации',
+        )
+
+    def handle(self, *args, sides, legacy, **options):
+        # Каждая загрузка — в отдельном процессе, иначе пик RSS копится
+        context = multiprocessing.get_context('fork')
+        modes = [False, True] if legacy else [False]
+        workdir = tempfile.mkdtemp()
+        try:
+            self.stdout.write(
+                f'{"режим":<10} {"пиксели":>12} {"байты":>10} '
+                f'{"пик RSS":>10}  результат'
+            )
+            for side in sides:
+                content = make_image(side)
+                body_path = os.path.join(workdir, f'body-{side}')
+                write_request_body(body_path, content)
+                for mode in modes:
+                    results = context.Queue()
+                    worker = context.Process(target=measure, args=(
+                        body_path, mode, os.path.join(workdir, 'media'),
+                        results,
+                    ))
+                    worker.start()
+                    rss, outcome = results.get()
+                    worker.join()
+                    self.stdout.write(
+                        f'{"legacy" if mode else "streaming":<10} '
+                        f'{side}x{side * 2 // 3:<7} {len(content):>10} '
+                        f'{rss / 1024:>8.1f}MB  {outcome}'
+                    )
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
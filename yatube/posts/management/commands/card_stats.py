@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import cards
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кэша карточек постов'
+
+    def handle(self, *args, **options):
+        cards.flush_stats()
+        stats = cards.read_stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total if total else 0
+        self.stdout.write(
+            f'cards hits={stats["hits"]:<8} misses={stats["misses"]:<8} '
+            f'hit_ratio={ratio:.1%}'
+        )
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.template.defaultfilters import filesizeformat
+
+from posts.orphans import Collector
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки и миниатюры, на которые не ссылается ни один пост'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, что было бы удалено',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько файлов и записей проверять за один запрос',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе стольких секунд',
+        )
+        parser.add_argument(
+            '--every', type=int, default=0,
+            help='Повторять раз в столько секунд, пока процесс не остановят',
+        )
+
+    def handle(self, *args, dry_run, batch_size, min_age, every, **options):
+        while True:
+            stats = Collector(
+                batch_size=batch_size, min_age=min_age, dry_run=dry_run
+            ).run()
+            action = 'Можно удалить' if dry_run else 'Удалено'
+            self.stdout.write(self.style.SUCCESS(
+                f'Проверено файлов: {stats["scanned"]}. {action}: '
+                f'файлов {stats["files"]} '
+                f'({filesizeformat(stats["bytes"])}), '
+                f'записей миниатюр {stats["records"]}'
+            ))
+            if not every:
+                return
+            # Между проходами соединение не нужно держать открытым
+            connection.close()
+            time.sleep(every)
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+
+from core.caching import bump_generation
+from posts import variants
+from posts.models import ImageVariant, Post
+from posts.signals import POSTS_GENERATION
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт адаптивные варианты картинок постов и показывает, '
+        'сколько байт они экономят по сравнению с исходниками'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--build', action='store_true',
+            help='Создать варианты для постов, у которых их нет',
+        )
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Пересоздать варианты для всех постов с картинками',
+        )
+
+    def handle(self, *args, build, rebuild, **options):
+        if build or rebuild:
+            posts = Post.objects.exclude(image='')
+            if not rebuild:
+                posts = posts.filter(image_variants__isnull=True)
+            built = 0
+            for post in posts.distinct().iterator():
+                try:
+                    variants.build(post)
+                except Exception as error:
+                    self.stderr.write(f'{post.image.name}: {error}')
+                    continue
+                built += 1
+            if built:
+                # Карточки из кэша узнают о новых <source> после сброса
+                # поколения — один раз на весь проход
+                bump_generation(POSTS_GENERATION)
+            self.stdout.write(f'Обработано картинок: {built}')
+        self.report()
+
+    def report(self):
+        rows = ImageVariant.objects.values('format', 'width').annotate(
+            total=Count('pk'), size=Sum('size'), source_size=Sum('source_size')
+        ).order_by('format', 'width')
+        for row in rows:
+            saved = 1 - row['size'] / row['source_size']
+            self.stdout.write(
+                f'{row["format"]:<5} {row["width"]:>5}w '
+                f'картинок={row["total"]:<6} байт={row["size"]:<10} '
+                f'исходники={row["source_size"]:<10} экономия={saved:.1%}'
+            )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс постов и комментариев'
+
+    def handle(self, *args, **options):
+        index = search.get_index()
+        with transaction.atomic():
+            search.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {Post.objects.count()} '
+            f'({type(index).__name__})'
+        ))
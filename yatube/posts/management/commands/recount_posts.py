@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import recount_all
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики постов авторов, групп и тегов, '
+        'упоминаний и комментариев'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = recount_all()
+        self.stdout.write(self.style.SUCCESS(
+            'Пересчитано: авторов {authors}, групп {groups}, '
+            'постов {posts}, тегов {tags}'.format(**updated)
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import tags
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Заново извлекает теги и упоминания из текстов всех постов'
+
+    def handle(self, *args, **options):
+        count = 0
+        with transaction.atomic():
+            for post in Post.objects.only('text', 'author', 'pub_date'):
+                tags.sync(post)
+                count += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано постов: {count}'
+        ))
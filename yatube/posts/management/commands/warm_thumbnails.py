@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.caching import bump_generation
+from posts import thumbnails
+from posts.models import Post
+from posts.signals import POSTS_GENERATION
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры для всех картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Число потоков, создающих миниатюры',
+        )
+
+    def handle(self, *args, workers, **options):
+        names = Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct()
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(self.warm_in_worker, names.iterator()))
+        else:
+            results = [self.warm(name) for name in names.iterator()]
+        if any(results):
+            # Страницы из кэша сбрасываются один раз на весь прогрев
+            bump_generation(POSTS_GENERATION)
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок: {len(results)}, с новой миниатюрой: {sum(results)}'
+        ))
+
+    def warm(self, name):
+        try:
+            return thumbnails.generate(name)
+        except Exception as error:
+            self.stderr.write(f'{name}: {error}')
+            return False
+
+    def warm_in_worker(self, name):
+        try:
+            return self.warm(name)
+        finally:
+            connection.close()
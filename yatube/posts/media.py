@@ -0,0 +1,26 @@
+from django.db.models import F
+
+from .models import MediaBlob
+
+
+def acquire(name):
+    if not name:
+        return
+    MediaBlob.objects.get_or_create(name=name)
+    MediaBlob.objects.filter(name=name).update(refs=F('refs') + 1)
+
+
+def release(name):
+    """Снимает ссылку; файл без ссылок удалит collect_media.
+
+    Удалять файл сразу нельзя: тот же файл могут загрузить заново в ещё
+    не закоммиченной транзакции, и ContentAddressedStorage его не
+    перезапишет. Сборщик не трогает файлы моложе min_age, а повторная
+    загрузка обновляет mtime.
+    """
+    if not name:
+        return
+    MediaBlob.objects.filter(name=name, refs__gt=0).update(
+        refs=F('refs') - 1
+    )
+    MediaBlob.objects.filter(name=name, refs=0).delete()
@@ -0,0 +1,69 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Comment = apps.get_model('posts', 'Comment')
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    per_author = Post.objects.order_by().values('author').annotate(
+        total=models.Count('pk')
+    )
+    AuthorStats.objects.bulk_create(
+        AuthorStats(user_id=row['author'], posts_count=row['total'])
+        for row in per_author
+    )
+    per_group = Post.objects.exclude(group=None).order_by().values(
+        'group'
+    ).annotate(total=models.Count('pk'))
+    for row in per_group:
+        Group.objects.filter(pk=row['group']).update(posts_count=row['total'])
+    per_post = Comment.objects.order_by().values('post').annotate(
+        total=models.Count('pk')
+    )
+    for row in per_post:
+        Post.objects.filter(pk=row['post']).update(
+            comments_count=row['total']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0008_auto_20221125_0229'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+            ],
+            options={
+                'verbose_name': 'Счётчик автора',
+                'verbose_name_plural': 'Счётчики авторов',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.AddField(
+            model_name='authorstats',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
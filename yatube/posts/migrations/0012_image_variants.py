@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('width', models.PositiveIntegerField(verbose_name='Ширина')),
+                ('height', models.PositiveIntegerField(verbose_name='Высота')),
+                ('format', models.CharField(max_length=10, verbose_name='Формат')),
+                ('file', models.FileField(upload_to='posts/variants/', verbose_name='Файл')),
+                ('size', models.PositiveIntegerField(verbose_name='Размер, байт')),
+                ('source_size', models.PositiveIntegerField(verbose_name='Размер исходника, байт')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_variants', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Вариант картинки',
+                'verbose_name_plural': 'Варианты картинок',
+                'ordering': ['format', 'width'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='imagevariant',
+            constraint=models.UniqueConstraint(fields=('post', 'format', 'width'), name='unique_image_variant'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_fts_table(apps, schema_editor):
+    # Без FTS5 поиск работает по обычной таблице SearchPosting
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        options = {row[0] for row in cursor.fetchall()}
+    if 'ENABLE_FTS5' not in options:
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5('
+        "text, comments, tokenize='unicode61 remove_diacritics 0')"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_media_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Терм')),
+                ('text_count', models.PositiveIntegerField(verbose_name='Вхождений в тексте')),
+                ('comments_count', models.PositiveIntegerField(verbose_name='Вхождений в комментариях')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Запись поискового индекса',
+                'verbose_name_plural': 'Записи поискового индекса',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchposting',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_posting'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
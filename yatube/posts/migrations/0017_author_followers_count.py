@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:03
+
+from django.db import migrations, models
+
+
+def fill_followers(apps, schema_editor):
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Follow = apps.get_model('posts', 'Follow')
+    per_author = Follow.objects.order_by().values('author').annotate(
+        total=models.Count('pk')
+    )
+    for row in per_author:
+        AuthorStats.objects.update_or_create(
+            user_id=row['author'],
+            defaults={'followers_count': row['total']},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='followers_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='Количество подписчиков'),
+        ),
+        migrations.RunPython(fill_followers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-18 23:40
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+# В 0008 имя ограничения записано с опечаткой, в модели — без неё
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_author_followers_count'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='follow',
+            name='fields_not_equial',
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(_negated=True, author=django.db.models.expressions.F('user')), name='fields_not_equal'),
+        ),
+    ]
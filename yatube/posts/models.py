@@ -2,6 +2,8 @@ from django.contrib.auth import get_user_model
 from django.db import models
 from django.db.models import Q, F
 
+from core.storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -17,6 +19,8 @@ class Follow(models.Model):
         related_name='following',
         on_delete=models.CASCADE,
         verbose_name='Автор',
+        # Поиск по автору идёт по индексу (author, user)
+        db_index=False,
     )
 
     def __str__(self) -> str:
@@ -31,12 +35,57 @@ class Follow(models.Model):
                 check=~Q(author=F('user')), name='fields_not_equal'
             ),
         ]
+        indexes = [
+            # Подписчики автора: рассылка в ленты и подсчёт для «звёзд»
+            # читаются из индекса, без обращения к таблице
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+        ]
+
+
+class CountersModel(models.Model):
+    """Модель со счётчиками, которые меняются только F()-обновлениями.
+
+    Обычное сохранение загруженного объекта не пишет counter_fields:
+    значение в памяти могло устареть и затёрло бы сдвиги из сигналов.
+    По той же причине не пишутся worker_fields — их заполняют фоновые
+    задачи через update().
+    """
+
+    counter_fields = ()
+    worker_fields = ()
+
+    class Meta:
+        abstract = True
 
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        if (update_fields is None and not force_insert
+                and not self._state.adding):
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred
+                and field.name not in self.counter_fields
+                and field.name not in self.worker_fields
+            ]
+        super().save(
+            force_insert=force_insert, force_update=force_update,
+            using=using, update_fields=update_fields,
+        )
 
-class Group(models.Model):
+
+class Group(CountersModel):
     title = models.CharField('Заголовок', max_length=200)
     slug = models.SlugField('Адрес', unique=True)
     description = models.TextField('Описание')
+    posts_count = models.PositiveIntegerField(
+        'Количество постов', default=0, editable=False
+    )
+
+    counter_fields = ('posts_count',)
 
     class Meta:
         verbose_name_plural = 'Группы'
@@ -46,14 +95,18 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class Post(CountersModel):
     text = models.TextField('Текст поста', help_text='Введите текст поста')
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated = models.DateTimeField(
+        'Дата изменения', auto_now=True, db_index=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='posts',
-        verbose_name='Автор'
+        verbose_name='Автор',
+        db_index=False,
     )
     group = models.ForeignKey(
         Group,
@@ -63,21 +116,53 @@ class Post(models.Model):
         related_name='posts',
         verbose_name='Группа поста',
         help_text='Выбрать группу для поста',
+        db_index=False,
     )
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    # Имя готовой миниатюры sorl; пишется после её создания в фоне
+    thumbnail = models.CharField(
+        'Миниатюра', max_length=255, blank=True, editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев', default=0, editable=False
+    )
+
+    counter_fields = ('comments_count',)
+    worker_fields = ('thumbnail',)
 
     class Meta:
         verbose_name_plural = 'Посты'
         verbose_name = 'Пост'
         ordering = ['-pub_date']
+        # Ленты главной, автора и группы отдают страницу прямо из индекса,
+        # без сортировки всех подходящих постов. Составные индексы
+        # заменяют одиночные индексы внешних ключей author и group
+        indexes = [
+            models.Index(fields=['-pub_date'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date'], name='post_author_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date'], name='post_group_date_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # Группа на момент загрузки — чтобы при сохранении перенести счётчик
+        post._loaded_group_id = post.__dict__.get('group_id')
+        post._loaded_image = post.__dict__.get('image')
+        return post
+
 
 class Comment(models.Model):
     text = models.TextField(
@@ -87,6 +172,7 @@ class Comment(models.Model):
         Post,
         on_delete=models.CASCADE,
         related_name='comments',
+        db_index=False,
     )
     author = models.ForeignKey(
         User,
@@ -95,5 +181,221 @@ class Comment(models.Model):
     )
     created = models.DateTimeField("Дата публикации", auto_now_add=True)
 
+    class Meta:
+        # Заменяет индекс внешнего ключа post
+        indexes = [
+            models.Index(
+                fields=['post', 'created'], name='comment_post_created_idx'
+            ),
+        ]
+
     def __str__(self) -> str:
         return self.text
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Автор',
+    )
+    posts_count = models.PositiveIntegerField('Количество постов', default=0)
+    mentions_count = models.PositiveIntegerField(
+        'Количество упоминаний', default=0
+    )
+    # Индекс: популярные авторы ленты подписок выбираются по диапазону
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0, db_index=True
+    )
+
+    class Meta:
+        verbose_name_plural = 'Счётчики авторов'
+        verbose_name = 'Счётчик автора'
+
+    def __str__(self) -> str:
+        return f'{self.user}: {self.posts_count}'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name_plural = 'Записи лент подписок'
+        verbose_name = 'Запись ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'], name='timeline_user_date_idx'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.user} <-- {self.post_id}'
+
+
+class ImageVariant(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='image_variants',
+        verbose_name='Пост',
+    )
+    width = models.PositiveIntegerField('Ширина')
+    height = models.PositiveIntegerField('Высота')
+    format = models.CharField('Формат', max_length=10)
+    file = models.FileField('Файл', upload_to='posts/variants/')
+    size = models.PositiveIntegerField('Размер, байт')
+    source_size = models.PositiveIntegerField('Размер исходника, байт')
+
+    class Meta:
+        verbose_name_plural = 'Варианты картинок'
+        verbose_name = 'Вариант картинки'
+        ordering = ['format', 'width']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'format', 'width'],
+                name='unique_image_variant',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.post_id}: {self.format} {self.width}w'
+
+
+class MediaBlob(models.Model):
+    """Число постов, ссылающихся на файл картинки в хранилище."""
+
+    name = models.CharField('Файл', max_length=255, unique=True)
+    refs = models.PositiveIntegerField('Ссылок', default=0)
+
+    class Meta:
+        verbose_name_plural = 'Файлы картинок'
+        verbose_name = 'Файл картинки'
+
+    def __str__(self) -> str:
+        return f'{self.name}: {self.refs}'
+
+
+class SearchPosting(models.Model):
+    """Запись обратного индекса поиска: терм встречается в посте."""
+
+    term = models.CharField('Терм', max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_postings',
+        verbose_name='Пост',
+    )
+    text_count = models.PositiveIntegerField('Вхождений в тексте')
+    comments_count = models.PositiveIntegerField('Вхождений в комментариях')
+
+    class Meta:
+        verbose_name_plural = 'Записи поискового индекса'
+        verbose_name = 'Запись поискового индекса'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'], name='unique_search_posting'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.term} → {self.post_id}'
+
+
+class Tag(CountersModel):
+    name = models.CharField('Тег', max_length=100, unique=True)
+    posts_count = models.PositiveIntegerField(
+        'Количество постов', default=0, editable=False
+    )
+
+    counter_fields = ('posts_count',)
+
+    class Meta:
+        verbose_name_plural = 'Теги'
+        verbose_name = 'Тег'
+
+    def __str__(self) -> str:
+        return f'#{self.name}'
+
+
+class Tagging(models.Model):
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='taggings',
+        verbose_name='Тег',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='taggings',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name_plural = 'Теги постов'
+        verbose_name = 'Тег поста'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tag', 'post'], name='unique_tagging'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['tag', '-pub_date'], name='tagging_tag_date_idx'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.tag} <-- {self.post_id}'
+
+
+class Mention(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        verbose_name='Упомянутый',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name_plural = 'Упоминания'
+        verbose_name = 'Упоминание'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_mention'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'], name='mention_user_date_idx'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'@{self.user} <-- {self.post_id}'
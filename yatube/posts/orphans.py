@@ -0,0 +1,218 @@
+import json
+import logging
+import os
+import time
+from collections import Counter
+from itertools import islice
+
+from django.conf import settings
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix, del_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    KVStore as CachedDbKVStore,
+)
+from sorl.thumbnail.models import KVStore
+
+from .models import ImageVariant, MediaBlob, Post
+
+logger = logging.getLogger(__name__)
+
+THUMBNAILS_PREFIX = add_prefix('', 'thumbnails')
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def walk(root, directory):
+    """Файлы каталога как (имя от root, размер, mtime), без списка в памяти."""
+    directories = [os.path.join(root, directory)]
+    while directories:
+        directory = directories.pop()
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    name = os.path.relpath(entry.path, root)
+                    yield (
+                        name.replace(os.sep, '/'), stat.st_size,
+                        stat.st_mtime,
+                    )
+
+
+def in_database():
+    """Записи sorl лежат в модели KVStore только у cached_db-хранилища."""
+    return isinstance(default.kvstore, CachedDbKVStore)
+
+
+def record_keys(prefix, batch_size):
+    """Пачки ключей записей sorl с префиксом, по возрастанию."""
+    if not in_database():
+        # Другие хранилища отдают ключи только все сразу
+        keys = sorted(default.kvstore._find_keys_raw(prefix))
+        yield from batched(keys, batch_size)
+        return
+    last_key = ''
+    while True:
+        keys = list(KVStore.objects.filter(
+            key__startswith=prefix, key__gt=last_key
+        ).order_by('key').values_list('key', flat=True)[:batch_size])
+        if not keys:
+            return
+        last_key = keys[-1]
+        yield keys
+
+
+def record_values(keys):
+    """JSON записей sorl по ключам; пропавших записей в ответе нет."""
+    keys = list(keys)
+    if in_database():
+        return dict(KVStore.objects.filter(key__in=keys).values_list(
+            'key', 'value'
+        ))
+    values = ((key, default.kvstore._get_raw(key)) for key in keys)
+    return {key: value for key, value in values if value is not None}
+
+
+def thumbnail_record_key(name):
+    return add_prefix(ImageFile(name, default.storage).key)
+
+
+class StoredImage:
+    """Исходник по ключу его записи в sorl.
+
+    Публичным kvstore.delete() нужен только key; имя исходника может
+    быть уже неизвестно, если его запись пропала раньше списка миниатюр.
+    """
+
+    def __init__(self, key):
+        self.key = key
+
+
+def referenced(names):
+    """Какие из имён файлов ещё нужны постам, вариантам или sorl."""
+    names = list(names)
+    found = set(Post.objects.filter(image__in=names).values_list(
+        'image', flat=True
+    ))
+    found.update(MediaBlob.objects.filter(
+        name__in=names, refs__gt=0
+    ).values_list('name', flat=True))
+    found.update(ImageVariant.objects.filter(file__in=names).values_list(
+        'file', flat=True
+    ))
+    keys = {
+        thumbnail_record_key(name): name for name in names
+        if name.startswith(thumbnail_settings.THUMBNAIL_PREFIX)
+    }
+    found.update(keys[key] for key in record_values(keys))
+    return found
+
+
+class Collector:
+    """Удаляет файлы MEDIA_ROOT и записи sorl, на которые никто не ссылается.
+
+    И файлы, и key-value store обходятся пачками по batch_size, так что
+    память не зависит от размера хранилища. Файлы моложе min_age секунд
+    не трогаются: их могли только что загрузить в ещё не закоммиченный
+    пост.
+    """
+
+    def __init__(self, batch_size=500, min_age=3600, dry_run=False):
+        self.batch_size = batch_size
+        self.min_age = min_age
+        self.dry_run = dry_run
+        self.stats = Counter()
+
+    def run(self):
+        self.collect_thumbnail_records()
+        self.collect_files()
+        return self.stats
+
+    def stale_sources(self):
+        """Пачки записей sorl об исходниках, которых нет у постов."""
+        for keys in record_keys(THUMBNAILS_PREFIX, self.batch_size):
+            sources = {
+                add_prefix(key[len(THUMBNAILS_PREFIX):]): key for key in keys
+            }
+            names = {
+                key: json.loads(value)['name']
+                for key, value in record_values(sources).items()
+            }
+            alive = referenced(names.values())
+            yield [
+                (source_key, thumbnails_key)
+                for source_key, thumbnails_key in sources.items()
+                if names.get(source_key) not in alive
+            ]
+
+    def collect_thumbnail_records(self):
+        for stale in self.stale_sources():
+            for source_key, thumbnails_key in stale:
+                self.drop_source(source_key, thumbnails_key)
+
+    def drop_source(self, source_key, thumbnails_key):
+        value = record_values([thumbnails_key]).get(thumbnails_key)
+        thumbnail_keys = [add_prefix(key) for key in json.loads(value or '[]')]
+        for value in record_values(thumbnail_keys).values():
+            name = json.loads(value)['name']
+            if default.storage.exists(name):
+                self.count_file(default.storage.size(name))
+        self.stats['records'] += 1 + len(thumbnail_keys)
+        if self.dry_run:
+            return
+        # Записи миниатюр, их файлы и запись исходника удаляет сам sorl
+        try:
+            default.kvstore.delete(StoredImage(del_prefix(source_key)))
+        except OSError:
+            logger.exception('Не удалось удалить миниатюры %s', source_key)
+
+    def collect_files(self):
+        deadline = time.time() - self.min_age
+        files = (
+            (name, size)
+            for directory in self.directories()
+            for name, size, mtime in walk(settings.MEDIA_ROOT, directory)
+            if mtime < deadline
+        )
+        for batch in batched(files, self.batch_size):
+            self.stats['scanned'] += len(batch)
+            alive = referenced(name for name, _ in batch)
+            for name, size in batch:
+                if name not in alive:
+                    self.delete_file(name, size)
+
+    @staticmethod
+    def directories():
+        # Остальное содержимое MEDIA_ROOT сборщику не принадлежит
+        return (
+            Post._meta.get_field('image').upload_to,
+            thumbnail_settings.THUMBNAIL_PREFIX,
+        )
+
+    def count_file(self, size):
+        self.stats['files'] += 1
+        self.stats['bytes'] += size
+
+    def delete_file(self, name, size):
+        self.count_file(size)
+        if self.dry_run:
+            return
+        try:
+            os.remove(os.path.join(settings.MEDIA_ROOT, name))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.exception('Не удалось удалить %s', name)
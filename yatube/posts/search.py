@@ -0,0 +1,312 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import Comment, Post, SearchPosting
+from .stemming import stem
+
+SEARCH_AUTO = 'auto'
+SEARCH_FTS5 = 'fts5'
+SEARCH_PYTHON = 'python'
+
+FTS_TABLE = 'posts_search'
+WORD = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+# Совпадение в тексте поста весит больше, чем в комментариях
+TEXT_WEIGHT = 2.0
+COMMENTS_WEIGHT = 1.0
+
+
+def terms(text):
+    return [
+        stem(word) for word in WORD.findall(text)
+        if len(word) <= MAX_TERM_LENGTH
+    ]
+
+
+def query_terms(query):
+    """Уникальные термы запроса в исходном порядке."""
+    return list(dict.fromkeys(terms(query)))
+
+
+_fts5_tables = {}
+
+
+def fts5_available():
+    """Есть ли таблица FTS5: миграция создаёт её, только если SQLite умеет."""
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts5_tables:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT COUNT(*) FROM sqlite_master WHERE name = %s',
+                [FTS_TABLE],
+            )
+            _fts5_tables[name] = cursor.fetchone()[0] == 1
+    return _fts5_tables[name]
+
+
+class FTS5Index:
+    """Виртуальная таблица FTS5 с уже нормализованными термами.
+
+    Токенизаторы SQLite не умеют русскую морфологию, поэтому в таблицу
+    пишется текст после стемминга, а BM25 считает сама SQLite.
+    """
+
+    def update(self, post_id, text, comments):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text, comments) '
+                'VALUES (%s, %s, %s)',
+                [post_id, ' '.join(terms(text)), ' '.join(terms(comments))],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def add_comment(self, post_id, text):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {FTS_TABLE} SET comments = comments || ' ' || %s "
+                'WHERE rowid = %s',
+                [' '.join(terms(text)), post_id],
+            )
+        return True
+
+    def remove_comment(self, post_id, text):
+        """Вырезает термы комментария из строки поста; False — не нашлись."""
+        sequence = ' '.join(terms(text))
+        if not sequence:
+            return True
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT comments FROM {FTS_TABLE} WHERE rowid = %s',
+                [post_id],
+            )
+            row = cursor.fetchone()
+            stored = f' {row[0]} ' if row else ''
+            if f' {sequence} ' not in stored:
+                return False
+            cursor.execute(
+                f'UPDATE {FTS_TABLE} SET comments = %s WHERE rowid = %s',
+                [stored.replace(f' {sequence} ', ' ', 1).strip(), post_id],
+            )
+        return True
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, query_terms, limit):
+        match = ' '.join(f'"{term}"' for term in query_terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, %s, %s), rowid DESC LIMIT %s',
+                [match, TEXT_WEIGHT, COMMENTS_WEIGHT, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class InvertedIndex:
+    """Обратный индекс в обычной таблице: терм → посты с частотами.
+
+    Ранжирование TF-IDF считается в Python; работает на любой СУБД.
+    """
+
+    def update(self, post_id, text, comments):
+        text_counts = Counter(terms(text))
+        comment_counts = Counter(terms(comments))
+        SearchPosting.objects.filter(post_id=post_id).delete()
+        SearchPosting.objects.bulk_create(
+            SearchPosting(
+                term=term,
+                post_id=post_id,
+                text_count=text_counts[term],
+                comments_count=comment_counts[term],
+            )
+            for term in text_counts.keys() | comment_counts.keys()
+        )
+
+    def remove(self, post_id):
+        SearchPosting.objects.filter(post_id=post_id).delete()
+
+    def add_comment(self, post_id, text):
+        counts = Counter(terms(text))
+        if not counts:
+            return True
+        self._shift_comments(post_id, counts, 1)
+        existing = set(SearchPosting.objects.filter(
+            post_id=post_id, term__in=counts
+        ).values_list('term', flat=True))
+        SearchPosting.objects.bulk_create(
+            SearchPosting(
+                term=term, post_id=post_id, text_count=0,
+                comments_count=count,
+            )
+            for term, count in counts.items() if term not in existing
+        )
+        return True
+
+    def remove_comment(self, post_id, text):
+        counts = Counter(terms(text))
+        if not counts:
+            return True
+        postings = SearchPosting.objects.filter(
+            post_id=post_id, term__in=counts
+        )
+        short = [
+            term for term, comments_count in postings.values_list(
+                'term', 'comments_count'
+            )
+            if comments_count < counts[term]
+        ]
+        if short or postings.count() != len(counts):
+            return False
+        self._shift_comments(post_id, counts, -1)
+        postings.filter(text_count=0, comments_count=0).delete()
+        return True
+
+    @staticmethod
+    def _shift_comments(post_id, counts, sign):
+        """Сдвигает comments_count всех термов комментария одним UPDATE."""
+        SearchPosting.objects.filter(
+            post_id=post_id, term__in=counts
+        ).update(comments_count=F('comments_count') + Case(
+            *(
+                When(term=term, then=Value(sign * count))
+                for term, count in counts.items()
+            ),
+            output_field=IntegerField(),
+        ))
+
+    def clear(self):
+        SearchPosting.objects.all().delete()
+
+    def search(self, query_terms, limit):
+        postings = SearchPosting.objects.filter(
+            term__in=query_terms
+        ).values_list('term', 'post_id', 'text_count', 'comments_count')
+        by_post = defaultdict(dict)
+        frequency = Counter()
+        for term, post_id, text_count, comments_count in postings:
+            by_post[post_id][term] = (
+                TEXT_WEIGHT * text_count + COMMENTS_WEIGHT * comments_count
+            )
+            frequency[term] += 1
+        total = SearchPosting.objects.values('post').distinct().count()
+        scores = [
+            (
+                sum(
+                    weight * math.log(1 + total / frequency[term])
+                    for term, weight in found.items()
+                ),
+                post_id,
+            )
+            for post_id, found in by_post.items()
+            if len(found) == len(query_terms)
+        ]
+        scores.sort(reverse=True)
+        return [post_id for _, post_id in scores[:limit]]
+
+
+def get_index():
+    backend = settings.SEARCH_BACKEND
+    if backend == SEARCH_AUTO:
+        backend = SEARCH_FTS5 if fts5_available() else SEARCH_PYTHON
+    return FTS5Index() if backend == SEARCH_FTS5 else InvertedIndex()
+
+
+def index_post(post_id):
+    """Переиндексирует пост вместе с текстами его комментариев."""
+    text = Post.objects.filter(pk=post_id).values_list(
+        'text', flat=True
+    ).first()
+    if text is None:
+        return
+    comments = Comment.objects.filter(post_id=post_id).values_list(
+        'text', flat=True
+    )
+    get_index().update(post_id, text, '\n'.join(comments))
+
+
+# Посты, которые сейчас удаляются: каскадное удаление их комментариев
+# не должно переиндексировать пост перед тем, как он уйдёт из индекса
+_state = threading.local()
+
+
+def _deleting_posts():
+    if not hasattr(_state, 'posts'):
+        _state.posts = set()
+    return _state.posts
+
+
+def post_deleting(post_id):
+    _deleting_posts().add(post_id)
+
+
+def remove_post(post_id):
+    _deleting_posts().discard(post_id)
+    get_index().remove(post_id)
+
+
+def add_comment(comment):
+    """Добавляет в индекс только термы нового комментария."""
+    get_index().add_comment(comment.post_id, comment.text)
+
+
+def remove_comment(comment):
+    if comment.post_id in _deleting_posts():
+        return
+    if not get_index().remove_comment(comment.post_id, comment.text):
+        # Индекс разошёлся с комментариями — собираем пост целиком
+        index_post(comment.post_id)
+
+
+def rebuild():
+    index = get_index()
+    index.clear()
+    for post_id in list(Post.objects.values_list('pk', flat=True)):
+        index_post(post_id)
+
+
+def search(query):
+    """id постов по убыванию релевантности, не больше SEARCH_MAX_RESULTS."""
+    found_terms = query_terms(query)
+    if not found_terms:
+        return []
+    return get_index().search(found_terms, settings.SEARCH_MAX_RESULTS)
+
+
+class RankedPosts:
+    """Ленивая последовательность постов в порядке релевантности.
+
+    Paginator берёт у неё длину и срез страницы; посты загружаются
+    только для этой страницы.
+    """
+
+    def __init__(self, post_ids, queryset):
+        self.post_ids = post_ids
+        self.queryset = queryset
+
+    def __len__(self):
+        return len(self.post_ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        page_ids = self.post_ids[index]
+        posts = self.queryset.in_bulk(page_ids)
+        return [posts[post_id] for post_id in page_ids if post_id in posts]
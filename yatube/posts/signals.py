@@ -0,0 +1,177 @@
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save,
+)
+from django.dispatch import receiver
+
+from core.caching import bump_generation
+from . import counters, media, search, tags, timeline
+from .models import Comment, Follow, Group, Post, User
+
+# Поколение, от которого зависят закэшированные фрагменты лент
+POSTS_GENERATION = 'posts'
+# Поля пользователя, которые выводят карточки и страницы постов
+AUTHOR_NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.author_posts_changed(instance.author_id, 1)
+        counters.group_posts_changed(instance.group_id, 1)
+    else:
+        loaded_group_id = getattr(
+            instance, '_loaded_group_id', instance.group_id
+        )
+        if loaded_group_id != instance.group_id:
+            counters.group_posts_changed(loaded_group_id, -1)
+            counters.group_posts_changed(instance.group_id, 1)
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.author_posts_changed(instance.author_id, -1)
+    counters.group_posts_changed(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def post_image_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    name = instance.image.name or ''
+    loaded = None if created else getattr(instance, '_loaded_image', None)
+    if created or (loaded is not None and loaded != name):
+        media.acquire(name)
+        media.release(loaded)
+    if loaded is not None and loaded != name:
+        # Миниатюра была у старой картинки; новую запишет thumbnails.
+        # Обычное сохранение thumbnail не пишет (Post.worker_fields)
+        Post.objects.filter(pk=instance.pk).update(thumbnail='')
+        instance.thumbnail = ''
+    instance._loaded_image = name
+
+
+@receiver(post_delete, sender=Post)
+def post_image_deleted(sender, instance, **kwargs):
+    media.release(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.post_comments_changed(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.post_comments_changed(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def post_fan_out(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_search_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_post(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_search_deleted(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(pre_delete, sender=Post)
+def post_search_deleting(sender, instance, **kwargs):
+    search.post_deleting(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_search_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        search.add_comment(instance)
+    else:
+        # Прежний текст неизвестен: пост индексируется заново
+        search.index_post(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_search_deleted(sender, instance, **kwargs):
+    search.remove_comment(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_tags_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        tags.sync(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def post_tags_deleting(sender, instance, **kwargs):
+    tags.post_deleting(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.author_followers_changed(instance.author_id, 1)
+        timeline.add_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.author_followers_changed(instance.author_id, -1)
+    timeline.remove_author(instance.user_id, instance.author_id)
+
+
+def invalidate_fragments(sender, raw=False, **kwargs):
+    if raw:
+        return
+    bump_generation(POSTS_GENERATION)
+    # Повторно после коммита: параллельный запрос мог успеть закэшировать
+    # данные до коммита под новым поколением
+    transaction.on_commit(lambda: bump_generation(POSTS_GENERATION))
+
+
+@receiver(pre_save, sender=User)
+def user_names_changing(sender, instance, raw=False, update_fields=None,
+                        **kwargs):
+    instance._names_changed = False
+    if raw or instance.pk is None:
+        return
+    # Вход пользователя сохраняет только last_login — без лишнего запроса
+    if (update_fields is not None
+            and not set(update_fields) & set(AUTHOR_NAME_FIELDS)):
+        return
+    loaded = User.objects.filter(pk=instance.pk).values_list(
+        *AUTHOR_NAME_FIELDS
+    ).first()
+    instance._names_changed = loaded is not None and loaded != tuple(
+        getattr(instance, field) for field in AUTHOR_NAME_FIELDS
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, raw=False, **kwargs):
+    if getattr(instance, '_names_changed', False):
+        invalidate_fragments(sender, raw=raw)
+    instance._names_changed = False
+
+
+for model in (Post, Group, Comment, Follow):
+    post_save.connect(
+        invalidate_fragments, sender=model,
+        dispatch_uid=f'invalidate_fragments_save_{model.__name__}',
+    )
+    post_delete.connect(
+        invalidate_fragments, sender=model,
+        dispatch_uid=f'invalidate_fragments_delete_{model.__name__}',
+    )
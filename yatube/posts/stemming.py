@@ -0,0 +1,126 @@
+"""Стеммер Snowball для русского языка.
+
+Отрезает окончания по алгоритму Портера, чтобы «котами», «кота» и «кот»
+попадали в поиске в один терм. Слова не на кириллице только приводятся
+к нижнему регистру.
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    (),
+    (
+        'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+        'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую',
+        'юю', 'ая', 'яя', 'ою', 'ею',
+    ),
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    ),
+    (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+        'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+        'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ),
+)
+NOUN = (
+    (),
+    (
+        'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+        'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+        'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+        'ья', 'я',
+    ),
+)
+DERIVATIONAL = ('ость', 'ост')
+SUPERLATIVE = ('ейше', 'ейш')
+
+CYRILLIC = re.compile('[а-я]')
+
+
+def _strip(word, groups):
+    """Отрезает самое длинное окончание; первой группе нужна «а» или «я»."""
+    first, second = groups
+    endings = [(ending, False) for ending in first]
+    endings += [(ending, True) for ending in second]
+    for ending, standalone in sorted(
+        endings, key=lambda item: len(item[0]), reverse=True
+    ):
+        if word.endswith(ending):
+            stem = word[:-len(ending)]
+            if standalone or stem.endswith(('а', 'я')):
+                return stem
+            return None
+    return None
+
+
+def _region_start(word, start=0):
+    """Начало R1: после первой согласной, идущей за гласной."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def _step1(rv):
+    stem = _strip(rv, PERFECTIVE_GERUND)
+    if stem is not None:
+        return stem
+    rv = _strip(rv, REFLEXIVE) or rv
+    stem = _strip(rv, ADJECTIVE)
+    if stem is not None:
+        return _strip(stem, PARTICIPLE) or stem
+    for groups in (VERB, NOUN):
+        stem = _strip(rv, groups)
+        if stem is not None:
+            return stem
+    return rv
+
+
+def _step4(rv):
+    for ending in SUPERLATIVE:
+        if rv.endswith(ending):
+            rv = rv[:-len(ending)]
+            break
+    if rv.endswith('нн'):
+        return rv[:-1]
+    if rv.endswith('ь'):
+        return rv[:-1]
+    return rv
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC.search(word):
+        return word
+    vowel = next(
+        (index for index, letter in enumerate(word) if letter in VOWELS),
+        None,
+    )
+    if vowel is None:
+        return word
+    # Области считаются по исходному слову: RV — после первой гласной,
+    # R2 — для словообразовательных суффиксов
+    prefix, rv = word[:vowel + 1], word[vowel + 1:]
+    r2 = _region_start(word, _region_start(word)) - len(prefix)
+    rv = _step1(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    for ending in DERIVATIONAL:
+        if rv.endswith(ending) and len(rv) - len(ending) >= r2:
+            rv = rv[:-len(ending)]
+            break
+    return prefix + _step4(rv)
@@ -0,0 +1,102 @@
+import re
+
+from django.db.models import F
+
+from . import counters
+from .models import Mention, Post, Tag, Tagging, User
+
+TAG = re.compile(r'(?<![\w#&])#(\w{1,100})')
+MENTION = re.compile(r'(?<![\w@])@([\w.+-]{0,149}\w)')
+# Ключи курсора лент тегов и упоминаний: дата из связующей таблицы
+FEED_KEYS = ('-listed_at', '-id')
+
+
+def parse_tags(text):
+    return list(dict.fromkeys(name.lower() for name in TAG.findall(text)))
+
+
+def parse_mentions(text):
+    return list(dict.fromkeys(MENTION.findall(text)))
+
+
+def existing_mentions(texts):
+    """Упомянутые в texts имена существующих пользователей, одним запросом."""
+    names = {name for text in texts for name in MENTION.findall(text)}
+    if not names:
+        return set()
+    return set(User.objects.filter(username__in=names).values_list(
+        'username', flat=True
+    ))
+
+
+def _sync_tags(post):
+    names = parse_tags(post.text)
+    current = dict(
+        post.taggings.values_list('tag__name', 'tag_id')
+    )
+    removed = [tag_id for name, tag_id in current.items() if name not in names]
+    added = [name for name in names if name not in current]
+    if removed:
+        Tagging.objects.filter(post=post, tag_id__in=removed).delete()
+        counters.tag_posts_changed(removed, -1)
+    if added:
+        Tag.objects.bulk_create(
+            [Tag(name=name) for name in added], ignore_conflicts=True
+        )
+        tag_ids = list(
+            Tag.objects.filter(name__in=added).values_list('pk', flat=True)
+        )
+        Tagging.objects.bulk_create(
+            Tagging(tag_id=tag_id, post=post, pub_date=post.pub_date)
+            for tag_id in tag_ids
+        )
+        counters.tag_posts_changed(tag_ids, 1)
+
+
+def _sync_mentions(post):
+    user_ids = set(User.objects.filter(
+        username__in=parse_mentions(post.text)
+    ).exclude(pk=post.author_id).values_list('pk', flat=True))
+    current = set(post.mentions.values_list('user_id', flat=True))
+    removed = current - user_ids
+    added = user_ids - current
+    if removed:
+        Mention.objects.filter(post=post, user_id__in=removed).delete()
+        counters.user_mentions_changed(removed, -1)
+    if added:
+        Mention.objects.bulk_create(
+            Mention(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in added
+        )
+        counters.user_mentions_changed(added, 1)
+
+
+def sync(post):
+    """Приводит теги и упоминания поста в соответствие с его текстом."""
+    _sync_tags(post)
+    _sync_mentions(post)
+
+
+def post_deleting(post):
+    """Снимает счётчики до того, как каскад удалит связи поста."""
+    counters.tag_posts_changed(
+        list(post.taggings.values_list('tag_id', flat=True)), -1
+    )
+    counters.user_mentions_changed(
+        list(post.mentions.values_list('user_id', flat=True)), -1
+    )
+
+
+def tag_feed(tag):
+    # Порядок по pub_date из Tagging: страница берётся из индекса
+    # (tag, -pub_date), а не сортировкой всех постов тега. Аннотация
+    # использует тот же JOIN, что и фильтр, по ней же идёт курсор
+    return Post.objects.filter(taggings__tag=tag).annotate(
+        listed_at=F('taggings__pub_date')
+    ).order_by('-listed_at', '-id')
+
+
+def mentions_feed(user):
+    return Post.objects.filter(mentions__user=user).annotate(
+        listed_at=F('mentions__pub_date')
+    ).order_by('-listed_at', '-id')
@@ -0,0 +1,15 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    """HTML карточек постов страницы из кэша карточек.
+
+    {% post_cards page_obj as cards %}
+    """
+    return [mark_safe(card) for card in cards.render_cards(list(posts))]
@@ -0,0 +1,27 @@
+from django import template
+
+from posts import thumbnails, variants
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post):
+    """Готовая миниатюра картинки поста или None.
+
+    Миниатюры создаются в фоне при загрузке и командой warm_thumbnails,
+    в запросе картинка никогда не ресайзится.
+    """
+    return thumbnails.lookup(post)
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(post):
+    """<picture> с адаптивными вариантами и миниатюрой как запасной."""
+    if not post.image:
+        return {'image': None}
+    return {
+        'image': post.image,
+        'thumbnail': thumbnails.lookup(post),
+        'sources': variants.sources(post.image_variants.all()),
+    }
@@ -0,0 +1,11 @@
+from django import template
+
+from posts.functions import page_cache_key
+
+register = template.Library()
+
+
+@register.filter
+def page_key(page):
+    """{% fragment_cache ... page_obj|page_key %}"""
+    return page_cache_key(page)
@@ -0,0 +1,60 @@
+from django import template
+from django.urls import reverse
+from django.utils.html import conditional_escape, format_html
+from django.utils.safestring import mark_safe
+
+from posts.tags import MENTION, TAG, existing_mentions
+
+register = template.Library()
+
+
+def _tag_link(match):
+    name = match.group(1)
+    return format_html(
+        '<a href="{}">#{}</a>',
+        reverse('posts:tag_posts', args=[name.lower()]), name,
+    )
+
+
+def _mention_links(existing):
+    """Ссылки только на существующих пользователей из existing."""
+    def link(match):
+        username = match.group(1)
+        if username not in existing:
+            return conditional_escape(match.group(0))
+        return format_html(
+            '<a href="{}">@{}</a>',
+            reverse('posts:profile', args=[username]), username,
+        )
+    return link
+
+
+@register.filter(is_safe=True)
+def linkify(text, existing=None):
+    """Превращает #теги и @упоминания в ссылки, остальное экранирует.
+
+    Упоминание становится ссылкой, только если такой пользователь есть.
+    existing — множество уже найденных имён (tags.existing_mentions
+    для всей страницы), без него имена ищутся одним запросом.
+    """
+    # Регулярки применяются к исходному тексту: после экранирования
+    # «&#39;» выглядел бы как тег
+    parts = []
+    position = 0
+    mentions = list(MENTION.finditer(text))
+    if not isinstance(existing, (set, frozenset)):
+        existing = existing_mentions([text]) if mentions else set()
+    mention_link = _mention_links(existing)
+    matches = sorted(
+        [(match, _tag_link) for match in TAG.finditer(text)]
+        + [(match, mention_link) for match in mentions],
+        key=lambda item: item[0].start(),
+    )
+    for match, link in matches:
+        if match.start() < position:
+            continue
+        parts.append(conditional_escape(text[position:match.start()]))
+        parts.append(link(match))
+        position = match.end()
+    parts.append(conditional_escape(text[position:]))
+    return mark_safe(''.join(parts))
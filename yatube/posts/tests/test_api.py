@@ -0,0 +1,120 @@
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+
+@override_settings(PAGE_SIZE=2, COMMENTS_PAGE_SIZE=2)
+class ApiTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='api_author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='api-group', description=''
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}'
+            )
+            for i in range(3)
+        ]
+        cls.comments = [
+            Comment.objects.create(
+                author=cls.author, post=cls.posts[0], text=f'Комментарий {i}'
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, name, params=None, **kwargs):
+        response = self.client.get(
+            reverse(f'api_v1:{name}', kwargs=kwargs), params or {}
+        )
+        return response, json.loads(response.content or 'null')
+
+    def test_feeds_page_by_cursor(self):
+        """Ленты отдаются страницами по курсору, новые сверху."""
+        expected = [post.pk for post in reversed(self.posts)]
+        for name, kwargs in (
+            ('index', {}),
+            ('group_posts', {'slug': self.group.slug}),
+            ('profile', {'username': self.author.username}),
+        ):
+            with self.subTest(name=name):
+                _, first = self.get(name, **kwargs)
+                _, second = self.get(name, {'after': first['next']}, **kwargs)
+                self.assertEqual(
+                    [post['id'] for post in first['results']
+                     + second['results']],
+                    expected,
+                )
+                self.assertIsNone(second['next'])
+                self.assertEqual(first['results'][0]['author'], 'api_author')
+                self.assertEqual(first['results'][0]['group'], 'api-group')
+
+    def test_sparse_fields(self):
+        """fields= оставляет только нужные поля и лишние JOIN не делает."""
+        with self.assertMaxQueries(2) as context:
+            _, data = self.get('index', {'fields': 'id,text'})
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        self.assertNotIn('auth_user', context.captured_queries[-1]['sql'])
+        response, data = self.get('index', {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', data['error'])
+
+    def test_detail_and_comments(self):
+        """Пост и его комментарии по курсору; 404 — тоже JSON."""
+        post = self.posts[0]
+        _, data = self.get('post_detail', post_id=post.pk)
+        self.assertEqual(data['text'], post.text)
+        self.assertEqual(data['comments_count'], 3)
+        _, first = self.get('post_comments', post_id=post.pk)
+        _, second = self.get(
+            'post_comments', {'after': first['next']}, post_id=post.pk
+        )
+        self.assertEqual(
+            [item['text'] for item in first['results'] + second['results']],
+            [comment.text for comment in self.comments],
+        )
+        response, data = self.get('post_detail', post_id=0)
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('error', data)
+
+    def test_etag_and_gzip(self):
+        """Повтор с If-None-Match получает 304; ответ сжимается gzip."""
+        url = reverse('api_v1:index')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            json.loads(gzip.decompress(response.content))['results'][0]['id'],
+            self.posts[-1].pk,
+        )
+        response = self.client.get(
+            url, HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_author_name(self):
+        """Переименование автора меняет ETag поста в API."""
+        url = reverse(
+            'api_v1:post_detail', kwargs={'post_id': self.posts[0].pk}
+        )
+        etag = self.client.get(url)['ETag']
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'api_renamed'
+        author.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['author'], 'api_renamed')
@@ -1,9 +1,11 @@
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
-from django.core.cache import cache
 
-from posts.models import Post, Group
+from posts.models import Follow, Post, Group
 
 User = get_user_model()
 
@@ -13,6 +15,7 @@ class postPagesTests(TestCase):
     def setUpClass(cls):
         super().setUpClass()
         cls.user = User.objects.create_user(username='teo')
+        cls.reader = User.objects.create_user(username='cache_reader')
         cls.group = Group.objects.create(
             title='Заголовок',
             slug='test-slug',
@@ -28,19 +31,59 @@ class postPagesTests(TestCase):
             text='Новый текст',
             group=cls.group,
         )
+        Follow.objects.create(user=cls.reader, author=cls.user)
 
     def setUp(self):
         self.authorized_client = Client()
-        self.authorized_client.force_login(self.user)
+        self.authorized_client.force_login(self.reader)
 
     def test_index_show_correct_context(self):
         """Тест для проверки кэширования главной страницы."""
         response = self.authorized_client.get(reverse('posts:index')).content
-        Post.objects.filter(pk=self.post_new.id).delete()
+        # update() не шлёт сигналов: страница должна прийти из кэша
+        Post.objects.filter(pk=self.post_new.id).update(text='Скрытый текст')
         new_response = self.authorized_client.get(reverse(
             'posts:index')).content
         self.assertEqual(response, new_response)
-        cache.clear()
+        Post.objects.filter(pk=self.post_new.id).delete()
         new_response = self.authorized_client.get(reverse(
             'posts:index')).content
         self.assertNotEqual(response, new_response)
+
+    def test_feed_fragments_invalidated_on_write(self):
+        """Фрагменты лент сбрасываются при изменении постов."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'teo'}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        self.post.text = 'Изменённый текст'
+        self.post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.authorized_client.get(url), 'Изменённый текст'
+                )
+
+    def test_feed_fragments_use_configured_timeout(self):
+        """Фрагменты лент живут FEED_CACHE_TIMEOUT секунд из настроек."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'teo'}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url), self.settings(
+                FEED_CACHE_TIMEOUT=123
+            ), mock.patch(
+                'core.templatetags.fragment_cache.get_or_compute',
+                side_effect=lambda key, compute, timeout: compute(),
+            ) as get_or_compute:
+                cache.clear()
+                self.authorized_client.get(url)
+                get_or_compute.assert_called_once()
+                self.assertEqual(get_or_compute.call_args[0][2], 123)
@@ -0,0 +1,128 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import cards
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class CardCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='card_author', first_name='Анна'
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='card_group', description=''
+        )
+        cls.post = Post.objects.create(
+            text='Текст карточки', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        cards._stats.clear()
+
+    def fresh_post(self):
+        return Post.objects.select_related('author', 'group').get(
+            pk=self.post.pk
+        )
+
+    def render(self):
+        with mock.patch(
+            'posts.cards.render_to_string', wraps=cards.render_to_string
+        ) as render:
+            html = cards.render_cards([self.fresh_post()])[0]
+        return html, render.call_count
+
+    def test_second_render_is_cached(self):
+        """Повторная карточка берётся из кэша без рендеринга."""
+        html, rendered = self.render()
+        self.assertEqual(rendered, 1)
+        self.assertIn('Текст карточки', html)
+        self.assertEqual(self.render(), (html, 0))
+
+    def test_version_changes(self):
+        """Правка поста, имени автора и группы дают новую карточку."""
+        self.render()
+        other = Group.objects.create(
+            title='Другая', slug='card_other', description=''
+        )
+        changes = {
+            'правка': lambda: Post.objects.filter(pk=self.post.pk).update(
+                updated=self.post.updated.replace(year=2030)
+            ),
+            'имя автора': lambda: User.objects.filter(
+                pk=self.author.pk
+            ).update(first_name='Мария'),
+            'слаг группы': lambda: Group.objects.filter(
+                pk=self.group.pk
+            ).update(slug='card_renamed'),
+            'группа': lambda: Post.objects.filter(pk=self.post.pk).update(
+                group=other
+            ),
+        }
+        for name, change in changes.items():
+            with self.subTest(name):
+                change()
+                self.assertEqual(self.render()[1], 1)
+
+    def test_author_rename_refreshes_feed(self):
+        """Смена имени автора видна в ленте, а не только в карточке."""
+        reader = User.objects.create_user(username='card_reader')
+        clients = {'аноним': Client(), 'пользователь': Client()}
+        clients['пользователь'].force_login(reader)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': 'card_group'}),
+        )
+        for client in clients.values():
+            for url in urls:
+                self.assertContains(client.get(url), 'Анна')
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Мария'
+        author.save()
+        for name, client in clients.items():
+            for url in urls:
+                with self.subTest(name, url=url):
+                    response = client.get(url)
+                    self.assertContains(response, 'Мария')
+                    self.assertNotContains(response, 'Анна')
+
+    def test_login_keeps_generation(self):
+        """Сохранение пользователя без смены имени не сбрасывает ленты."""
+        Client().get(reverse('posts:index'))
+        with mock.patch('posts.signals.bump_generation') as bump:
+            self.client.force_login(self.author)
+            author = User.objects.get(pk=self.author.pk)
+            author.email = 'anna@example.com'
+            author.save()
+        bump.assert_not_called()
+
+    def test_feed_uses_one_multi_get(self):
+        """Страница ленты собирает карточки одним get_many."""
+        Post.objects.create(text='Второй пост', author=self.author)
+        with mock.patch.object(
+            cache, 'get_many', wraps=cache.get_many
+        ) as get_many:
+            response = Client().get(reverse('posts:index'))
+        get_many.assert_called_once()
+        self.assertEqual(len(get_many.call_args[0][0]), 2)
+        self.assertContains(response, '<hr>', count=1)
+
+    def test_stats(self):
+        """Попадания и промахи копятся и сбрасываются в общий кэш."""
+        self.render()
+        self.render()
+        self.render()
+        out = StringIO()
+        call_command('card_stats', stdout=out)
+        self.assertEqual(cards.read_stats(), {'hits': 2, 'misses': 1})
+        self.assertIn('hit_ratio=66.7%', out.getvalue())
@@ -1,8 +1,9 @@
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from posts.models import Post, Comment
+from .utils import QueryBudgetMixin
 
 User = get_user_model()
 
@@ -57,3 +58,58 @@ class CommentsTest(TestCase):
             )
         )
         self.assertContains(response, expected_comment)
+
+
+@override_settings(COMMENTS_PAGE_SIZE=3)
+class CommentsPaginationTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = Post.objects.create(
+            author=User.objects.create_user(username='paged_author'),
+            text='text',
+        )
+        cls.comments = [
+            Comment.objects.create(
+                author=User.objects.create_user(username=f'reader_{i}'),
+                text=f'comment-{i}',
+                post=cls.post,
+            )
+            for i in range(7)
+        ]
+
+    def load(self, name, **params):
+        return Client().get(
+            reverse(f'posts:{name}', kwargs={'post_id': self.post.pk}),
+            params,
+        )
+
+    def test_pages_follow_order(self):
+        """Комментарии идут порциями в выбранном порядке без пропусков."""
+        for order, expected in (
+            ('oldest', self.comments),
+            ('newest', self.comments[::-1]),
+        ):
+            with self.subTest(order=order):
+                page = self.load('post_detail', order=order).context[
+                    'comments'
+                ]
+                loaded = list(page)
+                while page.has_next():
+                    page = self.load(
+                        'post_comments', order=order, after=page.next_cursor
+                    ).context['comments']
+                    loaded += list(page)
+                self.assertEqual(loaded, expected)
+
+    def test_fragment_and_queries(self):
+        """Фрагмент — только комментарии; авторы загружаются одним JOIN."""
+        with self.assertMaxQueries(2):
+            response = self.load('post_comments')
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertContains(response, 'data-fragment=', count=1)
+        response = self.load('post_comments', after=response.context[
+            'comments'
+        ].next_cursor)
+        self.assertContains(response, 'comment-3')
+        self.assertNotContains(response, 'comment-0')
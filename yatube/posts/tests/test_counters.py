@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import AuthorStats, Comment, Group, Post
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='counter_user')
+        cls.group = Group.objects.create(
+            title='counter-group',
+            slug='counter-slug',
+            description='counter-description',
+        )
+        cls.group_new = Group.objects.create(
+            title='counter-new-group',
+            slug='counter-new-slug',
+            description='counter-description',
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self):
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'counter-text', 'group': self.group.pk},
+        )
+        return Post.objects.latest('id')
+
+    def assertCounters(self, author, group, group_new):
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.user).posts_count, author
+        )
+        self.group.refresh_from_db()
+        self.group_new.refresh_from_db()
+        self.assertEqual(self.group.posts_count, group)
+        self.assertEqual(self.group_new.posts_count, group_new)
+
+    def test_post_create_edit_delete(self):
+        """Создание, смена группы и удаление поста меняют счётчики."""
+        post = self.create_post()
+        self.assertCounters(1, 1, 0)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            data={'text': 'counter-text', 'group': self.group_new.pk},
+        )
+        self.assertCounters(1, 0, 1)
+        post.refresh_from_db()
+        post.delete()
+        self.assertCounters(0, 0, 0)
+
+    def test_add_comment(self):
+        """Комментарий увеличивает счётчик поста."""
+        post = self.create_post()
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            data={'text': 'comment'},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        Comment.objects.filter(post=post).delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_stale_save_keeps_counters(self):
+        """Сохранение устаревшего объекта не затирает счётчики."""
+        group = Group.objects.get(pk=self.group.pk)
+        post = self.create_post()
+        stale_post = Post.objects.get(pk=post.pk)
+        Comment.objects.create(post=post, author=self.user, text='comment')
+        group.description = 'edited'
+        group.save()
+        stale_post.text = 'edited'
+        stale_post.save()
+        self.assertCounters(1, 1, 0)
+        self.assertEqual(self.group.description, 'edited')
+        post.refresh_from_db()
+        self.assertEqual((post.text, post.comments_count), ('edited', 1))
+
+    def test_profile_shows_counter(self):
+        """Профиль берёт число постов из счётчика."""
+        self.create_post()
+        response = self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': 'counter_user'})
+        )
+        self.assertEqual(response.context['posts_count'], 1)
+
+    def test_recount_posts_command(self):
+        """Команда recount_posts исправляет рассинхронизацию."""
+        post = self.create_post()
+        Comment.objects.create(post=post, author=self.user, text='comment')
+        AuthorStats.objects.update(posts_count=7)
+        Group.objects.update(posts_count=5)
+        Post.objects.update(comments_count=3)
+        call_command('recount_posts', stdout=open('/dev/null', 'w'))
+        self.assertCounters(1, 1, 0)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
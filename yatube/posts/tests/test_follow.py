@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase
 from django.urls import reverse
@@ -38,6 +39,29 @@ class FollowTest(TestCase):
             response, f'/auth/login/?next={url}'
         )
 
+    def test_primary_cookie_only_after_write(self):
+        """Кука основной базы ставится только после настоящей записи."""
+        follow_url = reverse(
+            'posts:profile_follow',
+            kwargs={'username': self.follow_me.username},
+        )
+        edit_url = reverse(
+            'posts:post_edit', kwargs={'post_id': self.post.pk}
+        )
+        for name, response in (
+            ('аноним', self.guest_client.get(follow_url)),
+            ('не автор', self.authorized_client.post(
+                edit_url, data={'text': 'not-mine'}
+            )),
+        ):
+            with self.subTest(name):
+                self.assertEqual(response.status_code, 302)
+                self.assertNotIn(
+                    settings.STICKY_PRIMARY_COOKIE, response.cookies
+                )
+        response = self.authorized_client.get(follow_url)
+        self.assertIn(settings.STICKY_PRIMARY_COOKIE, response.cookies)
+
     def test_subscribe_authorized_user(self):
         """Авторизованный пользователь может подписываться, но не на себя"""
 
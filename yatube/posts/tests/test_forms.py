@@ -1,11 +1,14 @@
+import io
 import tempfile
 import shutil
+from unittest import skipUnless
 
 from django.contrib.auth import get_user_model
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, features
 
 from posts.forms import PostForm
 from posts.models import Post, Group
@@ -112,3 +115,138 @@ class PostFormTest(TestCase):
             reverse('posts:group_posts', kwargs={'slug': self.group_new.slug})
         )
         self.assertEqual(len(response.context['page_obj']), 1)
+
+
+def uploaded_jpeg(size, exif=None):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(
+        buffer, 'JPEG', exif=exif or b''
+    )
+    return SimpleUploadedFile(
+        'photo.jpg', buffer.getvalue(), content_type='image/jpeg'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_PREGENERATE='off')
+class PostImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='upload_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create(self, image):
+        return self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'upload-text', 'image': image},
+        )
+
+    @override_settings(UPLOAD_MAX_SIDE=100)
+    def test_image_normalized(self):
+        """Картинка уменьшается и сохраняется без EXIF."""
+        exif = Image.Exif()
+        exif[0x010F] = 'upload-camera'
+        self.create(uploaded_jpeg((300, 200), exif=exif.tobytes()))
+        post = Post.objects.get(text='upload-text')
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (100, 67))
+            self.assertEqual(len(image.getexif()), 0)
+
+    @override_settings(UPLOAD_MAX_BYTES=100)
+    def test_large_file_rejected(self):
+        """Файл больше UPLOAD_MAX_BYTES не сохраняется."""
+        response = self.create(uploaded_jpeg((300, 200)))
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 100\xa0байт.'
+        )
+        self.assertFalse(Post.objects.filter(text='upload-text').exists())
+
+    @override_settings(UPLOAD_MAX_PIXELS=1000)
+    def test_large_dimensions_rejected(self):
+        """Картинка больше UPLOAD_MAX_PIXELS отклоняется."""
+        response = self.create(uploaded_jpeg((300, 200)))
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка 300×200 слишком большая.'
+        )
+        self.assertFalse(Post.objects.filter(text='upload-text').exists())
+
+    @skipUnless(features.check('webp_anim'), 'Pillow без анимированного WebP')
+    def test_animation_stripped_of_exif(self):
+        """Анимация сохраняет все кадры, но теряет EXIF."""
+        exif = Image.Exif()
+        exif[0x010F] = 'upload-camera'
+        frames = [
+            Image.new('RGB', (30, 20), color)
+            for color in ((200, 30, 30), (30, 200, 30))
+        ]
+        buffer = io.BytesIO()
+        frames[0].save(
+            buffer, 'WEBP', save_all=True, append_images=frames[1:],
+            duration=[100, 200], loop=0, exif=exif.tobytes(),
+        )
+        self.create(SimpleUploadedFile(
+            'anim.webp', buffer.getvalue(), content_type='image/webp'
+        ))
+        post = Post.objects.get(text='upload-text')
+        with Image.open(post.image) as image:
+            self.assertEqual(image.n_frames, 2)
+            self.assertEqual(len(image.getexif()), 0)
+            self.assertNotIn('exif', image.info)
+
+    @override_settings(UPLOAD_MAX_ANIMATION_PIXELS=1000)
+    def test_large_animation_rejected(self):
+        """Анимация больше UPLOAD_MAX_ANIMATION_PIXELS отклоняется."""
+        frames = [
+            Image.new('RGB', (30, 20), color)
+            for color in ((200, 30, 30), (30, 200, 30))
+        ]
+        buffer = io.BytesIO()
+        frames[0].save(
+            buffer, 'GIF', save_all=True, append_images=frames[1:],
+            duration=[100, 200], loop=0,
+        )
+        response = self.create(SimpleUploadedFile(
+            'anim.gif', buffer.getvalue(), content_type='image/gif'
+        ))
+        self.assertFormError(
+            response, 'form', 'image',
+            'Анимация из 2 кадров 30×20 слишком большая.',
+        )
+        self.assertFalse(Post.objects.filter(text='upload-text').exists())
+
+    @override_settings(UPLOAD_MAX_BYTES=100)
+    def test_admin_upload_not_truncated(self):
+        """Лимит загрузки действует только в формах постов, не в админке."""
+        admin_user = User.objects.create_superuser(
+            'upload_admin', 'admin@example.com', 'password'
+        )
+        self.authorized_client.force_login(admin_user)
+        image = uploaded_jpeg((300, 200))
+        size = image.size
+        self.authorized_client.post(
+            reverse('admin:posts_post_add'),
+            data={
+                'text': 'admin-upload', 'author': admin_user.pk,
+                'image': image,
+            },
+        )
+        post = Post.objects.get(text='admin-upload')
+        self.assertEqual(post.image.size, size)
+
+    def test_upload_views_check_csrf(self):
+        """Замена обработчиков загрузки не отключает проверку CSRF."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post(
+            reverse('posts:post_create'), data={'text': 'upload-text'}
+        )
+        self.assertTemplateUsed(response, 'core/403csrf.html')
+        self.assertFalse(Post.objects.filter(text='upload-text').exists())
@@ -0,0 +1,171 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.dbm_kvstore import KVStore as DbmKVStore
+
+from posts import thumbnails
+from posts.models import MediaBlob, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00')
+
+
+def uploaded_gif(content=SMALL_GIF, name='media.gif'):
+    return SimpleUploadedFile(name, content, content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_PREGENERATE='off')
+class MediaRefsTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='media_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, content=SMALL_GIF, name='media.gif'):
+        return Post.objects.create(
+            author=self.user,
+            text='media-text',
+            image=uploaded_gif(content, name),
+        )
+
+    def refs(self, name):
+        blob = MediaBlob.objects.filter(name=name).first()
+        return blob.refs if blob else 0
+
+    def test_same_image_shared(self):
+        """Повторная загрузка той же картинки не создаёт новый файл."""
+        first = self.create_post(name='first.gif')
+        second = self.create_post(name='second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(self.refs(first.image.name), 2)
+
+    def collect(self, **options):
+        call_command(
+            'collect_media', stdout=open(os.devnull, 'w'), **options
+        )
+
+    def test_last_reference_left_to_collector(self):
+        """Файл без ссылок остаётся на диске до collect_media."""
+        first = self.create_post()
+        second = self.create_post()
+        path = first.image.path
+        first.delete()
+        second.delete()
+        self.assertEqual(self.refs(second.image.name), 0)
+        self.assertTrue(os.path.exists(path))
+        self.collect(min_age=0)
+        self.assertFalse(os.path.exists(path))
+
+    def test_replaced_image_released(self):
+        """Замена картинки при редактировании снимает ссылку со старой."""
+        post = self.create_post()
+        old_name = post.image.name
+        post.image = uploaded_gif(OTHER_GIF)
+        post.save()
+        self.assertEqual(self.refs(old_name), 0)
+        self.assertEqual(self.refs(post.image.name), 1)
+
+    def test_reupload_protects_released_file(self):
+        """Повторная загрузка освобождённого файла продлевает его срок.
+
+        Пока транзакция загрузки не закоммичена, ссылки на файл не видно;
+        сборщик не должен удалить файл, который хранилище не перезаписало.
+        """
+        post = self.create_post()
+        path = post.image.path
+        post.delete()
+        old = os.path.getmtime(path) - 2 * 3600
+        os.utime(path, (old, old))
+        self.assertEqual(
+            post.image.storage.save('posts/again.gif', uploaded_gif()),
+            post.image.name,
+        )
+        self.collect(min_age=3600)
+        self.assertTrue(os.path.exists(path))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_PREGENERATE='off')
+class CollectMediaTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Записи sorl кэшируются, а откат транзакции теста кэш не чистит
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = User.objects.create_user(username='collect_user')
+        self.post = Post.objects.create(
+            author=user, text='collect-text', image=uploaded_gif()
+        )
+        self.orphan = os.path.join(TEMP_MEDIA_ROOT, 'posts', 'orphan.gif')
+        with open(self.orphan, 'wb') as file:
+            file.write(OTHER_GIF)
+        thumbnails.generate(self.post.image.name)
+        self.orphan_thumbnail_name = thumbnails.create('posts/orphan.gif').name
+        self.orphan_thumbnail = os.path.join(
+            TEMP_MEDIA_ROOT, self.orphan_thumbnail_name
+        )
+
+    def collect(self, **options):
+        call_command(
+            'collect_media', min_age=0, stdout=open(os.devnull, 'w'),
+            **options
+        )
+
+    def test_orphans_deleted(self):
+        """Картинки без постов удаляются вместе с миниатюрами."""
+        self.collect()
+        self.assertFalse(os.path.exists(self.orphan))
+        self.assertFalse(os.path.exists(self.orphan_thumbnail))
+        self.assertIsNone(default.kvstore.get(
+            ImageFile(self.orphan_thumbnail_name, default.storage)
+        ))
+        self.assertTrue(os.path.exists(self.post.image.path))
+        self.post.refresh_from_db()
+        self.assertIsNotNone(thumbnails.lookup(self.post))
+
+    def test_dry_run_keeps_files(self):
+        """--dry-run ничего не удаляет."""
+        self.collect(dry_run=True)
+        self.assertTrue(os.path.exists(self.orphan))
+        self.assertTrue(os.path.exists(self.orphan_thumbnail))
+
+
+class CollectMediaDbmTest(CollectMediaTest):
+    """Те же проверки, когда записи sorl хранятся не в базе."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        kvstore = DbmKVStore()
+        kvstore.filename = os.path.join(directory, 'kvstore')
+        patcher = mock.patch.object(default, 'kvstore', kvstore)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
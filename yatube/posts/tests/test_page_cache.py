@@ -0,0 +1,208 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='page_cache_user')
+        cls.group = Group.objects.create(
+            title='page-cache-group',
+            slug='page-cache-slug',
+            description='page-cache-description',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='page-cache-text',
+            group=cls.group,
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': 'page-cache-slug'}),
+            reverse(
+                'posts:profile', kwargs={'username': 'page_cache_user'}
+            ),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_repeated_request_served_from_cache(self):
+        """Повторный анонимный запрос не обращается к базе."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.guest_client.get(url)
+                self.assertEqual(first.content, second.content)
+                self.assertTrue(second.has_header('ETag'))
+                self.assertTrue(second.has_header('Last-Modified'))
+
+    def test_conditional_get_returns_not_modified(self):
+        """Совпавший ETag или Last-Modified даёт 304."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(
+                    self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    ).status_code,
+                    304,
+                )
+                self.assertEqual(
+                    self.guest_client.get(
+                        url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                    ).status_code,
+                    304,
+                )
+
+    def test_cache_invalidated_by_write(self):
+        """Изменение поста или новый комментарий обновляют страницу."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.guest_client.get(url)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.user, text='fresh-comment'
+        )
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'fresh-comment')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_authorized_requests_are_not_cached(self):
+        """Страницы авторизованных пользователей не кэшируются."""
+        authorized_client = Client()
+        authorized_client.force_login(self.user)
+        authorized_client.get(self.urls[0])
+        response = authorized_client.get(self.urls[0])
+        self.assertIsNotNone(response.context)
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='conditional_user')
+        cls.author = User.objects.create_user(username='conditional_author')
+        cls.post = Post.objects.create(author=cls.author, text='text')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+
+    def test_post_detail_short_circuits(self):
+        """304 отдаётся до выборки поста, комментариев и рендеринга."""
+        etag = self.authorized_client.get(self.url)['ETag']
+        # сессия, пользователь и сигнатура поста
+        with self.assertNumQueries(3):
+            response = self.authorized_client.get(
+                self.url, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_post_detail_etag_changes_with_comments_and_edits(self):
+        """Комментарий и правка поста меняют ETag."""
+        etag = self.authorized_client.get(self.url)['ETag']
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            data={'text': 'comment'},
+        )
+        response = self.authorized_client.get(
+            self.url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.post.text = 'edited'
+        self.post.save()
+        response = self.authorized_client.get(
+            self.url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertContains(response, 'edited')
+
+    def test_etag_changes_with_group_and_author(self):
+        """Правка группы и смена имени автора меняют ETag."""
+        group = Group.objects.create(
+            title='conditional-group', slug='conditional-group',
+            description='old-description',
+        )
+        Post.objects.filter(pk=self.post.pk).update(group=group)
+        group_url = reverse(
+            'posts:group_posts', kwargs={'slug': 'conditional-group'}
+        )
+        etags = {
+            url: self.authorized_client.get(url)['ETag']
+            for url in (group_url, self.url)
+        }
+        group.description = 'new-description'
+        group.save()
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Renamed'
+        author.save()
+        for url, text in (
+            (group_url, 'new-description'), (self.url, 'Renamed'),
+        ):
+            with self.subTest(url=url):
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertContains(response, text)
+
+    def test_profile_etag_depends_on_following(self):
+        """Подписка меняет ETag профиля."""
+        url = reverse(
+            'posts:profile', kwargs={'username': 'conditional_author'}
+        )
+        etag = self.authorized_client.get(url)['ETag']
+        self.assertEqual(
+            self.authorized_client.get(
+                url, HTTP_IF_NONE_MATCH=etag
+            ).status_code,
+            304,
+        )
+        self.authorized_client.get(
+            reverse(
+                'posts:profile_follow',
+                kwargs={'username': 'conditional_author'},
+            )
+        )
+        self.assertEqual(
+            self.authorized_client.get(
+                url, HTTP_IF_NONE_MATCH=etag
+            ).status_code,
+            200,
+        )
+
+    def test_etag_changes_after_relogin(self):
+        """После нового входа страница с формой приходит заново."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        etag = client.get(self.url)['ETag']
+        client.logout()
+        client.force_login(self.user)
+        response = client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            data={
+                'text': 'after-relogin',
+                'csrfmiddlewaretoken': response.context['csrf_token'],
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(self.post.comments.filter(text='after-relogin'))
+
+    def test_etag_is_per_user(self):
+        """ETag одного пользователя не подходит другому."""
+        etag = self.authorized_client.get(self.url)['ETag']
+        other_client = Client()
+        other_client.force_login(self.author)
+        response = other_client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -1,7 +1,16 @@
+import base64
+import json
+
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import (
+    Client, RequestFactory, TestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from posts.functions import cursor_get_page
 from posts.models import Post, Group
 
 User = get_user_model()
@@ -63,3 +72,117 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(post.text, 'paginator-text')
                 self.assertEqual(post.author.username, 'paginator_user')
                 self.assertEqual(post.group.title, 'paginator')
+
+
+@override_settings(PAGINATOR_MODE='cursor')
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='cursor_user')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'cursor-text-{i}') for i in range(13)
+        )
+
+    def setUp(self):
+        cache.clear()
+        # bulk_create не шлёт сигналов, поэтому страницы смотрим
+        # авторизованным клиентом, минуя кэш анонимных страниц
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_cursor_pages(self):
+        """Курсорная пагинация листает вперёд и назад без пропусков."""
+        url = reverse('posts:index')
+        first = self.client.get(url).context['page_obj']
+        self.assertEqual(len(first), 10)
+        self.assertFalse(first.has_previous())
+        self.assertTrue(first.has_next())
+
+        second = self.client.get(
+            url, {'after': first.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second), 3)
+        self.assertFalse(second.has_next())
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        self.assertEqual(list(first) + list(second), expected)
+
+        back = self.client.get(
+            url, {'before': second.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+        self.assertTrue(back.has_next())
+
+    def test_cursor_page_reads_rows_lazily(self):
+        """Строки страницы читаются при первом обращении, как у Page."""
+        request = RequestFactory().get('/')
+        with self.assertNumQueries(0):
+            page = cursor_get_page(Post.objects.all(), request)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(page), 10)
+            self.assertTrue(page.has_next())
+
+    def test_cursor_page_skips_count_query(self):
+        """Курсорная страница не выполняет COUNT(*)."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'))
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries.captured_queries)
+        )
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор в любую сторону открывает первую страницу."""
+        first = list(Post.objects.order_by('-pub_date', '-id')[:10])
+        for direction in ('after', 'before'):
+            with self.subTest(direction=direction):
+                response = self.client.get(
+                    reverse('posts:index'), {direction: '%%'}
+                )
+                self.assertEqual(response.status_code, 200)
+                page = response.context['page_obj']
+                self.assertFalse(page.has_previous())
+                self.assertTrue(page.has_next())
+                self.assertEqual(list(page), first)
+
+    def test_forged_cursor_values_return_first_page(self):
+        """Курсор с не скалярами или null не роняет ни одну ленту."""
+        post = Post.objects.order_by('-pub_date', '-id').first()
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+            reverse('posts:post_comments', kwargs={'post_id': post.pk}),
+            reverse('api_v1:index'),
+            reverse('api_v1:post_comments', kwargs={'post_id': post.pk}),
+        )
+        for values in ([5, 1], [[1], 1], [None, 1], ['x'], {'a': 1}):
+            token = base64.urlsafe_b64encode(
+                json.dumps(values).encode()
+            ).decode().rstrip('=')
+            for url in urls:
+                with self.subTest(values=values, url=url):
+                    response = self.client.get(url, {'after': token})
+                    self.assertEqual(response.status_code, 200)
+
+    def test_fragment_cache_keys_distinct_pages(self):
+        """after, before и битый before не делят кэш фрагмента."""
+        url = reverse('posts:index')
+        posts = list(Post.objects.order_by('-pub_date', '-id'))
+        second = self.client.get(
+            url, {'after': self.client.get(url).context['page_obj']
+                  .next_cursor}
+        ).context['page_obj']
+        token = second.previous_cursor
+        # Битый before первым кладёт в кэш свою страницу
+        requests = [
+            ({'before': '%%'}, posts[:10]),
+            ({}, posts[:10]),
+            ({'after': token}, posts[11:]),
+            ({'before': token}, posts[:10]),
+        ]
+        for params, expected in requests:
+            with self.subTest(params=params):
+                content = self.client.get(url, params).content.decode()
+                for post in posts:
+                    self.assertEqual(
+                        f'<p>{post.text}</p>' in content, post in expected
+                    )
@@ -0,0 +1,121 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.timeline import feed_for
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+POSTS_COUNT = 10
+
+
+class FeedQueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='budget-group',
+            slug='budget-slug',
+            description='budget-description',
+        )
+        cls.author = User.objects.create_user(username='budget_author')
+        for i in range(POSTS_COUNT):
+            author = User.objects.create_user(
+                username=f'author_{i}', first_name=f'Имя {i}'
+            )
+            group = Group.objects.create(
+                title=f'group-{i}',
+                slug=f'group-{i}',
+                description='description',
+            )
+            # Упоминания: linkify ищет пользователей всей страницы сразу
+            Post.objects.create(
+                author=author, group=group,
+                text=f'text #budget @reader @author_{i} @nobody_{i}',
+            )
+            Post.objects.create(
+                author=cls.author, group=cls.group, text='text'
+            )
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.post = Post.objects.filter(author=cls.author).first()
+        for i in range(POSTS_COUNT):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.get(username=f'author_{i}'),
+                text='comment',
+            )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_feed_views_fit_query_budget(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        budgets = {
+            reverse('posts:index'): 7,
+            reverse(
+                'posts:group_posts', kwargs={'slug': 'budget-slug'}
+            ): 7,
+            reverse(
+                'posts:profile', kwargs={'username': 'budget_author'}
+            ): 9,
+            reverse('posts:follow_index'): 6,
+            reverse('posts:tag_posts', kwargs={'name': 'budget'}): 7,
+            reverse('posts:mentions_index'): 6,
+            reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.pk}
+            ): 6,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                with self.assertMaxQueries(budget):
+                    response = self.authorized_client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+
+class FeedIndexTest(TestCase):
+    def test_feed_pages_read_from_index(self):
+        """Страницы лент берутся из индексов, без сортировки в памяти."""
+        user = User.objects.create_user(username='index_user')
+        group = Group.objects.create(
+            title='index-group', slug='index-slug', description=''
+        )
+        post = Post.objects.create(author=user, group=group, text='text')
+        for name, queryset in {
+            'index': Post.objects.all()[:10],
+            'profile': Post.objects.filter(author=user)[:10],
+            'group_posts': Post.objects.filter(group=group)[:10],
+            'comments': Comment.objects.filter(post=post).order_by(
+                'created'
+            ),
+        }.items():
+            with self.subTest(name=name):
+                plan = queryset.explain()
+                self.assertIn('USING INDEX', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    @override_settings(TIMELINE_ENABLED=True, TIMELINE_FANOUT_LIMIT=1)
+    def test_follow_index_reads_from_index(self):
+        """Лента подписок читает страницу из индексов ленты и «звёзд».
+
+        Сортируются только посты с одинаковой датой (RIGHT PART),
+        а не все подходящие строки.
+        """
+        reader = User.objects.create_user(username='index_reader')
+        author = User.objects.create_user(username='index_author')
+        star = User.objects.create_user(username='index_star')
+        Follow.objects.create(user=reader, author=author)
+        Follow.objects.create(user=reader, author=star)
+        Follow.objects.create(user=author, author=star)
+        timeline, celebrity = feed_for(reader).sources
+        for name, queryset, index in (
+            ('timeline', timeline, 'timeline_user_date_idx'),
+            ('celebrity', celebrity, 'post_author_date_idx'),
+        ):
+            with self.subTest(name=name):
+                plan = queryset.values_list('listed_at', 'id')[:10].explain()
+                self.assertIn(index, plan)
+                self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
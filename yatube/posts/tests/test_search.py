@@ -0,0 +1,141 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Post, SearchPosting
+from posts.stemming import stem
+
+User = get_user_model()
+
+
+class StemmerTest(TestCase):
+    def test_word_forms_share_stem(self):
+        """Формы одного слова сводятся к одному терму."""
+        for words in (
+            ('коты', 'котами', 'кота'),
+            ('красивый', 'красивая', 'красивыми'),
+            ('Ёлка', 'ёлки', 'елкой'),
+        ):
+            with self.subTest(words=words):
+                self.assertEqual(len({stem(word) for word in words}), 1)
+
+
+class SearchMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='search_user')
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Коты спят на подоконнике, кот Васька храпит'
+        )
+        cls.dogs = Post.objects.create(
+            author=cls.user, text='Собаки и кот гуляют во дворе'
+        )
+        cls.other = Post.objects.create(
+            author=cls.user, text='Ничего интересного'
+        )
+
+    def found(self, query):
+        return search.search(query)
+
+    def test_stemmed_query_matches(self):
+        """Запрос в другой форме слова находит посты."""
+        self.assertCountEqual(
+            self.found('котами'), [self.cats.pk, self.dogs.pk]
+        )
+        self.assertEqual(self.found('собака'), [self.dogs.pk])
+
+    def test_all_terms_required(self):
+        """В выдачу попадают посты со всеми словами запроса."""
+        self.assertEqual(self.found('кот двор'), [self.dogs.pk])
+        self.assertEqual(self.found('кот слон'), [])
+
+    def test_ranking(self):
+        """Пост, где слово встречается чаще, выше в выдаче."""
+        self.assertEqual(self.found('котов')[0], self.cats.pk)
+
+    def test_index_follows_edits_and_comments(self):
+        """Индекс обновляется при правке поста и новых комментариях."""
+        self.other.text = 'Теперь тут попугай'
+        self.other.save()
+        self.assertEqual(self.found('попугаи'), [self.other.pk])
+        comment = Comment.objects.create(
+            post=self.cats, author=self.user, text='Мой попугай тоже спит'
+        )
+        self.assertCountEqual(
+            self.found('попугай'), [self.other.pk, self.cats.pk]
+        )
+        comment.delete()
+        self.other.delete()
+        self.assertEqual(self.found('попугай'), [])
+
+    def test_comments_indexed_incrementally(self):
+        """Комментарий меняет только свои термы; итог равен перестройке."""
+        texts = ['Попугай спит', 'Кот спит на окне', 'Попугай и кот']
+        with mock.patch('posts.search.index_post') as index_post:
+            comments = [
+                Comment.objects.create(
+                    post=self.cats, author=self.user, text=text
+                )
+                for text in texts
+            ]
+            comments[0].delete()
+        index_post.assert_not_called()
+        incremental = self.index_state(self.cats.pk)
+        search.rebuild()
+        self.assertEqual(incremental, self.index_state(self.cats.pk))
+
+    def test_post_delete_skips_comment_reindex(self):
+        """Каскад комментариев удаляемого поста не переиндексирует его."""
+        post = Post.objects.create(author=self.user, text='Жираф')
+        for text in ('Раз', 'Два'):
+            Comment.objects.create(post=post, author=self.user, text=text)
+        with mock.patch('posts.search.index_post') as index_post:
+            post.delete()
+        index_post.assert_not_called()
+        self.assertEqual(self.found('жираф'), [])
+
+    def test_admin_search_reports_cap(self):
+        """Админка предупреждает, что выдача обрезана SEARCH_MAX_RESULTS."""
+        admin_user = User.objects.create_superuser(
+            'search_admin', 'admin@example.com', 'password'
+        )
+        client = Client()
+        client.force_login(admin_user)
+        with self.settings(SEARCH_MAX_RESULTS=1):
+            response = client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'кот'}
+            )
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+        self.assertContains(response, 'самых релевантных')
+
+    def test_search_page(self):
+        """Страница поиска показывает найденные посты и запрос."""
+        response = Client().get(reverse('posts:search'), {'q': 'собаки'})
+        self.assertEqual(list(response.context['page_obj']), [self.dogs])
+        self.assertEqual(
+            response.context['page_query'],
+            'q=%D1%81%D0%BE%D0%B1%D0%B0%D0%BA%D0%B8&',
+        )
+
+
+@override_settings(SEARCH_BACKEND='fts5')
+class FTS5SearchTest(SearchMixin, TestCase):
+    def index_state(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT comments FROM {search.FTS_TABLE} WHERE rowid = %s',
+                [post_id],
+            )
+            return sorted(cursor.fetchone()[0].split())
+
+
+@override_settings(SEARCH_BACKEND='python')
+class InvertedIndexSearchTest(SearchMixin, TestCase):
+    def index_state(self, post_id):
+        return set(SearchPosting.objects.filter(post_id=post_id).values_list(
+            'term', 'text_count', 'comments_count'
+        ))
@@ -0,0 +1,149 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import AuthorStats, Mention, Post, Tag, Tagging
+from posts.tags import parse_mentions, parse_tags
+from posts.templatetags.post_text import linkify
+
+User = get_user_model()
+
+
+class ParseTest(TestCase):
+    def test_parse_tags(self):
+        """Теги приводятся к нижнему регистру и не повторяются."""
+        self.assertEqual(
+            parse_tags('#Коты и #коты, #dogs_2! a#b &#39; ##x'),
+            ['коты', 'dogs_2'],
+        )
+
+    def test_parse_mentions(self):
+        """Упоминание — @ и имя пользователя, адрес почты не в счёт."""
+        self.assertEqual(
+            parse_mentions('@anna, привет @bob. mail@example.com @anna'),
+            ['anna', 'bob'],
+        )
+
+    def test_linkify(self):
+        """Теги и упоминания становятся ссылками, текст экранируется."""
+        User.objects.create_user(username='anna')
+        html = linkify('<b>#Коты</b> @anna')
+        self.assertIn('&lt;b&gt;', html)
+        self.assertIn(
+            f'<a href="{reverse("posts:tag_posts", args=["коты"])}">'
+            '#Коты</a>', html
+        )
+        self.assertIn(
+            f'<a href="{reverse("posts:profile", args=["anna"])}">'
+            '@anna</a>', html
+        )
+
+    def test_linkify_unknown_mention(self):
+        """Упоминание несуществующего пользователя остаётся текстом."""
+        User.objects.create_user(username='anna')
+        with self.assertNumQueries(1):
+            html = linkify('@anna и @nobody')
+        self.assertIn('@anna</a>', html)
+        self.assertTrue(html.endswith(' и @nobody'))
+        with self.assertNumQueries(0):
+            linkify('#коты без упоминаний')
+
+
+class TagsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='tag_author')
+        cls.anna = User.objects.create_user(username='anna')
+        cls.bob = User.objects.create_user(username='bob')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.anna)
+
+    def tag_counts(self):
+        return dict(Tag.objects.values_list('name', 'posts_count'))
+
+    def mentions_count(self, user):
+        return AuthorStats.objects.get(user=user).mentions_count
+
+    def test_create_edit_delete(self):
+        """Связи и счётчики следуют за текстом поста."""
+        post = Post.objects.create(
+            author=self.author, text='#Коты и #собаки, @anna @tag_author'
+        )
+        self.assertEqual(self.tag_counts(), {'коты': 1, 'собаки': 1})
+        self.assertEqual(self.mentions_count(self.anna), 1)
+        self.assertFalse(Mention.objects.filter(user=self.author).exists())
+        post.text = '#коты @bob'
+        post.save()
+        self.assertEqual(self.tag_counts(), {'коты': 1, 'собаки': 0})
+        self.assertEqual(self.mentions_count(self.anna), 0)
+        self.assertEqual(self.mentions_count(self.bob), 1)
+        post.delete()
+        self.assertEqual(self.tag_counts(), {'коты': 0, 'собаки': 0})
+        self.assertEqual(self.mentions_count(self.bob), 0)
+        self.assertFalse(Tagging.objects.exists())
+
+    def test_tag_page(self):
+        """Страница тега показывает его посты, новые сверху."""
+        first = Post.objects.create(author=self.author, text='#коты раз')
+        Post.objects.create(author=self.author, text='#собаки')
+        second = Post.objects.create(author=self.author, text='#Коты два')
+        response = Client().get(reverse('posts:tag_posts', args=['Коты']))
+        self.assertEqual(response.context['tag'].posts_count, 2)
+        self.assertEqual(list(response.context['page_obj']), [second, first])
+        response = Client().get(reverse('posts:tag_posts', args=['нет']))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(PAGINATOR_MODE='cursor', PAGE_SIZE=2)
+    def test_tag_page_cursor_follows_tagging(self):
+        """Курсор ленты тега идёт по дате из Tagging и её индексу."""
+        posts = [
+            Post.objects.create(author=self.author, text=f'#коты {number}')
+            for number in range(3)
+        ]
+        # Дата в Tagging расходится с датой поста: порядок задаёт связь
+        for offset, post in enumerate(posts):
+            Tagging.objects.filter(post=post).update(
+                pub_date=posts[0].pub_date.replace(year=2002 - offset)
+            )
+        url = reverse('posts:tag_posts', args=['коты'])
+        with CaptureQueriesContext(connection) as queries:
+            first = Client().get(url).context['page_obj']
+            self.assertEqual(list(first), [posts[0], posts[1]])
+        self.assertTrue(any(
+            'ORDER BY "listed_at" DESC' in query['sql']
+            for query in queries.captured_queries
+        ))
+        second = Client().get(
+            url, {'after': first.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(second), [posts[2]])
+        back = Client().get(
+            url, {'before': second.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back), [posts[0], posts[1]])
+
+    def test_mentions_page(self):
+        """На странице упоминаний только посты, где упомянут пользователь."""
+        post = Post.objects.create(author=self.author, text='Привет, @anna')
+        Post.objects.create(author=self.author, text='Привет, @bob')
+        response = self.client.get(reverse('posts:mentions_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+        self.assertEqual(response.context['mentions_count'], 1)
+
+    def test_sync_tags_command(self):
+        """Команда восстанавливает связи, потерянные мимо сигналов."""
+        Post.objects.create(author=self.author, text='#коты @anna')
+        Tagging.objects.all().delete()
+        Mention.objects.all().delete()
+        Tag.objects.update(posts_count=0)
+        AuthorStats.objects.update(mentions_count=0)
+        call_command('sync_tags', stdout=open('/dev/null', 'w'))
+        self.assertEqual(self.tag_counts(), {'коты': 1})
+        self.assertEqual(self.mentions_count(self.anna), 1)
@@ -0,0 +1,211 @@
+import os
+import shutil
+import tempfile
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, TransactionTestCase
+from django.test import override_settings
+from django.urls import reverse
+
+from posts import cards, thumbnails, variants
+from posts.models import ImageVariant, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+# Варианты строятся только в форматах, которые умеет сохранять Pillow
+needs_variant_formats = skipUnless(
+    variants.supported_formats(),
+    'Pillow не сохраняет ни один формат из POST_IMAGE_FORMATS',
+)
+
+
+def uploaded_gif(name='thumbnail.gif', content=SMALL_GIF):
+    return SimpleUploadedFile(name, content, content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_PREGENERATE='sync')
+class ThumbnailOnUploadTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_post_create_generates_thumbnail(self):
+        """Миниатюра создаётся при публикации поста."""
+        user = User.objects.create_user(username='thumbnail_user')
+        client = Client()
+        client.force_login(user)
+        client.post(
+            reverse('posts:post_create'),
+            data={'text': 'thumbnail-text', 'image': uploaded_gif()},
+        )
+        post = Post.objects.get(text='thumbnail-text')
+        self.assertIsNotNone(thumbnails.lookup(post))
+
+    @needs_variant_formats
+    def test_post_create_builds_variants(self):
+        """При публикации готовятся варианты для <picture>."""
+        user = User.objects.create_user(username='variants_user')
+        client = Client()
+        client.force_login(user)
+        client.post(
+            reverse('posts:post_create'),
+            data={'text': 'variants-text', 'image': uploaded_gif()},
+        )
+        post = Post.objects.get(text='variants-text')
+        response = client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        for image_format in variants.supported_formats():
+            with self.subTest(image_format=image_format):
+                variant = ImageVariant.objects.get(
+                    post=post, format=image_format
+                )
+                self.assertGreater(variant.size, 0)
+                mime_type = variants.sources([variant])[0]['type']
+                self.assertContains(response, f'<source type="{mime_type}"')
+                self.assertContains(response, variant.file.url)
+
+    @needs_variant_formats
+    def test_image_change_deletes_old_variants(self):
+        """Файлы вариантов старой картинки удаляются при её замене."""
+        user = User.objects.create_user(username='variants_editor')
+        client = Client()
+        client.force_login(user)
+        client.post(
+            reverse('posts:post_create'),
+            data={'text': 'variants-edit', 'image': uploaded_gif()},
+        )
+        post = Post.objects.get(text='variants-edit')
+        old_paths = [
+            variant.file.path for variant in post.image_variants.all()
+        ]
+        self.assertTrue(old_paths)
+        other_gif = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00')
+        client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            data={'text': 'variants-edit', 'image': uploaded_gif(
+                'other.gif', other_gif
+            )},
+        )
+        for path in old_paths:
+            self.assertFalse(os.path.exists(path))
+        for variant in post.image_variants.all():
+            self.assertTrue(os.path.exists(variant.file.path))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_PREGENERATE='off')
+class ThumbnailRequestPathTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='thumbnail_reader')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='thumbnail-text',
+            image=uploaded_gif('request-path.gif'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_request_never_resizes(self):
+        """Страница без готовой миниатюры показывает исходник."""
+        response = Client().get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertContains(response, self.post.image.url)
+        self.assertIsNone(thumbnails.lookup(self.post))
+
+    def test_warm_thumbnails_command(self):
+        """warm_thumbnails создаёт недостающие миниатюры."""
+        call_command(
+            'warm_thumbnails', workers=1, stdout=open('/dev/null', 'w')
+        )
+        thumbnail = thumbnails.lookup(Post.objects.get(pk=self.post.pk))
+        self.assertIsNotNone(thumbnail)
+        response = Client().get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertContains(response, thumbnail.url)
+
+    def test_warm_thumbnails_refreshes_cards(self):
+        """Карточка из кэша сменяет исходник на миниатюру после прогрева."""
+        # Записи sorl живут в кэше и переживают откат транзакции теста
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        def card():
+            post = Post.objects.select_related('author', 'group').get(
+                pk=self.post.pk
+            )
+            return cards.render_cards([post])[0]
+
+        self.assertIn(self.post.image.url, card())
+        call_command(
+            'warm_thumbnails', workers=1, stdout=open('/dev/null', 'w')
+        )
+        self.assertIn(thumbnails.create(self.post.image.name).url, card())
+
+    def test_image_change_drops_thumbnail(self):
+        """Миниатюра старой картинки не показывается у новой."""
+        thumbnails.generate(self.post.image.name)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertTrue(post.thumbnail)
+        post.image = uploaded_gif(
+            'changed.gif', SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\x00\xFF')
+        )
+        post.save()
+        self.assertEqual(Post.objects.get(pk=post.pk).thumbnail, '')
+
+    def test_stale_save_keeps_thumbnail(self):
+        """Сохранение загруженного раньше поста не затирает миниатюру."""
+        stale = Post.objects.get(pk=self.post.pk)
+        thumbnails.generate(self.post.image.name)
+        stale.text = 'edited-text'
+        stale.save()
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.text, 'edited-text')
+        self.assertTrue(post.thumbnail)
+
+    def test_generation_bumped_once_per_batch(self):
+        """Прогрев сбрасывает поколение кэша один раз на все картинки."""
+        Post.objects.create(
+            author=self.user, text='second', image=uploaded_gif('second.gif')
+        )
+        with mock.patch(
+            'posts.management.commands.warm_thumbnails.bump_generation'
+        ) as bump:
+            call_command(
+                'warm_thumbnails', workers=1, stdout=open('/dev/null', 'w')
+            )
+        bump.assert_called_once()
+
+    def test_image_variants_build_bumps_generation(self):
+        """image_variants --build сбрасывает поколение кэша один раз."""
+        with mock.patch(
+            'posts.management.commands.image_variants.bump_generation'
+        ) as bump:
+            call_command(
+                'image_variants', build=True, stdout=open('/dev/null', 'w')
+            )
+        bump.assert_called_once()
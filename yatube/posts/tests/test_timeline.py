@@ -0,0 +1,147 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+@override_settings(
+    TIMELINE_ENABLED=True, TIMELINE_LENGTH=3, TIMELINE_FANOUT_LIMIT=1
+)
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='timeline_reader')
+        cls.other = User.objects.create_user(username='timeline_other')
+        cls.author = User.objects.create_user(username='timeline_author')
+        cls.star = User.objects.create_user(username='timeline_star')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def feed(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_fan_out_on_create(self):
+        """Новый пост попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='fan-out')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post])
+
+    def test_timeline_is_trimmed(self):
+        """Лента обрезается до TIMELINE_LENGTH записей."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(5):
+            Post.objects.create(author=self.author, text=f'post-{i}')
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3
+        )
+        self.assertEqual(
+            [post.text for post in self.feed()],
+            ['post-4', 'post-3', 'post-2'],
+        )
+
+    def test_celebrity_posts_are_read_by_join(self):
+        """Посты популярного автора подмешиваются без раскладки."""
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.other, author=self.star)
+        post = Post.objects.create(author=self.star, text='star-post')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post])
+
+    def test_feed_merges_timeline_and_celebrities_by_page(self):
+        """Страницы сливают ленту и посты «звёзд» в порядке дат."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.other, author=self.star)
+        for i in range(3):
+            Post.objects.create(author=self.author, text=f'author-{i}')
+            Post.objects.create(author=self.star, text=f'star-{i}')
+        expected = [
+            'star-2', 'author-2', 'star-1', 'author-1', 'star-0', 'author-0',
+        ]
+        url = reverse('posts:follow_index')
+        for mode in ('numbered', 'cursor'):
+            with self.subTest(mode=mode), self.settings(
+                PAGINATOR_MODE=mode, PAGE_SIZE=4
+            ):
+                cache.clear()
+                page = self.authorized_client.get(url).context['page_obj']
+                params = (
+                    {'after': page.next_cursor} if mode == 'cursor'
+                    else {'page': 2}
+                )
+                next_page = self.authorized_client.get(
+                    url, params
+                ).context['page_obj']
+                self.assertEqual(
+                    [post.text for post in [*page, *next_page]], expected
+                )
+
+    def test_fan_out_queries_do_not_grow_with_followers(self):
+        """Раскладка не зависит от числа подписчиков, чтение — без COUNT."""
+        readers = [
+            User.objects.create_user(username=f'timeline_fan_{i}')
+            for i in range(4)
+        ]
+        counts = []
+        with self.settings(TIMELINE_FANOUT_LIMIT=10):
+            for reader in readers:
+                Follow.objects.create(user=reader, author=self.author)
+                with CaptureQueriesContext(connection) as queries:
+                    Post.objects.create(author=self.author, text='fan-out')
+                counts.append(len(queries))
+            self.assertEqual(len(set(counts)), 1)
+            with CaptureQueriesContext(connection) as queries:
+                list(timeline.feed_for(readers[0]))
+        self.assertNotIn('COUNT(', queries.captured_queries[0]['sql'])
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=readers[0]).count(), 3
+        )
+
+    def test_backfill_when_author_is_no_longer_celebrity(self):
+        """Автор стал обычным — его посты раскладываются по лентам."""
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.other, author=self.star)
+        post = Post.objects.create(author=self.star, text='star-post')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        Follow.objects.filter(user=self.other).delete()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post])
+
+    def test_unfollow_clears_timeline(self):
+        """После отписки посты автора уходят из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='fan-out')
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=['timeline_author'])
+        )
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [])
+
+    def test_backfill_command(self):
+        """backfill_timelines строит ленты по существующим подпискам."""
+        with self.settings(TIMELINE_ENABLED=False):
+            Follow.objects.create(user=self.reader, author=self.author)
+            post = Post.objects.create(author=self.author, text='old-post')
+        self.assertFalse(TimelineEntry.objects.exists())
+        call_command('backfill_timelines', stdout=open('/dev/null', 'w'))
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('user', 'post')),
+            [(self.reader.pk, post.pk)],
+        )
@@ -0,0 +1,22 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Проверка, что блок кода укладывается в бюджет SQL-запросов."""
+
+    @contextmanager
+    def assertMaxQueries(self, budget, using=connection):
+        with CaptureQueriesContext(using) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(
+                f'{number}. {query["sql"]}' for number, query
+                in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(
+                f'{executed} запросов при бюджете {budget}:\n{queries}'
+            )
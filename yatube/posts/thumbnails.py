@@ -0,0 +1,100 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from core.caching import bump_generation
+from . import variants
+from .models import Post
+from .signals import POSTS_GENERATION
+
+logger = logging.getLogger(__name__)
+
+POST_THUMBNAIL_GEOMETRY = '960x339'
+POST_THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+PREGENERATE_THREAD = 'thread'
+PREGENERATE_SYNC = 'sync'
+
+_executor = None
+
+
+def source(name):
+    """Картинка поста по имени — в хранилище поля Post.image."""
+    return ImageFile(name, Post._meta.get_field('image').storage)
+
+
+def create(name):
+    """Миниатюра картинки: из key-value store sorl или новая."""
+    return get_thumbnail(
+        source(name), POST_THUMBNAIL_GEOMETRY, **POST_THUMBNAIL_OPTIONS
+    )
+
+
+def lookup(post):
+    """Готовая миниатюра поста или None; картинка здесь не ресайзится."""
+    if not post.thumbnail:
+        return None
+    return default.kvstore.get(ImageFile(post.thumbnail, default.storage))
+
+
+def generate(name):
+    """Записывает миниатюру картинки постам, у которых её ещё нет.
+
+    Новая дата изменения сбрасывает закэшированные карточки этих
+    постов; поколение POSTS_GENERATION сбрасывает вызывающий, один раз
+    на пачку картинок. Возвращает True, если какой-то пост изменился.
+    """
+    thumbnail = create(name)
+    return Post.objects.filter(image=name).exclude(
+        thumbnail=thumbnail.name
+    ).update(thumbnail=thumbnail.name, updated=timezone.now()) > 0
+
+
+def process(post_id, name):
+    """Миниатюра и адаптивные варианты картинки поста."""
+    generate(name)
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None and post.image.name == name:
+        variants.build(post)
+        # Карточка поста показывает миниатюру и варианты: новая дата
+        # изменения — новая версия карточки в кэше
+        Post.objects.filter(pk=post_id).update(updated=timezone.now())
+    bump_generation(POSTS_GENERATION)
+
+
+def _process_in_worker(post_id, name):
+    try:
+        process(post_id, name)
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', name)
+    finally:
+        connection.close()
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def submit(post_id, name):
+    if settings.THUMBNAIL_PREGENERATE == PREGENERATE_SYNC:
+        process(post_id, name)
+    elif settings.THUMBNAIL_PREGENERATE == PREGENERATE_THREAD:
+        executor().submit(_process_in_worker, post_id, name)
+
+
+def schedule(post):
+    """Обрабатывает картинку поста в фоне после коммита транзакции."""
+    if post.image:
+        post_id, name = post.pk, post.image.name
+        transaction.on_commit(lambda: submit(post_id, name))
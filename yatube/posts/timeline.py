@@ -0,0 +1,249 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+
+from . import counters
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .tags import FEED_KEYS
+
+# Записи дальше TIMELINE_LENGTH в каждой из выбранных лент — одним
+# запросом, а не парой запросов на ленту
+TRIM_SQL = (
+    'DELETE FROM {timeline} WHERE id IN ('
+    ' SELECT id FROM ('
+    '  SELECT id, ROW_NUMBER() OVER ('
+    '   PARTITION BY user_id ORDER BY pub_date DESC, post_id DESC'
+    '  ) AS position FROM {timeline} WHERE {readers}'
+    ' ) AS ranked WHERE position > %s'
+    ')'
+)
+FOLLOWERS_SQL = (
+    'user_id IN (SELECT user_id FROM {follow} WHERE author_id = %s)'
+)
+# Свежие посты автора во все ленты его подписчиков
+BACKFILL_SQL = (
+    'INSERT INTO {timeline} (user_id, post_id, pub_date)'
+    ' SELECT follow.user_id, recent.id, recent.pub_date'
+    ' FROM {follow} AS follow, ('
+    '  SELECT id, pub_date FROM {post} WHERE author_id = %s'
+    '  ORDER BY pub_date DESC LIMIT %s'
+    ' ) AS recent'
+    ' WHERE follow.author_id = %s'
+    ' ON CONFLICT DO NOTHING'
+)
+
+
+def _sql(template, **tables):
+    quote = connection.ops.quote_name
+    return template.format(
+        timeline=quote(TimelineEntry._meta.db_table),
+        follow=quote(Follow._meta.db_table),
+        post=quote(Post._meta.db_table),
+        **tables,
+    )
+
+
+def celebrity_ids(user):
+    """Авторы из подписок user, чьи посты не раскладываются по лентам.
+
+    Популярность берётся из счётчика подписчиков, а не из COUNT(*)
+    подписок каждого автора при каждом чтении ленты.
+    """
+    return Follow.objects.filter(
+        user=user,
+        author__in=AuthorStats.objects.filter(
+            followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+        ).values('user'),
+    ).values('author')
+
+
+def is_celebrity(author_id):
+    return (
+        counters.author_followers_count(author_id)
+        > settings.TIMELINE_FANOUT_LIMIT
+    )
+
+
+def _trim(readers, params):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _sql(TRIM_SQL, readers=readers),
+            [*params, settings.TIMELINE_LENGTH],
+        )
+
+
+def trim(user_id):
+    """Оставляет в ленте не больше TIMELINE_LENGTH записей."""
+    _trim('user_id = %s', [user_id])
+
+
+def trim_followers(author_id):
+    """То же для лент всех подписчиков автора, одним запросом."""
+    _trim(_sql(FOLLOWERS_SQL), [author_id])
+
+
+def fan_out(post):
+    if not settings.TIMELINE_ENABLED or is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ),
+        ignore_conflicts=True,
+    )
+    trim_followers(post.author_id)
+
+
+def add_author(user_id, author_id):
+    """Подкладывает в ленту свежие посты автора после подписки."""
+    if not settings.TIMELINE_ENABLED or is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by('-pub_date')
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts.values_list('pk', 'pub_date')[
+                :settings.TIMELINE_LENGTH
+            ]
+        ),
+        ignore_conflicts=True,
+    )
+    trim(user_id)
+
+
+def remove_author(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+    if (settings.TIMELINE_ENABLED
+            and counters.author_followers_count(author_id)
+            == settings.TIMELINE_FANOUT_LIMIT):
+        backfill_followers(author_id)
+
+
+def backfill_followers(author_id):
+    """Раскладывает посты автора, который перестал быть популярным.
+
+    Пока автор был популярным, его посты подмешивались при чтении;
+    без раскладки они пропали бы из лент подписчиков.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _sql(BACKFILL_SQL),
+            [author_id, settings.TIMELINE_LENGTH, author_id],
+        )
+    trim_followers(author_id)
+
+
+def rebuild(user):
+    """Строит ленту заново по текущим подпискам."""
+    TimelineEntry.objects.filter(user=user).delete()
+    posts = Post.objects.filter(author__following__user=user).exclude(
+        author__in=celebrity_ids(user)
+    ).order_by('-pub_date')
+    TimelineEntry.objects.bulk_create(
+        TimelineEntry(user_id=user.pk, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts.values_list('pk', 'pub_date')[
+            :settings.TIMELINE_LENGTH
+        ]
+    )
+
+
+class TimelinePosts:
+    """Лента подписок: материализованная лента вместе с постами «звёзд».
+
+    Каждый источник — запрос постов с датой listed_at, который идёт по
+    своему индексу: (user, -pub_date) ленты или (author, -pub_date)
+    популярного автора. Срез страницы читает из каждого источника не
+    больше строк, чем нужно до её конца, сливает их в памяти и
+    загружает посты страницы одним запросом. Повторяет ту часть
+    интерфейса QuerySet, которую используют with_cards и пагинаторы.
+    """
+
+    ordered = True
+    model = Post
+
+    def __init__(self, sources, posts=None, keys=FEED_KEYS):
+        self.sources = [source.order_by(*keys) for source in sources]
+        self.posts = Post.objects.all() if posts is None else posts
+        self.keys = keys
+
+    def _clone(self, sources=None, posts=None, keys=None):
+        return TimelinePosts(
+            self.sources if sources is None else sources,
+            self.posts if posts is None else posts,
+            keys or self.keys,
+        )
+
+    @property
+    def query(self):
+        # Курсор пагинации берёт отсюда тип аннотации listed_at
+        return self.sources[0].query
+
+    def filter(self, *args, **kwargs):
+        return self._clone(sources=[
+            source.filter(*args, **kwargs) for source in self.sources
+        ])
+
+    def order_by(self, *keys):
+        return self._clone(keys=keys)
+
+    def select_related(self, *fields):
+        return self._clone(posts=self.posts.select_related(*fields))
+
+    def prefetch_related(self, *lookups):
+        return self._clone(posts=self.posts.prefetch_related(*lookups))
+
+    def count(self):
+        return sum(source.count() for source in self.sources)
+
+    def __iter__(self):
+        return iter(self[:None])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        names = [key.lstrip('-') for key in self.keys]
+        rows = []
+        for source in self.sources:
+            rows.extend(source.values_list(*names)[:index.stop])
+        # Все ключи ленты идут в одну сторону
+        rows.sort(reverse=self.keys[0].startswith('-'))
+        rows = rows[index]
+        position = names.index('id')
+        posts = self.posts.in_bulk([row[position] for row in rows])
+        page = []
+        for row in rows:
+            post = posts.get(row[position])
+            if post is not None:
+                for name, value in zip(names, row):
+                    setattr(post, name, value)
+                page.append(post)
+        return page
+
+
+def feed_for(user):
+    """Посты лент подписок user с датой listed_at для ключей FEED_KEYS."""
+    if not settings.TIMELINE_ENABLED:
+        return Post.objects.filter(author__following__user=user).annotate(
+            listed_at=F('pub_date')
+        ).order_by(*FEED_KEYS)
+    celebrities = list(celebrity_ids(user).values_list('author', flat=True))
+    # Старые посты автора, ставшего популярным, могли остаться в ленте:
+    # источники не пересекаются, и посты не повторяются
+    sources = [
+        Post.objects.filter(timeline_entries__user=user).exclude(
+            author_id__in=celebrities
+        ).annotate(listed_at=F('timeline_entries__pub_date')),
+        *(
+            Post.objects.filter(author_id=author_id).annotate(
+                listed_at=F('pub_date')
+            )
+            for author_id in celebrities
+        ),
+    ]
+    return TimelinePosts(sources)
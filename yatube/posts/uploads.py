@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps, ImageSequence
+
+# Форматы, которые сохраняются как есть; остальные пересохраняются в PNG
+KEPT_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+ORIENTATION = 0x0112
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+def check_size(upload):
+    if upload.size > settings.UPLOAD_MAX_BYTES:
+        raise ValidationError(
+            'Файл больше %(limit)s.',
+            code='file_too_large',
+            params={'limit': filesizeformat(settings.UPLOAD_MAX_BYTES)},
+        )
+
+
+def check_dimensions(image):
+    """Проверяет размеры по заголовку, до декодирования пикселей."""
+    width, height = image.size
+    if width * height > settings.UPLOAD_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка %(width)s×%(height)s слишком большая.',
+            code='image_too_large',
+            params={'width': width, 'height': height},
+        )
+
+
+def check_frames(image):
+    """Ограничивает объём всех кадров анимации до их декодирования.
+
+    Анимации пересохраняются без уменьшения, поэтому маленький файл
+    с тысячами кадров иначе заставил бы декодировать их все.
+    """
+    width, height = image.size
+    frames = image.n_frames
+    if frames * width * height > settings.UPLOAD_MAX_ANIMATION_PIXELS:
+        raise ValidationError(
+            'Анимация из %(frames)s кадров %(width)s×%(height)s '
+            'слишком большая.',
+            code='animation_too_large',
+            params={'frames': frames, 'width': width, 'height': height},
+        )
+
+
+def _prepare(image, image_format):
+    side = settings.UPLOAD_MAX_SIDE
+    # thumbnail() сам просит у JPEG-декодера уменьшенную в 2–8 раз
+    # картинку (draft) и не держит в памяти полноразмерный растр
+    image.thumbnail((side, side), Image.LANCZOS)
+    if image.getexif().get(ORIENTATION, 1) != 1:
+        image = ImageOps.exif_transpose(image)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    # Маленькие картинки thumbnail() не трогает: декодируем, пока
+    # исходный файл открыт
+    image.load()
+    return image
+
+
+def _save_animation(image, image_format, destination):
+    """Пересохраняет все кадры: EXIF и XMP в новый файл не попадают."""
+    durations = []
+    for frame in ImageSequence.Iterator(image):
+        # Длительность кадра WebP известна только после декодирования
+        frame.load()
+        durations.append(frame.info.get('duration', 0))
+    image.seek(0)
+    image.save(
+        destination, image_format, save_all=True, duration=durations,
+        loop=image.info.get('loop', 0),
+    )
+
+
+def normalize(upload):
+    """Пересохраняет картинку без EXIF, не больше UPLOAD_MAX_SIDE.
+
+    Результат пишется поверх временного файла загрузки, который
+    хранилище потом переносит в MEDIA_ROOT без чтения в память.
+    Анимации пересохраняются покадрово без уменьшения: иначе от них
+    остался бы один кадр.
+    """
+    check_size(upload)
+    upload.seek(0)
+    animation = None
+    with Image.open(upload) as image:
+        check_dimensions(image)
+        image_format = image.format if image.format in KEPT_FORMATS else 'PNG'
+        animated = getattr(image, 'is_animated', False)
+        if animated and image_format == image.format:
+            check_frames(image)
+            # Кадры читаются из файла загрузки по мере записи, поэтому
+            # результат сначала пишется в отдельный временный файл
+            animation = tempfile.TemporaryFile()
+            _save_animation(image, image_format, animation)
+        else:
+            image = _prepare(image, image_format)
+    base = os.path.splitext(os.path.basename(upload.name))[0]
+    upload.name = f'{base}.{EXTENSIONS[image_format]}'
+    upload.content_type = Image.MIME[image_format]
+    upload.seek(0)
+    if animation is None:
+        image.save(
+            upload.file, image_format,
+            quality=settings.UPLOAD_IMAGE_QUALITY, optimize=True,
+        )
+    else:
+        with animation:
+            animation.seek(0)
+            shutil.copyfileobj(animation, upload.file)
+    upload.truncate()
+    upload.size = upload.tell()
+    upload.seek(0)
+    return upload
@@ -9,6 +9,9 @@ urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.post_search, name='search'),
+    path('tag/<str:name>/', views.tag_posts, name='tag_posts'),
+    path('mentions/', views.mentions_index, name='mentions_index'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -20,6 +23,11 @@ urlpatterns = [
         name='profile_unfollow'
     ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path(
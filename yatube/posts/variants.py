@@ -0,0 +1,117 @@
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .models import ImageVariant
+
+try:
+    # Регистрирует AVIF в Pillow, где он не встроен
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+MIME_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+}
+# Пропорции миниатюры из карточки поста (960x339)
+ASPECT_WIDTH, ASPECT_HEIGHT = 960, 339
+
+
+def supported_formats():
+    """Форматы из POST_IMAGE_FORMATS, которые умеет сохранять Pillow."""
+    Image.init()
+    return [
+        image_format for image_format in settings.POST_IMAGE_FORMATS
+        if image_format.upper() in Image.SAVE
+    ]
+
+
+def widths_for(source_width):
+    widths = [
+        width for width in settings.POST_IMAGE_WIDTHS
+        if width <= source_width
+    ]
+    return widths or [min(settings.POST_IMAGE_WIDTHS)]
+
+
+def _load(image_file):
+    with image_file.open('rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def clear(post):
+    """Удаляет варианты картинки поста, а их файлы — после коммита."""
+    names = list(post.image_variants.values_list('file', flat=True))
+    post.image_variants.all().delete()
+    if names:
+        transaction.on_commit(lambda: _delete_files(names))
+
+
+def _delete_files(names):
+    storage = ImageVariant._meta.get_field('file').storage
+    for name in names:
+        storage.delete(name)
+
+
+def build(post):
+    """Пересоздаёт варианты картинки поста и возвращает их."""
+    clear(post)
+    if not post.image:
+        return []
+    source_size = post.image.size
+    image = _load(post.image)
+    base = os.path.splitext(os.path.basename(post.image.name))[0]
+    variants = []
+    for width in widths_for(image.width):
+        height = round(width * ASPECT_HEIGHT / ASPECT_WIDTH)
+        resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        for image_format in supported_formats():
+            buffer = io.BytesIO()
+            resized.save(
+                buffer, image_format.upper(),
+                quality=settings.POST_IMAGE_QUALITY,
+            )
+            variant = ImageVariant(
+                post=post,
+                width=width,
+                height=height,
+                format=image_format,
+                size=buffer.tell(),
+                source_size=source_size,
+            )
+            variant.file.save(
+                f'{base}_{width}w.{image_format}',
+                ContentFile(buffer.getvalue()),
+                save=False,
+            )
+            variants.append(variant)
+    return ImageVariant.objects.bulk_create(variants)
+
+
+def sources(variants):
+    """<source> для <picture>: тип и srcset, в порядке предпочтения."""
+    by_format = {}
+    for variant in variants:
+        by_format.setdefault(variant.format, []).append(variant)
+    return [
+        {
+            'type': MIME_TYPES.get(image_format, f'image/{image_format}'),
+            'srcset': ', '.join(
+                f'{variant.file.url} {variant.width}w'
+                for variant in sorted(
+                    by_format[image_format], key=lambda item: item.width
+                )
+            ),
+        }
+        for image_format in settings.POST_IMAGE_FORMATS
+        if image_format in by_format
+    ]
@@ -1,24 +1,54 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.caching import get_generation
+from core.decorators import (
+    cache_anonymous_page, limited_uploads, read_from_replica,
+    stick_to_primary,
+)
+
+from . import freshness, search, tags, thumbnails, variants
+from .counters import author_posts_count, user_mentions_count
 from .forms import PostForm, CommentForm
-from .models import Group, Post, Follow
-from .functions import paginator_get_page
+from .models import Group, Post, Follow, Tag
+from .signals import POSTS_GENERATION
+from .functions import (
+    PAGINATOR_NUMBERED, comments_get_page, paginator_get_page
+)
+from .timeline import feed_for
 
 User = get_user_model()
 
 
+def with_cards(posts):
+    """Пакетно загружает всё, что выводит карточка поста."""
+    return posts.select_related('author', 'group').prefetch_related(
+        'image_variants'
+    )
+
+
+@read_from_replica
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator_get_page(posts, request)
+    posts = with_cards(feed_for(request.user))
+    cache_version = get_generation(POSTS_GENERATION)
+    page_obj = paginator_get_page(
+        posts, request,
+        count_key=f'follow:{request.user.pk}:{cache_version}',
+        keys=tags.FEED_KEYS,
+    )
     context = {
         'page_obj': page_obj,
+        'cache_version': cache_version,
     }
     return render(request, 'posts/follow.html', context)
 
 
+@stick_to_primary
 @login_required
 def profile_follow(request, username):
     follow_author = get_object_or_404(User, username=username)
@@ -27,6 +57,7 @@ def profile_follow(request, username):
     return redirect('posts:profile', username)
 
 
+@stick_to_primary
 @login_required
 def profile_unfollow(request, username):
     follow_author = get_object_or_404(User, username=username)
@@ -35,53 +66,169 @@ def profile_unfollow(request, username):
     return redirect('posts:profile', username)
 
 
+@read_from_replica
+@cache_anonymous_page(
+    POSTS_GENERATION, freshness.last_modified(freshness.index_signature)
+)
+@freshness.conditional_page(freshness.index_signature)
 def index(request):
-    posts = Post.objects.all()
-    page_obj = paginator_get_page(posts, request)
+    posts = with_cards(Post.objects.all())
+    cache_version = get_generation(POSTS_GENERATION)
+    page_obj = paginator_get_page(
+        posts, request, count_key=f'index:{cache_version}'
+    )
     context = {
         'page_obj': page_obj,
+        'cache_version': cache_version,
     }
     return render(request, 'posts/index.html', context)
 
 
+@read_from_replica
+@cache_anonymous_page(
+    POSTS_GENERATION, freshness.last_modified(freshness.group_signature)
+)
+@freshness.conditional_page(freshness.group_signature)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = paginator_get_page(posts, request)
+    posts = with_cards(group.posts.all())
+    cache_version = get_generation(POSTS_GENERATION)
+    page_obj = paginator_get_page(
+        posts, request, count_key=f'group:{group.pk}:{cache_version}'
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
+        'cache_version': cache_version,
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@read_from_replica
+@cache_anonymous_page(
+    POSTS_GENERATION, freshness.last_modified(freshness.tag_signature)
+)
+@freshness.conditional_page(freshness.tag_signature)
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=name.lower())
+    posts = with_cards(tags.tag_feed(tag))
+    cache_version = get_generation(POSTS_GENERATION)
+    page_obj = paginator_get_page(
+        posts, request, count_key=f'tag:{tag.pk}:{cache_version}',
+        keys=tags.FEED_KEYS,
+    )
+    context = {
+        'tag': tag,
+        'page_obj': page_obj,
+        'cache_version': cache_version,
+    }
+    return render(request, 'posts/tag_list.html', context)
+
+
+@read_from_replica
+@login_required
+def mentions_index(request):
+    posts = with_cards(tags.mentions_feed(request.user))
+    cache_version = get_generation(POSTS_GENERATION)
+    page_obj = paginator_get_page(
+        posts, request,
+        count_key=f'mentions:{request.user.pk}:{cache_version}',
+        keys=tags.FEED_KEYS,
+    )
+    context = {
+        'page_obj': page_obj,
+        'mentions_count': user_mentions_count(request.user),
+        'cache_version': cache_version,
+    }
+    return render(request, 'posts/mentions.html', context)
+
+
+@read_from_replica
+@cache_anonymous_page(
+    POSTS_GENERATION, freshness.last_modified(freshness.profile_signature)
+)
+@freshness.conditional_page(freshness.profile_signature)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    page_obj = paginator_get_page(posts, request)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = with_cards(author.posts.all())
+    posts_count = author_posts_count(author)
+    cache_version = get_generation(POSTS_GENERATION)
+    page_obj = paginator_get_page(
+        posts, request, count_key=f'profile:{author.pk}:{cache_version}'
+    )
     following = (request.user.is_authenticated
                  and request.user.follower.filter(author=author).exists()
                  )
     context = {
         'author': author,
+        'posts_count': posts_count,
         'page_obj': page_obj,
+        'cache_version': cache_version,
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@read_from_replica
+@cache_anonymous_page(
+    POSTS_GENERATION, freshness.last_modified(freshness.post_signature)
+)
+@freshness.conditional_page(freshness.post_signature)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group')
+        .prefetch_related('image_variants'),
+        pk=post_id,
+    )
+    comments, order = comments_get_page(
+        post.comments.select_related('author'), request
+    )
     form = CommentForm()
     context = {
         'post': post,
+        'author_posts_count': author_posts_count(post.author),
         'comments': comments,
+        'comments_order': order,
         'form': form,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@read_from_replica
+def post_comments(request, post_id):
+    """Следующая порция комментариев — HTML-фрагмент для «Показать ещё»."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments, order = comments_get_page(
+        post.comments.select_related('author'), request
+    )
+    context = {
+        'post': post,
+        'comments': comments,
+        'comments_order': order,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+@read_from_replica
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    results = search.RankedPosts(
+        search.search(query), with_cards(Post.objects.all())
+    )
+    # Порядок задаёт релевантность, курсор по дате тут неприменим
+    page_obj = paginator_get_page(results, request, mode=PAGINATOR_NUMBERED)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&' if query else '',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@limited_uploads
+@stick_to_primary
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -92,10 +239,14 @@ def post_create(request):
         return render(request, 'posts/create_post.html', context)
     post = form.save(commit=False)
     post.author = request.user
-    post.save()
+    with transaction.atomic():
+        post.save()
+        thumbnails.schedule(post)
     return redirect('posts:profile', post.author)
 
 
+@limited_uploads
+@stick_to_primary
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
@@ -112,10 +263,15 @@ def post_edit(request, post_id):
         }
         return render(request, 'posts/create_post.html', context)
 
-    form.save()
+    with transaction.atomic():
+        form.save()
+        if 'image' in form.changed_data:
+            variants.clear(post)
+            thumbnails.schedule(post)
     return redirect('posts:post_detail', post.pk)
 
 
+@stick_to_primary
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
@@ -124,5 +280,6 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
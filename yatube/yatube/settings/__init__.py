@@ -0,0 +1,27 @@
+"""Настройки проекта по профилям.
+
+Профиль выбирается переменной окружения DJANGO_PROFILE: dev (по
+умолчанию), test или prod. Модуль профиля можно указать и прямо:
+DJANGO_SETTINGS_MODULE=yatube.settings.prod.
+"""
+import importlib
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+PROFILES = ('dev', 'test', 'prod')
+
+PROFILE = os.getenv('DJANGO_PROFILE', 'dev')
+if PROFILE not in PROFILES:
+    raise ImproperlyConfigured(
+        f'Неизвестный DJANGO_PROFILE={PROFILE!r}, '
+        f'доступны: {", ".join(PROFILES)}'
+    )
+
+globals().update(
+    (name, value)
+    for name, value in vars(
+        importlib.import_module(f'{__name__}.{PROFILE}')
+    ).items()
+    if name.isupper()
+)
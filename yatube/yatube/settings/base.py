@@ -0,0 +1,257 @@
+"""Общие настройки всех профилей; профили переопределяют их."""
+import os
+
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+SECRET_KEY = 'd#f0)wz*!o&ct+w4^ww^=-kig7ic062u4f4)#raxh&b8cmv*ge'
+
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+]
+
+# locmem — кэш внутри процесса, file и sqlite — общие для всех процессов,
+# tiered — процессный LRU перед общим уровнем CACHE_SHARED_BACKEND
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(BASE_DIR, 'cache'))
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'file': {
+        'BACKEND': 'core.cache_backends.FileCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'files'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+
+def cache_settings(backend):
+    if backend != 'tiered':
+        return {'default': CACHE_BACKENDS[backend]}
+    return {
+        'default': {
+            'BACKEND': 'core.cache_backends.TieredCache',
+            'OPTIONS': {
+                'SHARED': 'shared',
+                'LOCAL_TIMEOUT': 5,
+                'LOCAL_MAX_ENTRIES': 1000,
+            },
+        },
+        'shared': CACHE_BACKENDS[os.getenv('CACHE_SHARED_BACKEND', 'sqlite')],
+    }
+
+
+CACHES = cache_settings(CACHE_BACKEND)
+# Сколько секунд после истечения отдаётся прежнее значение, пока один
+# процесс пересчитывает ключ, и на сколько берётся блокировка пересчёта
+CACHE_STALE_TIMEOUT = 60
+CACHE_LOCK_TIMEOUT = 10
+# Сколько секунд запрос при промахе ждёт чужой пересчёт, прежде чем
+# посчитать значение сам
+CACHE_LOCK_WAIT = 0.2
+# Время жизни данных лент в кэше; актуальность обеспечивают поколения
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+# Отрисованные карточки постов; версия карточки входит в ключ
+CARD_CACHE_TIMEOUT = FEED_CACHE_TIMEOUT
+
+LOGIN_URL = 'users:login'
+LOGIN_REDIRECT_URL = 'posts:index'
+
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Картинки постов лежат по хэшу содержимого и кэшируются навсегда
+MEDIA_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+# Раздавать MEDIA_ROOT из Django и без DEBUG (core.views.serve_media)
+MEDIA_SERVE = False
+
+PAGE_SIZE = 10
+COMMENTS_PAGE_SIZE = 20
+
+# Миниатюры картинок постов создаются при загрузке: 'thread' — в пуле
+# потоков, 'sync' — сразу после коммита, 'off' — только командой
+# warm_thumbnails
+THUMBNAIL_PREGENERATE = os.getenv('THUMBNAIL_PREGENERATE', 'thread')
+THUMBNAIL_WORKERS = 2
+# Адаптивные варианты картинок: ширины и форматы в порядке предпочтения
+POST_IMAGE_WIDTHS = (480, 960, 1440)
+POST_IMAGE_FORMATS = ('avif', 'webp')
+POST_IMAGE_QUALITY = 80
+
+# Картинки постов пишутся во временные файлы, а не в память (декоратор
+# core.decorators.limited_uploads), проверяются по заголовку
+# и пересохраняются без EXIF
+UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+UPLOAD_MAX_PIXELS = 40_000_000
+# Сумма пикселей всех кадров анимации: её кадры не уменьшаются
+UPLOAD_MAX_ANIMATION_PIXELS = 100_000_000
+UPLOAD_MAX_SIDE = 2560
+UPLOAD_IMAGE_QUALITY = 90
+# 'numbered' — Paginator с номерами страниц, 'cursor' — keyset по (pub_date, id)
+PAGINATOR_MODE = os.getenv('PAGINATOR_MODE', 'numbered')
+
+# Поиск: 'fts5' — таблица SQLite FTS5, 'python' — обратный индекс
+# в обычной таблице, 'auto' — FTS5, если она есть
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
+SEARCH_MAX_RESULTS = 1000
+
+# Материализованная лента подписок (fan-out on write)
+TIMELINE_ENABLED = os.getenv('TIMELINE_ENABLED', '') == '1'
+TIMELINE_LENGTH = 500
+# Посты авторов с большим числом подписчиков не раскладываются по лентам,
+# а подмешиваются запросом при чтении
+TIMELINE_FANOUT_LIMIT = 1000
+
+INSTALLED_APPS = [
+    'about.apps.AboutConfig',
+    'posts.apps.PostsConfig',
+    'core.apps.CoreConfig',
+    'users.apps.UsersConfig',
+    'sorl.thumbnail',
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+                'core.context_processors.feed_cache.feed_cache_timeout',
+            ],
+        },
+    },
+]
+# Компилировать все шаблоны при старте WSGI-процесса; имеет смысл
+# только с кэширующим загрузчиком (см. профиль prod)
+TEMPLATES_WARM_UP = False
+# Проверять настройки на производительность при старте WSGI-процесса
+STARTUP_CHECKS = False
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+
+# WAL: читатели не ждут писателя, писатели ждут друг друга до
+# busy_timeout; BEGIN IMMEDIATE сразу берёт блокировку записи
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 20000)),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    # Отрицательное значение — размер в КиБ, а не в страницах
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64000)),
+    'temp_store': 'memory',
+}
+DATABASES = {
+    'default': {
+        'ENGINE': 'core.db_backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение переживает запрос и переиспользуется потоком
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600)),
+        'OPTIONS': {
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': SQLITE_PRAGMAS,
+        },
+    }
+}
+# Реплики только для чтения: пути к копиям базы через запятую. Локально
+# копию обновляет команда sync_replicas
+READ_REPLICAS = []
+for index, path in enumerate(filter(None, os.getenv(
+        'DB_REPLICAS', '').split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': f'file:{path}?mode=ro',
+        'OPTIONS': {
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+            'pragmas': {
+                name: value for name, value in SQLITE_PRAGMAS.items()
+                if name != 'journal_mode'
+            },
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    READ_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# После записи клиент столько секунд читает из основной базы
+STICKY_PRIMARY_COOKIE = 'primary'
+STICKY_PRIMARY_SECONDS = 10
+
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+STATIC_URL = '/static/'
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.getenv('STATIC_ROOT', os.path.join(BASE_DIR, 'static_root'))
+# Раздавать STATIC_ROOT из WSGI-процесса (core.static): файлы с хэшем
+# в имени кэшируются навсегда, остальные — на STATIC_MAX_AGE секунд
+STATIC_SERVE = False
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+STATIC_MAX_AGE = 60
@@ -0,0 +1,4 @@
+"""Локальная разработка: отладка, кэш процесса, письма в файлы."""
+from .base import *  # noqa: F401,F403
+
+DEBUG = True
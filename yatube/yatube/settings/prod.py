@@ -0,0 +1,63 @@
+"""Боевой запуск: без отладки, общий кэш, шаблоны в памяти.
+
+При DEBUG = False Django не копит выполненные SQL-запросы
+в connection.queries. Что в настройках мешает производительности,
+показывает проверка manage.py check --deploy и старт WSGI-процесса.
+"""
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import DATABASES, SECRET_KEY, TEMPLATES, cache_settings
+
+DEBUG = False
+
+SECRET_KEY = os.getenv('SECRET_KEY', SECRET_KEY)
+
+ALLOWED_HOSTS = os.getenv(
+    'ALLOWED_HOSTS', 'localhost,127.0.0.1,[::1]'
+).split(',')
+
+# Процессный LRU перед кэшем, общим для всех процессов сервера
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'tiered')
+CACHES = cache_settings(CACHE_BACKEND)
+
+# Соединения с базой переживают запрос
+CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 600))
+DATABASES = {
+    alias: {**database, 'CONN_MAX_AGE': CONN_MAX_AGE}
+    for alias, database in DATABASES.items()
+}
+
+# Кэширующий загрузчик: шаблон читается и компилируется один раз
+# на процесс, {% include %} берёт уже скомпилированный шаблон. Явные
+# loaders несовместимы с APP_DIRS, остальное — как в base
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+# Шаблоны компилируются при старте WSGI-процесса, а не в первых запросах
+TEMPLATES_WARM_UP = True
+# Проверки производительности при старте WSGI-процесса
+STARTUP_CHECKS = True
+
+# Имена статики с хэшем содержимого и сжатые варианты рядом; статику
+# и загруженные картинки отдаёт сам WSGI-процесс, внешний веб-сервер
+# не нужен
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+STATIC_SERVE = True
+MEDIA_SERVE = True
+
+EMAIL_BACKEND = os.getenv(
+    'EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend'
+)
@@ -0,0 +1,13 @@
+"""Тесты: быстрые хэши паролей, письма в память, миниатюры без потоков."""
+from .base import *  # noqa: F401,F403
+from .base import CACHE_BACKENDS
+
+CACHES = {'default': CACHE_BACKENDS['locmem']}
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Фоновый поток миниатюр переживал тест и писал во временный
+# MEDIA_ROOT, пока тот удалялся
+THUMBNAIL_PREGENERATE = 'sync'
@@ -1,7 +1,23 @@
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if settings.STATIC_SERVE:
+    from core.static import StaticFilesHandler
+
+    application = StaticFilesHandler(application)
+
+if settings.TEMPLATES_WARM_UP:
+    from core.templating import warm_up
+
+    warm_up()
+
+if settings.STARTUP_CHECKS:
+    from core.checks import report
+
+    report()